@@ -0,0 +1,32 @@
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.models import TokenUser
+
+
+class ClaimsUser(TokenUser):
+    """
+    Request user built from the token's claims alone. Carries the driver and
+    carrier ids that views scope their querysets by; views that need the
+    user's profile load it themselves.
+    """
+
+    @cached_property
+    def driver_id(self):
+        return self.token.get("driver_id")
+
+    @cached_property
+    def carrier_id(self):
+        return self.token.get("carrier_id")
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that skips the user query for tokens issued with
+    driver and carrier claims. Tokens issued before those claims existed are
+    still authenticated against the database.
+    """
+
+    def get_user(self, validated_token):
+        if "driver_id" not in validated_token:
+            return super().get_user(validated_token)
+        return ClaimsUser(validated_token)
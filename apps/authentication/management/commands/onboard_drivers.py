@@ -0,0 +1,49 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.authentication.onboarding import onboard_drivers, read_roster
+from apps.core.models import Carrier
+
+
+class Command(BaseCommand):
+    help = (
+        "Onboards a carrier's drivers from a CSV or JSON roster, hashing "
+        "passwords in parallel and reporting the rows that were skipped"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("roster", help="Path to a .csv or .json roster.")
+        parser.add_argument("--carrier-name", required=True)
+        parser.add_argument("--carrier-address", default="")
+        parser.add_argument("--workers", type=int, help="Password hashing processes.")
+        parser.add_argument("--chunk-size", type=int)
+
+    def handle(self, *args, **options):
+        path = Path(options["roster"])
+        fmt = "json" if path.suffix.lower() == ".json" else "csv"
+        try:
+            content = path.read_text(encoding="utf-8-sig")
+            roster = read_roster(json.loads(content) if fmt == "json" else content, fmt)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"Could not read {path}: {exc}")
+
+        carrier, _ = Carrier.objects.get_or_create(
+            name=options["carrier_name"],
+            defaults={"main_office_address": options["carrier_address"]},
+        )
+        result = onboard_drivers(
+            carrier,
+            roster,
+            chunk_size=options["chunk_size"],
+            workers=options["workers"],
+        )
+        for error in result["errors"]:
+            self.stderr.write(f"row {error['row']}: {json.dumps(error['errors'])}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {result['created']} of {len(roster)} drivers "
+                f"for {carrier.name}."
+            )
+        )
@@ -0,0 +1,174 @@
+"""
+Bulk onboarding of a carrier's drivers from a roster.
+
+Registering drivers one request at a time costs a PBKDF2 hash and three
+inserts each. Here the passwords of a whole roster are hashed in a process
+pool and the users, drivers and vehicles are inserted with ``bulk_create`` a
+chunk at a time. Rows that fail validation or conflict with existing data
+are reported back by row number and skipped; the rest of the roster is
+still created.
+"""
+
+import csv
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from rest_framework import serializers
+
+from apps.core.models import Driver, Vehicle
+
+VEHICLE_FIELDS = ("vehicle_number", "license_plate", "state")
+
+
+class RosterRowSerializer(serializers.Serializer):
+    username = serializers.CharField(max_length=150)
+    password = serializers.CharField(min_length=8)
+    email = serializers.EmailField()
+    first_name = serializers.CharField(max_length=30)
+    last_name = serializers.CharField(max_length=150)
+    license_number = serializers.CharField(max_length=50)
+    vehicle_number = serializers.CharField(
+        max_length=50, required=False, allow_blank=True
+    )
+    license_plate = serializers.CharField(
+        max_length=20, required=False, allow_blank=True
+    )
+    state = serializers.CharField(max_length=2, required=False, allow_blank=True)
+
+    def validate(self, attrs):
+        given = [bool(attrs.get(field)) for field in VEHICLE_FIELDS]
+        if any(given) and not all(given):
+            raise serializers.ValidationError(
+                "vehicle_number, license_plate and state go together."
+            )
+        return attrs
+
+
+def read_roster(content, fmt):
+    """Roster rows as dicts from CSV text (with a header) or a JSON list."""
+    if fmt == "csv":
+        return list(csv.DictReader(io.StringIO(content)))
+    if not isinstance(content, list):
+        raise ValueError("A JSON roster must be a list of driver objects")
+    return content
+
+
+def _init_worker():
+    django.setup()
+
+
+def hash_passwords(passwords, workers=None):
+    """
+    ``make_password`` over ``passwords``, spread across ``workers`` processes
+    (ONBOARDING_HASH_WORKERS, or one per CPU).
+    """
+    if workers is None:
+        workers = getattr(settings, "ONBOARDING_HASH_WORKERS", None)
+    workers = min(workers or os.cpu_count() or 1, len(passwords))
+    if workers <= 1:
+        return [make_password(password) for password in passwords]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        chunksize = max(1, len(passwords) // (workers * 4))
+        return list(pool.map(make_password, passwords, chunksize=chunksize))
+
+
+def _duplicates(rows, field, existing):
+    """Row numbers whose ``field`` is already taken or repeats an earlier row."""
+    taken, seen = set(existing), set()
+    for number, row in rows:
+        value = row.get(field)
+        if not value:
+            continue
+        if value in taken or value in seen:
+            yield number, value
+        seen.add(value)
+
+
+def _insert(carrier, rows):
+    with transaction.atomic():
+        users = User.objects.bulk_create(
+            User(
+                username=row["username"],
+                password=row["password"],
+                email=row["email"],
+                first_name=row["first_name"],
+                last_name=row["last_name"],
+            )
+            for _, row in rows
+        )
+        Driver.objects.bulk_create(
+            Driver(user=user, carrier=carrier, license_number=row["license_number"])
+            for user, (_, row) in zip(users, rows)
+        )
+        Vehicle.objects.bulk_create(
+            Vehicle(carrier=carrier, **{field: row[field] for field in VEHICLE_FIELDS})
+            for _, row in rows
+            if row.get("vehicle_number")
+        )
+
+
+def onboard_drivers(carrier, roster, chunk_size=None, workers=None):
+    """
+    Creates a user, driver and optional vehicle for each roster row under
+    ``carrier``. Returns the number of drivers created and the errors of the
+    rows that were skipped, keyed by 1-based row number.
+    """
+    chunk_size = chunk_size or getattr(settings, "ONBOARDING_CHUNK_SIZE", 500)
+    errors = {}
+    valid = []
+    for number, data in enumerate(roster, start=1):
+        row = RosterRowSerializer(data=data)
+        if row.is_valid():
+            valid.append((number, row.validated_data))
+        else:
+            errors[number] = row.errors
+
+    checks = (
+        ("username", User, "username"),
+        ("license_number", Driver, "license_number"),
+        ("vehicle_number", Vehicle, "vehicle_number"),
+    )
+    for field, model, column in checks:
+        values = {row[field] for _, row in valid if row.get(field)}
+        existing = model.objects.filter(**{f"{column}__in": values}).values_list(
+            column, flat=True
+        )
+        for number, value in _duplicates(valid, field, existing):
+            errors.setdefault(number, {})[field] = [f"{value!r} is already taken."]
+    valid = [(number, row) for number, row in valid if number not in errors]
+
+    hashed = hash_passwords([row["password"] for _, row in valid], workers)
+    for (_, row), password in zip(valid, hashed):
+        row["password"] = password
+
+    created = 0
+    for start in range(0, len(valid), chunk_size):
+        chunk = valid[start : start + chunk_size]
+        try:
+            _insert(carrier, chunk)
+            created += len(chunk)
+            continue
+        except IntegrityError:
+            pass
+        # Something changed since the checks above; isolate the bad rows.
+        for number, row in chunk:
+            try:
+                _insert(carrier, [(number, row)])
+                created += 1
+            except IntegrityError as exc:
+                errors[number] = {"non_field_errors": [str(exc)]}
+
+    return {
+        "carrier": carrier.id,
+        "created": created,
+        "errors": [
+            {"row": number, "errors": row_errors}
+            for number, row_errors in sorted(errors.items())
+        ],
+    }
@@ -1,6 +1,10 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
 from apps.core.models import Driver, Carrier
+from .tokens import add_claims
 
 
 class RegisterSerializer(serializers.Serializer):
@@ -34,3 +38,33 @@ class RegisterSerializer(serializers.Serializer):
 class LoginSerializer(serializers.Serializer):
     username = serializers.CharField()
     password = serializers.CharField(write_only=True)
+
+
+class OnboardSerializer(serializers.Serializer):
+    carrier_name = serializers.CharField(max_length=255)
+    carrier_address = serializers.CharField(max_length=255)
+    drivers = serializers.ListField(child=serializers.DictField(), required=False)
+    roster = serializers.FileField(required=False, help_text="CSV with a header")
+
+    def validate(self, attrs):
+        if ("drivers" in attrs) == ("roster" in attrs):
+            raise serializers.ValidationError(
+                "Send either a drivers list or a roster CSV file."
+            )
+        return attrs
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Re-reads the user's claims when an access token is refreshed, so a change
+    of carrier or staff status reaches the tokens within one access lifetime.
+    """
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+        user = User.objects.filter(
+            pk=refresh[api_settings.USER_ID_CLAIM], is_active=True
+        ).first()
+        if user is None:
+            raise InvalidToken("User is inactive or no longer exists")
+        return super().validate({"refresh": str(add_claims(refresh, user))})
@@ -1,3 +1,202 @@
-from django.test import TestCase
+import csv
+import io
+import os
+import tempfile
+from datetime import datetime, timezone
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from apps.core.models import Carrier, Driver, Trip, Vehicle
+
+User = get_user_model()
+
+
+class TokenClaimsTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.carrier = Carrier.objects.create(name="Rapid", main_office_address="")
+        self.user = User.objects.create_user("driver", password="driverpass")
+        self.driver = Driver.objects.create(
+            user=self.user, carrier=self.carrier, license_number="D1"
+        )
+        vehicle = Vehicle.objects.create(
+            carrier=self.carrier, vehicle_number="V1", license_plate="P", state="CA"
+        )
+        self.trip = Trip.objects.create(
+            driver=self.driver,
+            vehicle=vehicle,
+            current_longitude=-118.0,
+            current_latitude=34.0,
+            pickup_longitude=-118.0,
+            pickup_latitude=34.0,
+            dropoff_longitude=-122.0,
+            dropoff_latitude=37.0,
+            start_time=datetime(2025, 3, 3, 8, 0, tzinfo=timezone.utc),
+        )
+
+    def login(self):
+        response = self.client.post(
+            "/api/auth/login/",
+            {"username": "driver", "password": "driverpass"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_login_tokens_carry_driver_and_carrier_claims(self):
+        tokens = self.login()
+        access = AccessToken(tokens["access"])
+        self.assertEqual(access["driver_id"], self.driver.id)
+        self.assertEqual(access["carrier_id"], self.carrier.id)
+        self.assertFalse(access["is_staff"])
+
+    def test_reads_are_scoped_without_loading_the_user(self):
+        tokens = self.login()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+        for url in ("/api/trips/", "/api/vehicles/", f"/api/trips/{self.trip.id}/"):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK, url)
+            tables = " ".join(query["sql"] for query in queries)
+            self.assertNotIn('"auth_user"', tables, url)
+            self.assertNotIn('"core_driver"', tables, url)
+
+        response = self.client.get("/api/user-info/")
+        self.assertEqual(response.data["username"], "driver")
+        self.assertTrue(response.data["has_driver"])
+
+    def test_tokens_without_claims_still_authenticate(self):
+        access = RefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+        response = self.client.get("/api/trips/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"][0]["id"], self.trip.id)
+
+    def test_refresh_picks_up_changed_claims(self):
+        tokens = self.login()
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.post(
+            "/api/auth/refresh/", {"refresh": tokens["refresh"]}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(AccessToken(response.data["access"])["is_staff"])
+
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.post(
+            "/api/auth/refresh/", {"refresh": tokens["refresh"]}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class OnboardingTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_superuser("admin", "a@example.com", "pw")
+        User.objects.create_user("taken", password="driverpass")
+
+    def roster_row(self, n, **extra):
+        return {
+            "username": f"roster-{n}",
+            "password": "correct horse",
+            "email": f"roster-{n}@example.com",
+            "first_name": "Roster",
+            "last_name": str(n),
+            "license_number": f"R-{n}",
+            **extra,
+        }
+
+    @override_settings(ONBOARDING_HASH_WORKERS=2, ONBOARDING_CHUNK_SIZE=2)
+    def test_admin_onboards_roster_and_gets_per_row_errors(self):
+        self.client.force_authenticate(user=self.admin)
+        drivers = [
+            self.roster_row(1, vehicle_number="RV-1", license_plate="P1", state="CA"),
+            self.roster_row(2),
+            self.roster_row(3, username="taken"),
+            self.roster_row(4, password="short"),
+            self.roster_row(5, license_number="R-1"),
+            self.roster_row(6, vehicle_number="RV-6"),
+            self.roster_row(7),
+        ]
+        response = self.client.post(
+            "/api/auth/onboard/",
+            {
+                "carrier_name": "Roster Freight",
+                "carrier_address": "1 Main St",
+                "drivers": drivers,
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["created"], 3)
+        self.assertEqual(
+            {
+                error["row"]: sorted(error["errors"])
+                for error in response.data["errors"]
+            },
+            {
+                3: ["username"],
+                4: ["password"],
+                5: ["license_number"],
+                6: ["non_field_errors"],
+            },
+        )
+        carrier = Carrier.objects.get(name="Roster Freight")
+        self.assertEqual(
+            sorted(carrier.drivers.values_list("license_number", flat=True)),
+            ["R-1", "R-2", "R-7"],
+        )
+        self.assertEqual(
+            list(carrier.vehicles.values_list("vehicle_number", flat=True)), ["RV-1"]
+        )
+        self.assertTrue(
+            User.objects.get(username="roster-7").check_password("correct horse")
+        )
+
+    def test_onboard_command_reads_csv_roster(self):
+        fields = [
+            "username",
+            "password",
+            "email",
+            "first_name",
+            "last_name",
+            "license_number",
+        ]
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as roster:
+            writer = csv.DictWriter(roster, fieldnames=fields)
+            writer.writeheader()
+            writer.writerow({field: self.roster_row(1)[field] for field in fields})
+            writer.writerow(
+                {field: self.roster_row(2, username="taken")[field] for field in fields}
+            )
+        self.addCleanup(os.unlink, roster.name)
+        out, err = io.StringIO(), io.StringIO()
+        call_command(
+            "onboard_drivers",
+            roster.name,
+            carrier_name="CSV Freight",
+            workers=1,
+            stdout=out,
+            stderr=err,
+        )
+        self.assertIn("Created 1 of 2 drivers", out.getvalue())
+        self.assertIn("row 2:", err.getvalue())
+        self.assertTrue(Driver.objects.filter(license_number="R-1").exists())
+
+    def test_driver_cannot_onboard(self):
+        user = User.objects.get(username="taken")
+        self.client.force_authenticate(user=user)
+        response = self.client.post(
+            "/api/auth/onboard/",
+            {"carrier_name": "X", "carrier_address": "Y", "drivers": []},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
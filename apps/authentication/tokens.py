@@ -0,0 +1,27 @@
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.core.models import Driver
+
+
+def add_claims(token, user):
+    """
+    Copies who the user is into ``token`` so requests can be scoped without
+    loading the user or driver: ``driver_id`` and ``carrier_id`` (None for
+    users who are not drivers) and the staff and superuser flags.
+    """
+    driver = (
+        Driver.objects.filter(user_id=user.pk).values("id", "carrier_id").first() or {}
+    )
+    token["driver_id"] = driver.get("id")
+    token["carrier_id"] = driver.get("carrier_id")
+    token["is_staff"] = user.is_staff
+    token["is_superuser"] = user.is_superuser
+    return token
+
+
+def tokens_for_user(user, lifetime=None):
+    """Refresh and access token pair for ``user``, carrying its claims."""
+    refresh = add_claims(RefreshToken.for_user(user), user)
+    if lifetime is not None:
+        refresh.set_exp(lifetime=lifetime)
+    return {"refresh": str(refresh), "access": str(refresh.access_token)}
@@ -1,9 +1,10 @@
 from django.urls import path
-from .views import RegisterView, LoginView
+from .views import OnboardView, RegisterView, LoginView
 from rest_framework_simplejwt.views import TokenRefreshView
 
 urlpatterns = [
     path("login/", LoginView.as_view(), name="login"),
     path("register/", RegisterView.as_view(), name="register"),
     path("refresh/", TokenRefreshView.as_view(), name="token_refresh"),
+    path("onboard/", OnboardView.as_view(), name="onboard"),
 ]
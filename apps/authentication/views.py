@@ -2,10 +2,12 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import generics, permissions, status
 from rest_framework.permissions import AllowAny
-from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
 from drf_yasg.utils import swagger_auto_schema
-from .serializers import RegisterSerializer, LoginSerializer
+from apps.core.models import Carrier
+from .onboarding import onboard_drivers, read_roster
+from .serializers import OnboardSerializer, RegisterSerializer, LoginSerializer
+from .tokens import tokens_for_user
 from django.contrib.auth import get_user_model
 from datetime import timedelta
 
@@ -21,14 +23,8 @@ class RegisterView(generics.CreateAPIView):
         serializer = self.get_serializer(data=request.data)
         if serializer.is_valid():
             user = serializer.save()
-            refresh = RefreshToken.for_user(user)
-            refresh.set_exp(lifetime=timedelta(days=160))
-
             return Response(
-                {
-                    "refresh": str(refresh),
-                    "access": str(refresh.access_token),
-                },
+                tokens_for_user(user, lifetime=timedelta(days=160)),
                 status=status.HTTP_201_CREATED,
             )
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -51,15 +47,50 @@ class LoginView(APIView):
                 password=serializer.validated_data["password"],
             )
             if user:
-                refresh = RefreshToken.for_user(user)
-                return Response(
-                    {
-                        "refresh": str(refresh),
-                        "access": str(refresh.access_token),
-                    },
-                    status=status.HTTP_200_OK,
-                )
+                return Response(tokens_for_user(user), status=status.HTTP_200_OK)
             return Response(
                 {"error": "Invalid credentials"}, status=status.HTTP_401_UNAUTHORIZED
             )
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class OnboardView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    @swagger_auto_schema(
+        request_body=OnboardSerializer,
+        responses={201: "Drivers created", 400: "Invalid input"},
+        operation_description=(
+            "Onboard a carrier's drivers in bulk from a JSON `drivers` list or "
+            "a `roster` CSV upload. Valid rows are created; the others are "
+            "returned in `errors` by 1-based row number."
+        ),
+    )
+    def post(self, request):
+        serializer = OnboardSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = serializer.validated_data
+        if "roster" in data:
+            try:
+                roster = read_roster(data["roster"].read().decode("utf-8-sig"), "csv")
+            except UnicodeDecodeError:
+                return Response(
+                    {"roster": ["The roster must be UTF-8 CSV."]},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+        else:
+            roster = data["drivers"]
+        carrier, _ = Carrier.objects.get_or_create(
+            name=data["carrier_name"],
+            defaults={"main_office_address": data["carrier_address"]},
+        )
+        result = onboard_drivers(carrier, roster)
+        return Response(
+            result,
+            status=(
+                status.HTTP_201_CREATED
+                if result["created"]
+                else status.HTTP_400_BAD_REQUEST
+            ),
+        )
@@ -0,0 +1,161 @@
+"""
+GPS breadcrumb ingest.
+
+In-cab devices post batches of timestamped points for a trip. A batch is
+validated and de-duplicated in memory, written in one round of bulk SQL
+(``COPY`` into a temporary table and ``INSERT ... ON CONFLICT DO NOTHING``
+on PostgreSQL, batched inserts elsewhere) and then moves the trip's current
+location to its latest point with a single UPDATE. Points already stored for
+the same trip and instant are skipped, so devices can resend a batch after a
+dropped connection.
+"""
+
+from datetime import datetime, timezone
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from .models import Breadcrumb, Trip
+
+COLUMNS = ("trip_id", "recorded_at", "longitude", "latitude", "speed_mph", "heading")
+
+
+def parse_recorded_at(value):
+    """Aware datetime from ISO 8601 or epoch seconds; naive times are UTC."""
+    if isinstance(value, datetime):
+        moment = value
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        return datetime.fromtimestamp(value, tz=timezone.utc)
+    elif isinstance(value, str):
+        moment = parse_datetime(value)
+        if moment is None:
+            raise ValueError("recorded_at is not an ISO 8601 datetime")
+    else:
+        raise ValueError("recorded_at is required")
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+def _coordinate(point, key, limit):
+    value = point.get(key)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{key} must be a number")
+    if not -limit <= value <= limit:
+        raise ValueError(f"{key} must be between -{limit} and {limit}")
+    return float(value)
+
+
+def optional_number(point, key):
+    value = point.get(key)
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{key} must be a number")
+    return float(value)
+
+
+def clean_points(trip_id, points):
+    """
+    Rows of ``COLUMNS`` for the valid ``points``, one per instant (the last
+    one wins), plus ``(index, error)`` for the points that were rejected.
+    """
+    rows, rejected = {}, []
+    for index, point in enumerate(points):
+        try:
+            if not isinstance(point, dict):
+                raise ValueError("each point must be an object")
+            recorded_at = parse_recorded_at(point.get("recorded_at"))
+            rows[recorded_at] = (
+                trip_id,
+                recorded_at,
+                _coordinate(point, "longitude", 180),
+                _coordinate(point, "latitude", 90),
+                optional_number(point, "speed_mph"),
+                optional_number(point, "heading"),
+            )
+        except (ValueError, OverflowError, OSError) as exc:
+            rejected.append((index, str(exc)))
+    return list(rows.values()), rejected
+
+
+def _can_copy():
+    """COPY needs PostgreSQL through psycopg 3."""
+    if connection.vendor != "postgresql":
+        return False
+    connection.ensure_connection()
+    return hasattr(connection.connection, "pgconn")
+
+
+def _copy_rows(rows):
+    """PostgreSQL: COPY into a temp table, then one conflict-skipping INSERT."""
+    table = Breadcrumb._meta.db_table
+    columns = ", ".join(COLUMNS)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            "CREATE TEMPORARY TABLE IF NOT EXISTS breadcrumb_ingest ("
+            "trip_id bigint, recorded_at timestamptz, longitude double precision, "
+            "latitude double precision, speed_mph double precision, "
+            "heading double precision) ON COMMIT DELETE ROWS"
+        )
+        # Empty already unless this runs inside a longer transaction.
+        cursor.execute("TRUNCATE breadcrumb_ingest")
+        with cursor.cursor.copy(
+            f"COPY breadcrumb_ingest ({columns}) FROM STDIN"
+        ) as copy:
+            for row in rows:
+                copy.write_row(row)
+        cursor.execute(
+            f"INSERT INTO {table} ({columns}) "
+            f"SELECT {columns} FROM breadcrumb_ingest "
+            "ON CONFLICT (trip_id, recorded_at) DO NOTHING"
+        )
+        return cursor.rowcount
+
+
+def _insert_rows(rows, batch_size=1000):
+    """Other databases: skip stored instants, then batched INSERTs."""
+    trip_id = rows[0][0]
+    stored = set(
+        Breadcrumb.objects.filter(
+            trip_id=trip_id,
+            recorded_at__gte=min(row[1] for row in rows),
+            recorded_at__lte=max(row[1] for row in rows),
+        ).values_list("recorded_at", flat=True)
+    )
+    new = [
+        Breadcrumb(**dict(zip(COLUMNS, row))) for row in rows if row[1] not in stored
+    ]
+    Breadcrumb.objects.bulk_create(new, batch_size=batch_size, ignore_conflicts=True)
+    return len(new)
+
+
+def ingest_breadcrumbs(trip_id, points):
+    """
+    Stores ``points`` for the trip and moves its current location to the
+    latest of them unless a later position is already recorded. Returns
+    counts of what was received, inserted and skipped as duplicates, and
+    the rejected points by index.
+    """
+    rows, rejected = clean_points(trip_id, points)
+    inserted = 0
+    if rows:
+        if _can_copy():
+            inserted = _copy_rows(rows)
+        else:
+            inserted = _insert_rows(rows)
+
+        _, recorded_at, longitude, latitude, *_ = max(rows, key=lambda row: row[1])
+        Trip.objects.filter(id=trip_id).filter(
+            Q(current_location_at__isnull=True) | Q(current_location_at__lt=recorded_at)
+        ).update(
+            current_longitude=longitude,
+            current_latitude=latitude,
+            current_location_at=recorded_at,
+        )
+
+    return {
+        "received": len(points),
+        "inserted": inserted,
+        "duplicates": len(points) - len(rejected) - inserted,
+        "rejected": [{"index": index, "error": error} for index, error in rejected],
+    }
@@ -0,0 +1,213 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta, timezone
+
+from zoneinfo import ZoneInfo
+
+from .hos_logic import CYCLE_DAYS
+from .models import Driver, DriverDutyDay, DutyStatus, Trip
+
+ON_DUTY_STATUSES = ("DRIVING", "ON_DUTY_NOT_DRIVING")
+
+
+def day_spans(start_time, end_time, tz=timezone.utc):
+    """
+    Splits ``[start_time, end_time)`` at each midnight in ``tz`` into
+    ``(date, hours)`` pairs, in order.
+    """
+    spans = []
+    cursor = start_time.astimezone(tz)
+    end = end_time.astimezone(tz)
+    while cursor < end:
+        next_midnight = datetime.combine(
+            cursor.date() + timedelta(days=1), time.min, tzinfo=tz
+        )
+        segment_end = min(end, next_midnight)
+        # Subtract in UTC: same-zone aware subtraction ignores DST shifts.
+        elapsed = segment_end.astimezone(timezone.utc) - cursor.astimezone(timezone.utc)
+        spans.append((cursor.date(), elapsed.total_seconds() / 3600.0))
+        cursor = segment_end
+    return spans
+
+
+def on_duty_hours_by_day(status, start_time, end_time, tz=timezone.utc):
+    """Splits one duty status into on-duty hours per calendar day in ``tz``."""
+    hours = defaultdict(float)
+    if status not in ON_DUTY_STATUSES or end_time <= start_time:
+        return hours
+    for day, span_hours in day_spans(start_time, end_time, tz):
+        hours[day] += span_hours
+    return hours
+
+
+def counts_toward_cycle(values):
+    return (
+        values is not None
+        and not values["is_planned"]
+        and values["status"] in ON_DUTY_STATUSES
+    )
+
+
+def duty_status_values(duty_status):
+    """
+    Snapshot of the fields the cycle index depends on, or None when the row
+    does not count toward the cycle (planned or off duty). Returning early
+    avoids loading the driver and timezone for rows that never need them.
+    """
+    values = {
+        "status": duty_status.status,
+        "start_time": duty_status.start_time,
+        "end_time": duty_status.end_time,
+        "is_planned": duty_status.is_planned,
+    }
+    if not counts_toward_cycle(values):
+        return None
+    values["driver_id"], values["timezone"] = (
+        Trip.objects.filter(id=duty_status.trip_id)
+        .values_list("driver_id", "driver__carrier__home_terminal_timezone")
+        .get()
+    )
+    return values
+
+
+def previous_duty_status_values(pk):
+    """
+    Values of the stored row before an update, or None for new rows. Rows
+    that do not count toward the cycle are returned too, since callers also
+    need their span; ``apply_duty_status_change`` skips them.
+    """
+    row = (
+        DutyStatus.objects.filter(pk=pk)
+        .values(
+            "status",
+            "start_time",
+            "end_time",
+            "is_planned",
+            "trip__driver_id",
+            "trip__driver__carrier__home_terminal_timezone",
+        )
+        .first()
+    )
+    if row is not None:
+        row["driver_id"] = row.pop("trip__driver_id")
+        row["timezone"] = row.pop("trip__driver__carrier__home_terminal_timezone")
+    return row
+
+
+def apply_duty_status_change(before, after):
+    """
+    Moves a DutyStatus row's on-duty hours in the DriverDutyDay index from
+    its ``before`` values to its ``after`` values (either may be None).
+    Hours are bucketed by the carrier's home-terminal day, the same day the
+    ELD logs use. Planned rows never count toward the cycle.
+    """
+    deltas = defaultdict(lambda: defaultdict(float))
+    for values, sign in ((before, -1.0), (after, 1.0)):
+        if not counts_toward_cycle(values):
+            continue
+        hours_by_day = on_duty_hours_by_day(
+            values["status"],
+            values["start_time"],
+            values["end_time"],
+            ZoneInfo(values["timezone"]),
+        )
+        for day, hours in hours_by_day.items():
+            deltas[values["driver_id"]][day] += sign * hours
+    for driver_id, hours_by_day in deltas.items():
+        DriverDutyDay.objects.add_hours(driver_id, hours_by_day)
+
+
+def _timezones(trips):
+    """Each trip's home-terminal timezone, querying only uncached carriers."""
+    missing = {
+        trip.driver_id
+        for trip in trips
+        if not (Trip.driver.is_cached(trip) and Driver.carrier.is_cached(trip.driver))
+    }
+    names = {}
+    if missing:
+        names = dict(
+            Driver.objects.filter(id__in=missing).values_list(
+                "id", "carrier__home_terminal_timezone"
+            )
+        )
+    return [
+        (
+            ZoneInfo(names[trip.driver_id])
+            if trip.driver_id in names
+            else trip.driver.carrier.get_timezone()
+        )
+        for trip in trips
+    ]
+
+
+def logged_cycle_hours(moments):
+    """
+    On-duty hours logged in the 8-day cycle window before each ``(driver_id,
+    moment, tz)``: the seven previous home-terminal days from the
+    DriverDutyDay index, plus the part of ``moment``'s own day before
+    ``moment`` from the duty statuses themselves, so hours recorded later
+    that day (a trip's own, say) are not counted. Two queries in all.
+    """
+    if not moments:
+        return []
+    days = []
+    for _, moment, tz in moments:
+        day = moment.astimezone(tz).date()
+        days.append((day, datetime.combine(day, time.min, tzinfo=tz)))
+    driver_ids = {driver_id for driver_id, _, _ in moments}
+    window = timedelta(days=CYCLE_DAYS)
+
+    by_driver = defaultdict(list)
+    for driver_id, day, hours in DriverDutyDay.objects.filter(
+        driver_id__in=driver_ids,
+        date__gt=min(day for day, _ in days) - window,
+        date__lt=max(day for day, _ in days),
+    ).values_list("driver_id", "date", "on_duty_hours"):
+        by_driver[driver_id].append((day, hours))
+
+    spans = defaultdict(list)
+    for driver_id, start_time, end_time in DutyStatus.objects.filter(
+        trip__driver_id__in=driver_ids,
+        is_planned=False,
+        status__in=ON_DUTY_STATUSES,
+        end_time__gt=min(midnight for _, midnight in days),
+        start_time__lt=max(moment for _, moment, _ in moments),
+    ).values_list("trip__driver_id", "start_time", "end_time"):
+        spans[driver_id].append((start_time, end_time))
+
+    totals = []
+    for (driver_id, moment, _), (day, midnight) in zip(moments, days):
+        total = sum(
+            hours
+            for logged, hours in by_driver[driver_id]
+            if day - window < logged < day
+        )
+        for start_time, end_time in spans[driver_id]:
+            overlap = min(end_time, moment) - max(start_time, midnight)
+            total += max(overlap.total_seconds(), 0.0) / 3600.0
+        totals.append(total)
+    return totals
+
+
+def cycle_hours_for_trip(trip):
+    """
+    Hours already used in the 70-hour/8-day cycle when ``trip`` starts: the
+    larger of the driver's declared ``current_cycle_hours`` and the on-duty
+    hours logged in the 8 days before the trip's start.
+    """
+    return cycle_hours_for_trips([trip])[0]
+
+
+def cycle_hours_for_trips(trips):
+    """``cycle_hours_for_trip`` for many trips with at most three queries."""
+    trips = list(trips)
+    logged = logged_cycle_hours(
+        [
+            (trip.driver_id, trip.start_time, tz)
+            for trip, tz in zip(trips, _timezones(trips))
+        ]
+    )
+    return [
+        max(float(trip.current_cycle_hours or 0.0), hours)
+        for trip, hours in zip(trips, logged)
+    ]
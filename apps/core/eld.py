@@ -0,0 +1,207 @@
+"""
+Daily ELD logs built from a trip's duty statuses.
+
+A log day runs from midnight to midnight in the carrier's home-terminal
+timezone. ``daily_totals`` walks the statuses once, in start order, and
+splits any status that crosses midnight between the days it touches.
+``generate_eld_logs`` then upserts every day's ELDLog row in one bulk
+INSERT ... ON CONFLICT, however many days the trip spans.
+
+Each log also stores its day as a grid for the standard four-row log graph:
+one bit per duty status per quarter-hour slot, 4 x 96 bits packed into 48
+bytes. Slots follow the wall clock, so on DST days the skipped hour stays
+empty and the repeated hour is drawn once.
+"""
+
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+import numpy as np
+
+from .cycle import day_spans
+from .geo import haversine_miles
+from .hos_logic import AVG_SPEED_MPH
+from .models import ELDLog
+from .plan_cache import get_trip_plan
+from .segments import STATUSES
+
+# ELDLog column holding each duty status's hours.
+HOURS_FIELDS = {
+    "OFF_DUTY": "off_duty_hours",
+    "SLEEPER_BERTH": "sleeper_berth_hours",
+    "DRIVING": "driving_hours",
+    "ON_DUTY_NOT_DRIVING": "on_duty_hours",
+}
+TOTAL_FIELDS = ("total_miles", *HOURS_FIELDS.values())
+ROW_FIELDS = ("status", "start_time", "end_time", "latitude", "longitude")
+
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+GRID_BYTES = len(STATUSES) * SLOTS_PER_DAY // 8
+EMPTY_GRID = bytes(GRID_BYTES)
+
+
+def _driven_miles(row, next_row, hours, planned):
+    """
+    Miles covered by a driving row. Planned rows were sized from the plan's
+    route miles at the planner's average speed, so that speed gives them
+    back exactly; recorded rows use the distance to where the next status
+    starts, falling back to the average speed when there is no position.
+    """
+    _, _, _, lat, lon = row
+    if planned or next_row is None or None in (lat, lon, next_row[3], next_row[4]):
+        return hours * AVG_SPEED_MPH
+    return float(haversine_miles(lat, lon, next_row[3], next_row[4]))
+
+
+def daily_totals(rows, tz, planned=False):
+    """
+    Per-day ``{field: total}`` dicts for ``rows`` of
+    ``(status, start_time, end_time, latitude, longitude)`` in start order.
+    A driving row's miles are shared between days in proportion to time;
+    pass ``planned`` when the rows come from a plan.
+    """
+    rows = list(rows)
+    days = defaultdict(lambda: dict.fromkeys(TOTAL_FIELDS, 0.0))
+    for index, row in enumerate(rows):
+        status, start_time, end_time = row[:3]
+        spans = day_spans(start_time, end_time, tz)
+        if not spans:
+            continue
+        field = HOURS_FIELDS[status]
+        miles_per_hour = 0.0
+        if status == "DRIVING":
+            hours = sum(span_hours for _, span_hours in spans)
+            next_row = rows[index + 1] if index + 1 < len(rows) else None
+            miles_per_hour = _driven_miles(row, next_row, hours, planned) / hours
+        for day, span_hours in spans:
+            totals = days[day]
+            totals[field] += span_hours
+            totals["total_miles"] += span_hours * miles_per_hour
+    return dict(days)
+
+
+def _wall_minutes(moment):
+    return moment.hour * 60 + moment.minute + moment.second / 60.0
+
+
+def day_grids(rows, tz):
+    """
+    Packed ``GRID_BYTES`` grid per log day for ``rows`` of
+    ``(status, start_time, end_time, ...)``. Bit ``s * SLOTS_PER_DAY + i``
+    is set when status ``STATUSES[s]`` covers any part of slot ``i``.
+    """
+    grids = defaultdict(lambda: np.zeros((len(STATUSES), SLOTS_PER_DAY), bool))
+    for status, start_time, end_time, *_ in rows:
+        code = STATUSES.index(status)
+        cursor = start_time.astimezone(tz)
+        end = end_time.astimezone(tz)
+        while cursor < end:
+            next_midnight = datetime.combine(
+                cursor.date() + timedelta(days=1), time.min, tzinfo=tz
+            )
+            segment_end = min(end, next_midnight)
+            first = int(_wall_minutes(cursor) // SLOT_MINUTES)
+            last = SLOTS_PER_DAY
+            if segment_end < next_midnight:
+                last = -int(-_wall_minutes(segment_end) // SLOT_MINUTES)
+            grids[cursor.date()][code, first : max(last, first + 1)] = True
+            cursor = segment_end
+    return {day: np.packbits(grid).tobytes() for day, grid in grids.items()}
+
+
+def _duty_statuses_source(trip):
+    """Recorded statuses when the driver has logged any, else planned ones."""
+    statuses = trip.duty_statuses.order_by("start_time")
+    recorded = statuses.filter(is_planned=False)
+    return recorded if recorded.exists() else statuses.filter(is_planned=True)
+
+
+def trip_duty_rows(trip):
+    """
+    ``(rows, planned)`` for the duty statuses a trip's logs are built from:
+    the ones the driver recorded, else the materialized plan, else a freshly
+    computed plan.
+    """
+    statuses = trip.duty_statuses.order_by("start_time")
+    for is_planned in (False, True):
+        rows = list(statuses.filter(is_planned=is_planned).values_list(*ROW_FIELDS))
+        if rows:
+            return rows, is_planned
+    instances = get_trip_plan(trip)["duty_statuses"].to_model_instances(trip)
+    rows = [tuple(getattr(status, name) for name in ROW_FIELDS) for status in instances]
+    return rows, True
+
+
+def generate_eld_logs(trip):
+    """
+    Writes one ELDLog per log day of ``trip`` and returns them by date.
+    Computed totals are overwritten on existing rows; fuel and engine hours
+    entered by the driver are left alone.
+    """
+    tz = trip.driver.carrier.get_timezone()
+    rows, planned = trip_duty_rows(trip)
+    days = daily_totals(rows, tz, planned)
+    grids = day_grids(rows, tz)
+    logs = [
+        ELDLog(trip=trip, date=day, grid=grids.get(day, EMPTY_GRID), **totals)
+        for day, totals in sorted(days.items())
+    ]
+    ELDLog.objects.bulk_create(
+        logs,
+        update_conflicts=True,
+        unique_fields=["trip", "date"],
+        update_fields=[*TOTAL_FIELDS, "grid", "updated_at"],
+    )
+    return {log.date: log for log in ELDLog.objects.filter(trip=trip, date__in=days)}
+
+
+def eld_log_for_day(trip, day, **entered):
+    """
+    Regenerates the trip's logs and returns ``(log, created)`` for ``day``,
+    applying any driver-entered ``fuel_consumed`` / engine hours to it. A day
+    the trip does not reach gets an empty log.
+    """
+    created = not ELDLog.objects.filter(trip=trip, date=day).exists()
+    log = generate_eld_logs(trip).get(day)
+    if log is None:
+        log = ELDLog.objects.create(trip=trip, date=day, total_miles=0.0, **entered)
+    elif entered:
+        for name, value in entered.items():
+            setattr(log, name, value)
+        log.save(update_fields=[*entered, "updated_at"])
+    return log, created
+
+
+def rebuild_grids(trip_id, start_time, end_time):
+    """
+    Recomputes the grids of the trip's existing logs for the days that
+    ``[start_time, end_time)`` touches, from the duty statuses overlapping
+    those days. Called when a duty status changes; costs a single query
+    when the trip has no logs near that time.
+    """
+    nearby = ELDLog.objects.filter(
+        trip_id=trip_id,
+        date__gte=(start_time - timedelta(days=1)).date(),
+        date__lte=(end_time + timedelta(days=1)).date(),
+    ).select_related("trip__driver__carrier")
+    logs = list(nearby)
+    if not logs:
+        return []
+    trip = logs[0].trip
+    tz = trip.driver.carrier.get_timezone()
+    days = {day for day, _ in day_spans(start_time, end_time, tz)}
+    days.add(start_time.astimezone(tz).date())
+    logs = [log for log in logs if log.date in days]
+    if not logs:
+        return []
+    window_start = datetime.combine(min(days), time.min, tzinfo=tz)
+    window_end = datetime.combine(max(days) + timedelta(days=1), time.min, tzinfo=tz)
+    rows = _duty_statuses_source(trip).filter(
+        start_time__lt=window_end, end_time__gt=window_start
+    )
+    grids = day_grids(rows.values_list(*ROW_FIELDS), tz)
+    for log in logs:
+        log.grid = grids.get(log.date, EMPTY_GRID)
+    ELDLog.objects.bulk_update(logs, ["grid"])
+    return logs
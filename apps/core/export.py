@@ -0,0 +1,115 @@
+"""
+Fleet-wide ELD exports for audits.
+
+Rows are read with ``QuerySet.iterator``, which uses a server-side cursor on
+PostgreSQL, and are written as CSV or NDJSON a chunk at a time, so memory
+stays flat however many rows a carrier has and the first rows go out as
+soon as the first chunk is fetched.
+"""
+
+import csv
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import DutyStatus, ELDLog
+
+FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+# Export kind -> (model, (column, lookup) pairs).
+EXPORTS = {
+    "eld-logs": (
+        ELDLog,
+        (
+            ("id", "id"),
+            ("trip_id", "trip_id"),
+            ("driver_license", "trip__driver__license_number"),
+            ("vehicle_number", "trip__vehicle__vehicle_number"),
+            ("date", "date"),
+            ("total_miles", "total_miles"),
+            ("off_duty_hours", "off_duty_hours"),
+            ("sleeper_berth_hours", "sleeper_berth_hours"),
+            ("driving_hours", "driving_hours"),
+            ("on_duty_hours", "on_duty_hours"),
+            ("fuel_consumed", "fuel_consumed"),
+            ("total_engine_hours", "total_engine_hours"),
+            ("total_idle_hours", "total_idle_hours"),
+        ),
+    ),
+    "duty-statuses": (
+        DutyStatus,
+        (
+            ("id", "id"),
+            ("trip_id", "trip_id"),
+            ("driver_license", "trip__driver__license_number"),
+            ("vehicle_number", "trip__vehicle__vehicle_number"),
+            ("status", "status"),
+            ("start_time", "start_time"),
+            ("end_time", "end_time"),
+            ("latitude", "latitude"),
+            ("longitude", "longitude"),
+            ("location_description", "location_description"),
+            ("remarks", "remarks"),
+            ("is_planned", "is_planned"),
+        ),
+    ),
+}
+
+
+def export_rows(carrier, kind, start_date, end_date):
+    """
+    Value tuples of ``kind`` for ``carrier``'s trips between ``start_date``
+    and ``end_date`` inclusive, as log days in the carrier's timezone.
+    Returns the column names and a lazy queryset.
+    """
+    model, columns = EXPORTS[kind]
+    rows = model.objects.filter(trip__driver__carrier=carrier)
+    if model is ELDLog:
+        rows = rows.filter(date__gte=start_date, date__lte=end_date)
+        rows = rows.order_by("date", "trip_id")
+    else:
+        tz = carrier.get_timezone()
+        rows = rows.filter(
+            start_time__lt=datetime.combine(
+                end_date + timedelta(days=1), time.min, tzinfo=tz
+            ),
+            end_time__gt=datetime.combine(start_date, time.min, tzinfo=tz),
+        ).order_by("start_time", "id")
+    return (
+        [name for name, _ in columns],
+        rows.values_list(*(lookup for _, lookup in columns)),
+    )
+
+
+class _Echo:
+    """File-like object whose ``write`` hands back what csv.writer writes."""
+
+    def write(self, value):
+        return value
+
+
+def stream_rows(names, rows, fmt, chunk_size=None):
+    """
+    Yields ``rows`` as CSV (with a header line) or NDJSON, one string per
+    database chunk.
+    """
+    chunk_size = chunk_size or getattr(settings, "EXPORT_CHUNK_SIZE", 2000)
+    if fmt == "csv":
+        writer = csv.writer(_Echo())
+        yield writer.writerow(names)
+        encode = writer.writerow
+    else:
+        encoder = DjangoJSONEncoder(separators=(",", ":"))
+
+        def encode(row):
+            return encoder.encode(dict(zip(names, row))) + "\n"
+
+    chunk = []
+    for row in rows.iterator(chunk_size=chunk_size):
+        chunk.append(encode(row))
+        if len(chunk) >= chunk_size:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
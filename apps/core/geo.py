@@ -0,0 +1,88 @@
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+KM_TO_MILES = 0.621371
+
+
+def lat_lon(point):
+    """``[lon, lat]`` as stored on the models to the ``(lat, lon)`` planners use."""
+    return (point[1], point[0])
+
+
+def haversine_miles(lat1, lon1, lat2, lon2):
+    """Vectorized great-circle distance in miles, same formula as HOSCalculator."""
+    lat1, lon1, lat2, lon2 = (
+        np.radians(np.asarray(value, dtype=np.float64))
+        for value in (lat1, lon1, lat2, lon2)
+    )
+    half_dlat = np.sin((lat2 - lat1) / 2)
+    half_dlon = np.sin((lon2 - lon1) / 2)
+    a = half_dlat * half_dlat + np.cos(lat1) * np.cos(lat2) * half_dlon * half_dlon
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    return EARTH_RADIUS_KM * c * KM_TO_MILES
+
+
+def leg_distances(points):
+    """
+    Miles between consecutive ``(lat, lon)`` points, computed in one
+    vectorized haversine over the coordinate array.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    return haversine_miles(points[:-1, 0], points[:-1, 1], points[1:, 0], points[1:, 1])
+
+
+def cumulative_miles(points):
+    """Miles from the first ``(lat, lon)`` point of a polyline to each point."""
+    return np.concatenate(([0.0], np.cumsum(leg_distances(points))))
+
+
+def great_circle_interpolate(lat1, lon1, lat2, lon2, fraction):
+    """
+    Vectorized point ``fraction`` of the way along the great circle from
+    ``(lat1, lon1)`` to ``(lat2, lon2)``, in degrees.
+    """
+    lat1, lon1, lat2, lon2 = (
+        np.radians(np.asarray(value, dtype=np.float64))
+        for value in (lat1, lon1, lat2, lon2)
+    )
+    fraction = np.asarray(fraction, dtype=np.float64)
+    start = np.stack(
+        (np.cos(lat1) * np.cos(lon1), np.cos(lat1) * np.sin(lon1), np.sin(lat1))
+    )
+    end = np.stack(
+        (np.cos(lat2) * np.cos(lon2), np.cos(lat2) * np.sin(lon2), np.sin(lat2))
+    )
+    angle = np.arccos(np.clip((start * end).sum(axis=0), -1.0, 1.0))
+    sin_angle = np.sin(angle)
+    # Coincident endpoints fall back to linear weights instead of 0/0.
+    tiny = sin_angle < 1e-12
+    safe = np.where(tiny, 1.0, sin_angle)
+    weight_start = np.where(
+        tiny, 1.0 - fraction, np.sin((1.0 - fraction) * angle) / safe
+    )
+    weight_end = np.where(tiny, fraction, np.sin(fraction * angle) / safe)
+    x, y, z = weight_start * start + weight_end * end
+    return np.degrees(np.arctan2(z, np.hypot(x, y))), np.degrees(np.arctan2(y, x))
+
+
+def interpolate_along(points, cumulative, miles):
+    """
+    ``(lat, lon)`` arrays for the points ``miles`` along a polyline whose
+    vertex distances are ``cumulative``. One ``searchsorted`` finds the vertex
+    pair for every mile at once; miles past either end clamp to it.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    miles = np.clip(np.asarray(miles, dtype=np.float64), 0.0, cumulative[-1])
+    if len(points) == 1:
+        return np.full(miles.shape, points[0, 0]), np.full(miles.shape, points[0, 1])
+    leg = np.clip(
+        np.searchsorted(cumulative, miles, side="right") - 1, 0, len(points) - 2
+    )
+    length = cumulative[leg + 1] - cumulative[leg]
+    fraction = np.divide(
+        miles - cumulative[leg], length, out=np.zeros_like(miles), where=length > 0
+    )
+    start, end = points[leg], points[leg + 1]
+    return great_circle_interpolate(
+        start[:, 0], start[:, 1], end[:, 0], end[:, 1], fraction
+    )
@@ -0,0 +1,342 @@
+import numpy as np
+
+from .geo import great_circle_interpolate, haversine_miles
+from .segments import (
+    BREAK,
+    DESCRIPTIONS,
+    DRIVE,
+    DRIVING,
+    DROPOFF,
+    FUEL,
+    OFF_DUTY,
+    ON_DUTY,
+    PICKUP,
+    RESET,
+    RESTART,
+    STATUSES,
+    DutySegments,
+    to_epoch_us,
+)
+from .hos_logic import (
+    AVG_SPEED_MPH,
+    BREAK_HOURS,
+    CYCLE_LIMIT_HOURS,
+    DROPOFF_HOURS,
+    FUEL_INTERVAL_MILES,
+    FUEL_STOP_HOURS,
+    MAX_DRIVING_BEFORE_BREAK,
+    MAX_DRIVING_PER_SHIFT,
+    PICKUP_HOURS,
+    RESET_HOURS,
+    RESTART_HOURS,
+)
+
+US_PER_HOUR = 3_600_000_000
+
+
+class BatchPlan:
+    """
+    Columnar result of ``plan_trips_batch``.
+
+    Segments of trip ``i`` live in ``[offsets[i], offsets[i + 1])`` of the
+    ``status``, ``description``, ``start_hours`` and ``end_hours`` columns.
+    Times are hours relative to the trip's start so that no datetime objects
+    are built until a caller asks for per-trip dicts. ``latitude`` and
+    ``longitude``, when present, hold where each segment starts. ``places``
+    maps global segment indexes of POI-snapped stops to ``(name, lat, lon)``.
+    """
+
+    def __init__(
+        self,
+        starts,
+        total_miles,
+        offsets,
+        status,
+        description,
+        start_hours,
+        end_hours,
+        latitude=None,
+        longitude=None,
+        places=None,
+    ):
+        self.starts = starts
+        self.total_miles = total_miles
+        self.offsets = offsets
+        self.status = status
+        self.description = description
+        self.start_hours = start_hours
+        self.end_hours = end_hours
+        self.latitude = latitude
+        self.longitude = longitude
+        self.places = places or {}
+
+    @classmethod
+    def from_segments(cls, starts, total_miles, schedules):
+        """Columnar form of schedules that were planned one trip at a time."""
+        starts = list(starts)
+        offsets = np.zeros(len(starts) + 1, dtype=np.int64)
+        np.cumsum([len(schedule) for schedule in schedules], out=offsets[1:])
+
+        def column(name, dtype, in_hours=False):
+            parts = [np.empty(0, dtype=dtype)]
+            for start, schedule in zip(starts, schedules):
+                values = np.frombuffer(getattr(schedule, name), dtype=dtype)
+                if in_hours:
+                    values = (values - to_epoch_us(start)) / US_PER_HOUR
+                parts.append(values)
+            return np.concatenate(parts)
+
+        located = all(len(schedule.latitude) == len(schedule) for schedule in schedules)
+        return cls(
+            starts=starts,
+            total_miles=np.asarray(total_miles, dtype=np.float64),
+            offsets=offsets,
+            status=column("status", np.int8),
+            description=column("description", np.int8),
+            start_hours=column("start_us", np.int64, in_hours=True),
+            end_hours=column("end_us", np.int64, in_hours=True),
+            latitude=column("latitude", np.float64) if located else None,
+            longitude=column("longitude", np.float64) if located else None,
+            places={
+                int(offset) + index: place
+                for offset, schedule in zip(offsets, schedules)
+                for index, place in schedule.places.items()
+            },
+        )
+
+    @classmethod
+    def concatenate(cls, plans):
+        """Joins several batch plans, keeping each one's trips in order."""
+        offsets, total, places = [np.zeros(1, dtype=np.int64)], 0, {}
+        for plan in plans:
+            offsets.append(plan.offsets[1:] + total)
+            places.update(
+                (int(total) + index, place) for index, place in plan.places.items()
+            )
+            total += plan.offsets[-1]
+        located = all(plan.latitude is not None for plan in plans)
+        return cls(
+            starts=[start for plan in plans for start in plan.starts],
+            total_miles=np.concatenate([plan.total_miles for plan in plans]),
+            offsets=np.concatenate(offsets),
+            places=places,
+            **{
+                name: np.concatenate([getattr(plan, name) for plan in plans])
+                for name in ("status", "description", "start_hours", "end_hours")
+            },
+            **{
+                name: (
+                    np.concatenate([getattr(plan, name) for plan in plans])
+                    if located
+                    else None
+                )
+                for name in ("latitude", "longitude")
+            },
+        )
+
+    def __len__(self):
+        return len(self.starts)
+
+    def segment_count(self, index):
+        return int(self.offsets[index + 1] - self.offsets[index])
+
+    def segments(self, index):
+        """One trip's schedule as a DutySegments container."""
+        start = self.starts[index]
+        lo, hi = int(self.offsets[index]), int(self.offsets[index + 1])
+        base = to_epoch_us(start)
+        segments = DutySegments(tzinfo=start.tzinfo)
+        segments.status.frombytes(self.status[lo:hi].tobytes())
+        segments.description.frombytes(self.description[lo:hi].tobytes())
+        for column, hours in (
+            (segments.start_us, self.start_hours[lo:hi]),
+            (segments.end_us, self.end_hours[lo:hi]),
+        ):
+            column.extend(
+                (np.rint(hours * US_PER_HOUR).astype(np.int64) + base).tolist()
+            )
+        if self.latitude is not None:
+            segments.latitude.frombytes(self.latitude[lo:hi].tobytes())
+            segments.longitude.frombytes(self.longitude[lo:hi].tobytes())
+        segments.places = {
+            index - lo: place
+            for index, place in self.places.items()
+            if lo <= index < hi
+        }
+        return segments
+
+    def to_dicts(self, index):
+        """Expands one trip into the dict format returned by HOSCalculator."""
+        return self.segments(index).to_representation()
+
+    def to_plans(self):
+        return [
+            {
+                "total_miles": float(self.total_miles[i]),
+                "duty_statuses": self.to_dicts(i),
+            }
+            for i in range(len(self))
+        ]
+
+    def to_columns(self):
+        """JSON-friendly columnar form, with the code lookup tables included."""
+        columns = {
+            "statuses": list(STATUSES),
+            "descriptions": list(DESCRIPTIONS),
+            "start_times": [start.isoformat() for start in self.starts],
+            "total_miles": self.total_miles.tolist(),
+            "offsets": self.offsets.tolist(),
+            "status": self.status.tolist(),
+            "description": self.description.tolist(),
+            "start_hours": self.start_hours.tolist(),
+            "end_hours": self.end_hours.tolist(),
+            "places": [[index, *place] for index, place in sorted(self.places.items())],
+        }
+        if self.latitude is not None:
+            columns["latitude"] = self.latitude.tolist()
+            columns["longitude"] = self.longitude.tolist()
+        return columns
+
+
+def plan_trips_batch(starts, cycle_hours, pickups, dropoffs):
+    """
+    Plans many trips at once with the same rules as
+    ``HOSCalculator.plan_trip_closed_form``.
+
+    ``pickups`` and ``dropoffs`` are sequences of coordinate pairs in the order
+    HOSCalculator expects. Distances and shift structure are computed as NumPy
+    arrays across the whole batch; the only Python-level loop runs over shift
+    numbers, not trips or segments.
+    """
+    starts = list(starts)
+    count = len(starts)
+    cycle_hours = np.asarray(cycle_hours, dtype=np.float64).reshape(-1)
+    pickups = np.asarray(pickups, dtype=np.float64).reshape(-1, 2)
+    dropoffs = np.asarray(dropoffs, dtype=np.float64).reshape(-1, 2)
+    if not (len(cycle_hours) == len(pickups) == len(dropoffs) == count):
+        raise ValueError("starts, cycle_hours, pickups and dropoffs must align")
+
+    total_miles = haversine_miles(
+        pickups[:, 0], pickups[:, 1], dropoffs[:, 0], dropoffs[:, 1]
+    )
+    driving_hours = total_miles / AVG_SPEED_MPH
+    first_leg = MAX_DRIVING_BEFORE_BREAK
+    second_leg = MAX_DRIVING_PER_SHIFT - MAX_DRIVING_BEFORE_BREAK
+
+    trips, steps, statuses, descriptions, durations = [], [], [], [], []
+    step = 0
+
+    def emit(mask, status, description, duration):
+        nonlocal step
+        index = np.flatnonzero(mask)
+        trips.append(index)
+        steps.append(np.full(len(index), step, dtype=np.int64))
+        statuses.append(np.full(len(index), status, dtype=np.int8))
+        descriptions.append(np.full(len(index), description, dtype=np.int8))
+        durations.append(np.broadcast_to(duration, mask.shape)[index])
+        step += 1
+
+    def restart(mask):
+        emit(mask, OFF_DUTY, RESTART, RESTART_HOURS)
+        cycle[mask] = 0.0
+
+    def refuel(mask):
+        emit(mask, ON_DUTY, FUEL, FUEL_STOP_HOURS)
+        cycle[mask] += FUEL_STOP_HOURS
+        miles[mask] = 0.0
+
+    def drive(mask, limit):
+        leg = np.where(
+            mask,
+            np.minimum(np.minimum(remaining, limit), CYCLE_LIMIT_HOURS - cycle),
+            0.0,
+        )
+        emit(mask, DRIVING, DRIVE, leg)
+        remaining[:] -= leg
+        cycle[:] += leg
+        miles[:] += leg * AVG_SPEED_MPH
+        return leg
+
+    everyone = np.ones(count, dtype=bool)
+    emit(everyone, ON_DUTY, PICKUP, PICKUP_HOURS)
+    cycle = cycle_hours + PICKUP_HOURS
+    miles = np.zeros(count)
+    active = driving_hours >= 1.0
+    remaining = np.where(active, driving_hours, 0.0)
+
+    # Each pass plans one shift for every trip still driving, mirroring the
+    # shift loop of HOSCalculator.plan_trip_closed_form.
+    while active.any():
+        restart(active & (cycle >= CYCLE_LIMIT_HOURS))
+        fuel = active & (miles >= FUEL_INTERVAL_MILES)
+        refuel(fuel)
+        restart(fuel & (cycle >= CYCLE_LIMIT_HOURS))
+        leg = drive(active, first_leg)
+        active &= remaining > 0
+
+        takes_break = active & (leg >= first_leg)
+        emit(takes_break, ON_DUTY, BREAK, BREAK_HOURS)
+        cycle[takes_break] += BREAK_HOURS
+        continues = takes_break & (cycle < CYCLE_LIMIT_HOURS)
+        fuel = continues & (miles >= FUEL_INTERVAL_MILES)
+        refuel(fuel)
+        continues &= cycle < CYCLE_LIMIT_HOURS
+        drive(continues, second_leg)
+        active &= remaining > 0
+
+        # Trips that used up their cycle mid-shift restart at the top of the
+        # next pass; everyone else still driving takes a 10-hour reset.
+        ends_shift = active & (~takes_break | continues)
+        emit(ends_shift & (cycle < CYCLE_LIMIT_HOURS), OFF_DUTY, RESET, RESET_HOURS)
+    emit(everyone, ON_DUTY, DROPOFF, DROPOFF_HOURS)
+
+    trips = np.concatenate(trips)
+    order = np.lexsort((np.concatenate(steps), trips))
+    trips = trips[order]
+    duration = np.concatenate(durations).astype(np.float64)[order]
+
+    offsets = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(trips, minlength=count), out=offsets[1:])
+    elapsed = np.cumsum(duration)
+    trip_base = np.concatenate(([0.0], elapsed))[offsets[:-1]]
+    end_hours = elapsed - trip_base[trips]
+
+    # Each segment starts at the fraction of its trip's driving done before
+    # it, interpolated along the pickup-dropoff great circle. Trips with no
+    # driving only move at the final segment, as in DutySegments.locate.
+    status = np.concatenate(statuses)[order]
+    driven = np.where(status == DRIVING, duration, 0.0)
+    driven_after = np.cumsum(driven)
+    driven_before = (
+        driven_after
+        - driven
+        - np.concatenate(([0.0], driven_after))[offsets[:-1]][trips]
+    )
+    trip_driving = np.bincount(trips, weights=driven, minlength=count)
+    fraction = np.divide(
+        driven_before,
+        trip_driving[trips],
+        out=np.zeros_like(driven_before),
+        where=trip_driving[trips] > 0,
+    )
+    last = offsets[1:] - 1
+    fraction[last[trip_driving <= 0]] = 1.0
+    latitude, longitude = great_circle_interpolate(
+        pickups[trips, 0],
+        pickups[trips, 1],
+        dropoffs[trips, 0],
+        dropoffs[trips, 1],
+        fraction,
+    )
+
+    return BatchPlan(
+        starts=starts,
+        total_miles=total_miles,
+        offsets=offsets,
+        status=status,
+        description=np.concatenate(descriptions)[order],
+        start_hours=end_hours - duration,
+        end_hours=end_hours,
+        latitude=latitude,
+        longitude=longitude,
+    )
@@ -1,19 +1,117 @@
 import math
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 
+import numpy as np
+
+from .geo import haversine_miles, leg_distances
+from .segments import (
+    BREAK,
+    DESCRIPTION_CODES,
+    DRIVE,
+    DRIVING,
+    DROPOFF,
+    FUEL,
+    OFF_DUTY,
+    ON_DUTY,
+    PICKUP,
+    RESET,
+    RESTART,
+    STATUS_CODES,
+    STOP,
+    DutySegments,
+    hours_to_us,
+    to_epoch_us,
+)
+
+ENGINE_ITERATIVE = "iterative"
+ENGINE_CLOSED_FORM = "closed_form"
+ENGINES = (ENGINE_ITERATIVE, ENGINE_CLOSED_FORM)
+
+# FMCSA property-carrying limits used by both engines (hours / miles).
+AVG_SPEED_MPH = 50.0
+MAX_DRIVING_PER_SHIFT = 11.0
+MAX_ON_DUTY_PER_SHIFT = 14.0
+MAX_DRIVING_BEFORE_BREAK = 8.0
+BREAK_HOURS = 0.5
+RESET_HOURS = 10.0
+FUEL_INTERVAL_MILES = 1000.0
+FUEL_STOP_HOURS = 0.5
+PICKUP_HOURS = 1.0
+DROPOFF_HOURS = 1.0
+# 70-hour/8-day rule: no driving once 70 on-duty hours are logged in the
+# last 8 days, until a 34-hour restart clears the cycle.
+CYCLE_LIMIT_HOURS = 70.0
+CYCLE_DAYS = 8
+RESTART_HOURS = 34.0
+# Default on-duty time spent at an intermediate waypoint.
+STOP_HOURS = 1.0
+
+
+@dataclass
+class HOSSnapshot:
+    """Driver position and HOS clocks at a point mid-trip, for ``replan``."""
+
+    as_of: datetime
+    position: tuple
+    remaining_miles: float = None
+    driving_in_shift: float = 0.0
+    on_duty_in_shift: float = 0.0
+    driving_since_break: float = 0.0
+    cycle_hours: float = 0.0
+    miles_since_last_fuel_stop: float = 0.0
+
+
+@dataclass
+class Waypoint:
+    """
+    A point on a multi-leg route, as ``(lat, lon)``. Arriving at a waypoint
+    logs ``on_duty_hours`` of on-duty time under ``description``; zero means
+    the route just passes through (or, for the first waypoint, starts) there.
+    """
+
+    location: tuple
+    description: int = STOP
+    on_duty_hours: float = STOP_HOURS
+
+
+def waypoints_ahead(position, waypoints):
+    """
+    The waypoints of a route not yet reached from ``position``: those after
+    the leg that the position adds the least detour to, by great-circle
+    miles.
+    """
+    points = np.array([waypoint.location for waypoint in waypoints], dtype=np.float64)
+    to_position = haversine_miles(points[:, 0], points[:, 1], *position)
+    detour = to_position[:-1] + to_position[1:] - leg_distances(points)
+    return waypoints[int(np.argmin(detour)) + 1 :]
+
 
 class HOSCalculator:
     def __init__(
-        self, start_time, current_cycle_hours, pickup_location, dropoff_location
+        self,
+        start_time,
+        current_cycle_hours,
+        pickup_location,
+        dropoff_location,
+        engine=ENGINE_ITERATIVE,
+        router=None,
     ):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown HOS engine: {engine}")
         self.start_time = start_time
         self.current_cycle_hours = current_cycle_hours
         self.pickup_location = pickup_location
         self.dropoff_location = dropoff_location
-        self.duty_statuses = []
+        self.engine = engine
+        # Optional routing.RoadGraph; road miles replace great-circle miles.
+        self.router = router
+        self.duty_statuses = DutySegments(tzinfo=getattr(start_time, "tzinfo", None))
         self.miles_since_last_fuel_stop = 0.0
 
     def calculate_distance(self, coord1, coord2):
+        if self.router is not None:
+            return self.router.route_miles(coord1, coord2)
         lat1, lon1 = coord1
         lat2, lon2 = coord2
         R = 6371  # Radius of the earth in km
@@ -26,7 +124,21 @@ class HOSCalculator:
         distance = R * c * 0.621371  # convert km to miles
         return distance
 
+    def route_geometry(self, points):
+        """
+        The polyline a plan through ``points`` follows: the points themselves,
+        or the road path between each pair when a router is set.
+        """
+        if self.router is None:
+            return [tuple(point) for point in points]
+        geometry = [tuple(points[0])]
+        for origin, destination in zip(points, points[1:]):
+            geometry.extend(self.router.route_path(origin, destination)[1:])
+        return geometry
+
     def plan_trip(self):
+        if self.engine == ENGINE_CLOSED_FORM:
+            return self.plan_trip_closed_form()
         total_miles = self.calculate_distance(
             self.pickup_location, self.dropoff_location
         )
@@ -37,6 +149,7 @@ class HOSCalculator:
         driving_in_shift = 0.0
         on_duty_in_shift = 0.0
         driving_since_break = 0.0
+        cycle_hours = float(self.current_cycle_hours or 0.0)
 
         # 1. Pickup (1 hour, on-duty not driving)
         self.add_duty_status(
@@ -47,6 +160,7 @@ class HOSCalculator:
         )
         current_time += timedelta(hours=1)
         on_duty_in_shift += 1.0
+        cycle_hours += 1.0
 
         # If the trip is very short, skip the main driving loop
         if total_driving_hours < 1.0:
@@ -66,6 +180,22 @@ class HOSCalculator:
                 f"Driving time this shift: {driving_in_shift:.2f} hours, On-duty time: {on_duty_in_shift:.2f} hours"
             )
 
+            # Check for the 70-hour/8-day cycle before the shift limits, since a
+            # 34-hour restart also covers the 10-hour reset.
+            if cycle_hours >= CYCLE_LIMIT_HOURS:
+                self.add_duty_status(
+                    "OFF_DUTY",
+                    current_time,
+                    current_time + timedelta(hours=RESTART_HOURS),
+                    "34-hour Restart",
+                )
+                current_time += timedelta(hours=RESTART_HOURS)
+                driving_in_shift = 0.0
+                on_duty_in_shift = 0.0
+                driving_since_break = 0.0
+                cycle_hours = 0.0
+                continue
+
             # Check for end-of-shift (11-hour driving or 14-hour on-duty limit)
             if driving_in_shift >= 11.0 or on_duty_in_shift >= 14.0:
                 self.add_duty_status(
@@ -89,6 +219,7 @@ class HOSCalculator:
                 )
                 current_time += timedelta(minutes=30)
                 on_duty_in_shift += 0.5
+                cycle_hours += 0.5
                 self.miles_since_last_fuel_stop = 0.0
                 continue
 
@@ -96,6 +227,7 @@ class HOSCalculator:
             time_to_11h_limit = 11.0 - driving_in_shift
             time_to_14h_limit = 14.0 - on_duty_in_shift
             time_to_break_needed = 8.0 - driving_since_break
+            time_to_cycle_limit = CYCLE_LIMIT_HOURS - cycle_hours
 
             # Drive duration should be the minimum of these limits
             drive_duration = min(
@@ -103,6 +235,7 @@ class HOSCalculator:
                 time_to_11h_limit,
                 time_to_14h_limit,
                 time_to_break_needed,
+                time_to_cycle_limit,
             )
 
             print(f"Drive duration for this loop: {drive_duration:.2f} hours")
@@ -118,7 +251,9 @@ class HOSCalculator:
                 driving_in_shift += drive_duration
                 on_duty_in_shift += drive_duration
                 driving_since_break += drive_duration
+                cycle_hours += drive_duration
                 total_driving_hours -= drive_duration
+                self.miles_since_last_fuel_stop += drive_duration * avg_speed
 
                 print(f"After driving: {driving_since_break:.2f} hours since break")
 
@@ -135,6 +270,7 @@ class HOSCalculator:
                 )
                 current_time += timedelta(minutes=30)
                 on_duty_in_shift += 0.5
+                cycle_hours += 0.5
                 driving_since_break = 0.0  # Reset the break clock
 
         # Debugging: Final check before returning result
@@ -157,14 +293,262 @@ class HOSCalculator:
 
         return {"total_miles": total_miles, "duty_statuses": self.duty_statuses}
 
+    def plan_trip_closed_form(self):
+        """
+        Produces the same schedule as the iterative loop in ``plan_trip`` but
+        works a whole shift at a time instead of re-checking every limit per
+        segment.
+
+        With the FMCSA limits above the 14-hour window never binds (a shift
+        holds at most pickup + 8h + break + fuel + 3h = 13h on duty), so a
+        shift is at most ``8h drive, 30-min break, 3h drive``. Each leg is
+        capped by the driving left and the hours left in the 70-hour cycle; a
+        shift ends in a 34-hour restart when the cycle is used up and in a
+        10-hour reset otherwise. Fuel stops are placed at the same loop
+        boundaries the iterative engine checks them on.
+        """
+        total_miles = self.calculate_distance(
+            self.pickup_location, self.dropoff_location
+        )
+        remaining = total_miles / AVG_SPEED_MPH
+        self._cursor = to_epoch_us(self.start_time)
+
+        self._emit(ON_DUTY, PICKUP, hours_to_us(PICKUP_HOURS))
+        cycle_hours = float(self.current_cycle_hours or 0.0) + PICKUP_HOURS
+
+        if remaining >= 1.0:
+            self.miles_since_last_fuel_stop = self._drive_shifts(
+                remaining, cycle_hours, self.miles_since_last_fuel_stop
+            )[4]
+        self._emit(ON_DUTY, DROPOFF, hours_to_us(DROPOFF_HOURS))
+        return {"total_miles": total_miles, "duty_statuses": self.duty_statuses}
+
+    def replan(self, snapshot, waypoints=None):
+        """
+        Plans the rest of a trip from ``snapshot`` (an ``HOSSnapshot``)
+        through the ``waypoints`` still ahead, ending at the dropoff, without
+        replaying the segments already driven. Without ``waypoints`` the
+        route goes straight to the dropoff. A ``remaining_miles`` in the
+        snapshot replaces the computed total, split across the legs in
+        proportion to their computed miles.
+
+        The driver's current shift is finished with the full set of limit
+        checks, since its clocks can be anywhere; every later shift starts
+        from zero and goes through the closed-form shift loop. The work done
+        is proportional to the remaining trip only.
+        """
+        if waypoints is None:
+            waypoints = [Waypoint(self.dropoff_location, DROPOFF, DROPOFF_HOURS)]
+        legs = self._leg_miles(
+            [snapshot.position, *(waypoint.location for waypoint in waypoints)]
+        )
+        remaining_miles = float(legs.sum())
+        if snapshot.remaining_miles is not None:
+            if remaining_miles > 0:
+                legs = legs * (snapshot.remaining_miles / remaining_miles)
+            else:
+                legs[-1] = snapshot.remaining_miles
+            remaining_miles = snapshot.remaining_miles
+        self.duty_statuses = DutySegments(tzinfo=snapshot.as_of.tzinfo)
+        self._cursor = to_epoch_us(snapshot.as_of)
+
+        clocks = self._follow(
+            waypoints,
+            legs,
+            (
+                snapshot.driving_in_shift,
+                snapshot.on_duty_in_shift,
+                snapshot.driving_since_break,
+                snapshot.cycle_hours,
+                snapshot.miles_since_last_fuel_stop,
+            ),
+        )
+        self.miles_since_last_fuel_stop = clocks[4]
+        return {
+            "remaining_miles": remaining_miles,
+            "duty_statuses": self.duty_statuses,
+        }
+
+    def plan_route(self, waypoints):
+        """
+        Plans a multi-leg route through ``waypoints`` (``Waypoint`` objects)
+        in order, starting at the first one at ``start_time``.
+
+        All leg distances come from one vectorized haversine over the
+        coordinate array, or from the road graph when a router is set. HOS clocks carry over from leg to leg, so an on-duty
+        stop or a leg ending mid-shift counts against the same 11/14-hour
+        shift and 70-hour cycle as the driving around it.
+        """
+        legs = self._leg_miles([waypoint.location for waypoint in waypoints])
+        self._cursor = to_epoch_us(self.start_time)
+        # (driving_in_shift, on_duty_in_shift, driving_since_break,
+        #  cycle_hours, miles_since_last_fuel_stop)
+        clocks = (0.0, 0.0, 0.0, float(self.current_cycle_hours or 0.0), 0.0)
+        clocks = self._follow(waypoints, np.concatenate(([0.0], legs)), clocks)
+        self.miles_since_last_fuel_stop = clocks[4]
+        return {
+            "total_miles": float(legs.sum()),
+            "legs": legs.tolist(),
+            "duty_statuses": self.duty_statuses,
+        }
+
+    def _leg_miles(self, points):
+        """Miles between consecutive ``(lat, lon)`` points, by road when routed."""
+        if self.router is None:
+            return leg_distances(points)
+        return np.array(
+            [self.router.route_miles(a, b) for a, b in zip(points, points[1:])]
+        )
+
+    def _follow(self, waypoints, legs, clocks):
+        """
+        Drives ``legs[i]`` miles to each of ``waypoints`` in turn and logs its
+        on-duty time, carrying ``clocks`` throughout. Returns the final clocks.
+        """
+        for waypoint, miles_to in zip(waypoints, legs):
+            if miles_to > 0:
+                clocks = self._drive(float(miles_to) / AVG_SPEED_MPH, clocks)
+            if waypoint.on_duty_hours > 0:
+                driving, on_duty, since_break, cycle_hours, miles = clocks
+                self._emit(
+                    ON_DUTY, waypoint.description, hours_to_us(waypoint.on_duty_hours)
+                )
+                clocks = (
+                    driving,
+                    on_duty + waypoint.on_duty_hours,
+                    since_break,
+                    cycle_hours + waypoint.on_duty_hours,
+                    miles,
+                )
+        return clocks
+
+    def _emit(self, status, description, duration_us):
+        self.duty_statuses.append(
+            status, description, self._cursor, self._cursor + duration_us
+        )
+        self._cursor += duration_us
+
+    def _drive(self, remaining, clocks):
+        """
+        Drives ``remaining`` hours starting from arbitrary ``clocks`` and
+        returns the clocks at arrival.
+        """
+        remaining, clocks = self._finish_shift(remaining, clocks)
+        if remaining > 0:
+            clocks = self._drive_shifts(remaining, clocks[3], clocks[4])
+        return clocks
+
+    def _finish_shift(self, remaining, clocks):
+        """
+        Runs the iterative engine's checks from arbitrary clock values until
+        the trip ends or the shift does. Returns the driving hours left and the
+        clocks at that point.
+        """
+        driving, on_duty, since_break, cycle_hours, miles = clocks
+
+        while remaining > 0:
+            if cycle_hours >= CYCLE_LIMIT_HOURS:
+                self._emit(OFF_DUTY, RESTART, hours_to_us(RESTART_HOURS))
+                return remaining, (0.0, 0.0, 0.0, 0.0, miles)
+            if driving >= MAX_DRIVING_PER_SHIFT or on_duty >= MAX_ON_DUTY_PER_SHIFT:
+                self._emit(OFF_DUTY, RESET, hours_to_us(RESET_HOURS))
+                return remaining, (0.0, 0.0, 0.0, cycle_hours, miles)
+            if miles >= FUEL_INTERVAL_MILES:
+                self._emit(ON_DUTY, FUEL, hours_to_us(FUEL_STOP_HOURS))
+                on_duty += FUEL_STOP_HOURS
+                cycle_hours += FUEL_STOP_HOURS
+                miles = 0.0
+                continue
+            leg = min(
+                remaining,
+                MAX_DRIVING_PER_SHIFT - driving,
+                MAX_ON_DUTY_PER_SHIFT - on_duty,
+                MAX_DRIVING_BEFORE_BREAK - since_break,
+                CYCLE_LIMIT_HOURS - cycle_hours,
+            )
+            if leg > 0:
+                self._emit(DRIVING, DRIVE, hours_to_us(leg))
+                driving += leg
+                on_duty += leg
+                since_break += leg
+                cycle_hours += leg
+                miles += leg * AVG_SPEED_MPH
+                remaining -= leg
+            if since_break >= MAX_DRIVING_BEFORE_BREAK and remaining > 0:
+                self._emit(ON_DUTY, BREAK, hours_to_us(BREAK_HOURS))
+                on_duty += BREAK_HOURS
+                cycle_hours += BREAK_HOURS
+                since_break = 0.0
+        return remaining, (driving, on_duty, since_break, cycle_hours, miles)
+
+    def _drive_shifts(self, remaining, cycle_hours, miles):
+        """
+        Emits whole shifts, starting with fresh shift clocks, until
+        ``remaining`` driving hours are used up. Returns the clocks at the
+        end of the last leg, in the order ``_finish_shift`` takes them.
+        """
+        first_leg = MAX_DRIVING_BEFORE_BREAK
+        second_leg = MAX_DRIVING_PER_SHIFT - MAX_DRIVING_BEFORE_BREAK
+        reset_us = hours_to_us(RESET_HOURS)
+        restart_us = hours_to_us(RESTART_HOURS)
+        break_us = hours_to_us(BREAK_HOURS)
+        fuel_us = hours_to_us(FUEL_STOP_HOURS)
+        emit = self._emit
+
+        while True:
+            # Start of a shift: after pickup, a 10-hour reset or a restart.
+            on_duty = 0.0
+            if cycle_hours >= CYCLE_LIMIT_HOURS:
+                emit(OFF_DUTY, RESTART, restart_us)
+                cycle_hours = 0.0
+            if miles >= FUEL_INTERVAL_MILES:
+                emit(ON_DUTY, FUEL, fuel_us)
+                on_duty += FUEL_STOP_HOURS
+                cycle_hours += FUEL_STOP_HOURS
+                miles = 0.0
+                if cycle_hours >= CYCLE_LIMIT_HOURS:
+                    emit(OFF_DUTY, RESTART, restart_us)
+                    on_duty = 0.0
+                    cycle_hours = 0.0
+            leg = min(remaining, first_leg, CYCLE_LIMIT_HOURS - cycle_hours)
+            emit(DRIVING, DRIVE, hours_to_us(leg))
+            remaining -= leg
+            cycle_hours += leg
+            miles += leg * AVG_SPEED_MPH
+            if remaining <= 0:
+                return leg, on_duty + leg, leg, cycle_hours, miles
+
+            if leg >= first_leg:
+                driving = leg
+                on_duty += leg + BREAK_HOURS
+                emit(ON_DUTY, BREAK, break_us)
+                cycle_hours += BREAK_HOURS
+                if cycle_hours >= CYCLE_LIMIT_HOURS:
+                    continue
+                if miles >= FUEL_INTERVAL_MILES:
+                    emit(ON_DUTY, FUEL, fuel_us)
+                    on_duty += FUEL_STOP_HOURS
+                    cycle_hours += FUEL_STOP_HOURS
+                    miles = 0.0
+                    if cycle_hours >= CYCLE_LIMIT_HOURS:
+                        continue
+                leg = min(remaining, second_leg, CYCLE_LIMIT_HOURS - cycle_hours)
+                emit(DRIVING, DRIVE, hours_to_us(leg))
+                remaining -= leg
+                cycle_hours += leg
+                miles += leg * AVG_SPEED_MPH
+                if remaining <= 0:
+                    return driving + leg, on_duty + leg, leg, cycle_hours, miles
+
+            if cycle_hours < CYCLE_LIMIT_HOURS:
+                emit(OFF_DUTY, RESET, reset_us)
+
     def add_duty_status(self, status, start, end, description):
         self.duty_statuses.append(
-            {
-                "status": status,
-                "start_time": start.isoformat(),
-                "end_time": end.isoformat(),
-                "location_description": description,
-            }
+            STATUS_CODES[status],
+            DESCRIPTION_CODES[description],
+            to_epoch_us(start),
+            to_epoch_us(end),
         )
         # Add debug print to show the description being added
         print(f"Added duty status: {description}")
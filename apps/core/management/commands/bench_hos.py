@@ -0,0 +1,113 @@
+import contextlib
+import io
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand
+
+from apps.core.hos_logic import ENGINE_CLOSED_FORM, ENGINE_ITERATIVE, HOSCalculator
+from apps.core.serializers import DutyStatusSerializer
+
+# Distance along the equator covered by one degree of longitude, in miles.
+MILES_PER_DEGREE = HOSCalculator(None, 0, None, None).calculate_distance(
+    (0.0, 0.0), (0.0, 1.0)
+)
+
+
+class Command(BaseCommand):
+    help = "Benchmarks the HOS planning engines by trip length"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--miles",
+            type=float,
+            nargs="+",
+            default=[50, 300, 1000, 2800, 6000, 12000],
+            help="Trip lengths to benchmark, in miles.",
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=200, help="Plans per engine and length."
+        )
+
+    def time_engine(self, engine, dropoff, repeat):
+        start = datetime(2025, 1, 1, 8, 0, tzinfo=timezone.utc)
+        sink = io.StringIO()
+        began = time.perf_counter()
+        with contextlib.redirect_stdout(sink):
+            for _ in range(repeat):
+                result = HOSCalculator(
+                    start, 0, (0.0, 0.0), dropoff, engine=engine
+                ).plan_trip()
+                sink.seek(0)
+                sink.truncate()
+        elapsed = time.perf_counter() - began
+        return elapsed / repeat, len(result["duty_statuses"])
+
+    def retained_bytes(self, build):
+        """Bytes still allocated by ``build()``'s result once it returns."""
+        tracemalloc.start()
+        result = build()
+        retained, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del result
+        return retained
+
+    def time_call(self, call, repeat):
+        began = time.perf_counter()
+        for _ in range(repeat):
+            call()
+        return (time.perf_counter() - began) / repeat
+
+    def compare_representations(self, miles, repeat):
+        """
+        Memory and render latency of the DutySegments container against the
+        list of isoformat dicts it replaced, rendered via DutyStatusSerializer.
+        """
+        start = datetime(2025, 1, 1, 8, 0, tzinfo=timezone.utc)
+        dropoff = (0.0, miles / MILES_PER_DEGREE)
+
+        def plan():
+            return HOSCalculator(
+                start, 0, (0.0, 0.0), dropoff, engine=ENGINE_CLOSED_FORM
+            ).plan_trip()["duty_statuses"]
+
+        segments = plan()
+        legacy = segments.to_dicts()
+        return {
+            "segments_bytes": self.retained_bytes(plan),
+            "legacy_bytes": self.retained_bytes(lambda: plan().to_dicts()),
+            "segments_render": self.time_call(segments.to_representation, repeat),
+            "legacy_render": self.time_call(
+                lambda: DutyStatusSerializer(legacy, many=True).data, repeat
+            ),
+        }
+
+    def handle(self, *args, **options):
+        repeat = options["repeat"]
+        self.stdout.write(
+            f"{'miles':>8} {'segments':>9} {'iterative us':>13} "
+            f"{'closed-form us':>15} {'speedup':>8}"
+        )
+        for miles in options["miles"]:
+            dropoff = (0.0, miles / MILES_PER_DEGREE)
+            iterative, segments = self.time_engine(ENGINE_ITERATIVE, dropoff, repeat)
+            closed_form, _ = self.time_engine(ENGINE_CLOSED_FORM, dropoff, repeat)
+            self.stdout.write(
+                f"{miles:>8.0f} {segments:>9} {iterative * 1e6:>13.1f} "
+                f"{closed_form * 1e6:>15.1f} {iterative / closed_form:>7.1f}x"
+            )
+
+        self.stdout.write("")
+        self.stdout.write(
+            f"{'miles':>8} {'dicts KiB':>10} {'segments KiB':>13} "
+            f"{'serializer us':>14} {'direct us':>10}"
+        )
+        for miles in options["miles"]:
+            numbers = self.compare_representations(miles, repeat)
+            self.stdout.write(
+                f"{miles:>8.0f} {numbers['legacy_bytes'] / 1024:>10.1f} "
+                f"{numbers['segments_bytes'] / 1024:>13.1f} "
+                f"{numbers['legacy_render'] * 1e6:>14.1f} "
+                f"{numbers['segments_render'] * 1e6:>10.1f}"
+            )
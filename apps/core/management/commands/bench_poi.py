@@ -0,0 +1,54 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.core.poi import KINDS, POIIndex
+
+
+class Command(BaseCommand):
+    help = "Benchmarks nearest-POI lookups against synthetic POI sets"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--pois",
+            type=int,
+            nargs="+",
+            default=[1_000, 20_000, 200_000],
+            help="POI counts to benchmark.",
+        )
+        parser.add_argument("--queries", type=int, default=5_000)
+        parser.add_argument("--radius", type=float, default=10.0)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'pois':>9} {'build ms':>9} {'lookup us':>10} {'hit rate':>9}"
+        )
+        for count in options["pois"]:
+            rng = random.Random(count)
+            records = [
+                (
+                    f"POI {i}",
+                    rng.uniform(25.0, 49.0),
+                    rng.uniform(-124.0, -67.0),
+                    rng.choice(KINDS),
+                )
+                for i in range(count)
+            ]
+            began = time.perf_counter()
+            index = POIIndex.from_records(records)
+            build_ms = (time.perf_counter() - began) * 1e3
+
+            queries = [
+                (rng.uniform(25.0, 49.0), rng.uniform(-124.0, -67.0))
+                for _ in range(options["queries"])
+            ]
+            hits = 0
+            began = time.perf_counter()
+            for lat, lon in queries:
+                hits += index.nearest(lat, lon, options["radius"]) is not None
+            lookup_us = (time.perf_counter() - began) / len(queries) * 1e6
+            self.stdout.write(
+                f"{count:>9} {build_ms:>9.1f} {lookup_us:>10.1f} "
+                f"{hits / len(queries):>8.0%}"
+            )
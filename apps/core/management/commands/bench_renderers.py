@@ -0,0 +1,89 @@
+import io
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from django.core.management.base import BaseCommand
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from apps.core.models import DutyStatus
+from apps.core.renderers import (
+    MessagePackParser,
+    MessagePackRenderer,
+    ORJSONParser,
+    ORJSONRenderer,
+    msgpack,
+    orjson,
+)
+from apps.core.segments import STATUSES
+from apps.core.serializers import DutyStatusSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks encoding and decoding a page of duty statuses with the "
+        "stdlib JSON, orjson and MessagePack renderers and parsers"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--statuses", type=int, nargs="+", default=[50, 500])
+        parser.add_argument("--repeat", type=int, default=200)
+
+    def handle(self, *args, **options):
+        formats = [("json", JSONRenderer(), JSONParser())]
+        if orjson is not None:
+            formats.append(("orjson", ORJSONRenderer(), ORJSONParser()))
+        if msgpack is not None:
+            formats.append(("msgpack", MessagePackRenderer(), MessagePackParser()))
+
+        self.stdout.write(
+            f"{'statuses':>8} {'format':>8} {'bytes':>8} "
+            f"{'encode us':>10} {'decode us':>10}"
+        )
+        for count in options["statuses"]:
+            page = {"next": None, "previous": None, "results": self.page(count)}
+            for name, renderer, parser in formats:
+                body = renderer.render(page)
+                encode = self.best(lambda: renderer.render(page), options["repeat"])
+                decode = self.best(
+                    lambda: parser.parse(io.BytesIO(body)), options["repeat"]
+                )
+                self.stdout.write(
+                    f"{count:>8} {name:>8} {len(body):>8} "
+                    f"{encode * 1e6:>10.1f} {decode * 1e6:>10.1f}"
+                )
+
+    def page(self, count):
+        """A list response as DutyStatusSerializer renders it."""
+        rng = random.Random(count)
+        start = datetime(2025, 3, 3, 8, 0, tzinfo=timezone.utc)
+        statuses = []
+        for i in range(count):
+            end = start + timedelta(minutes=rng.randrange(15, 600))
+            statuses.append(
+                DutyStatus(
+                    id=i + 1,
+                    trip_id=1,
+                    status=rng.choice(STATUSES),
+                    start_time=start,
+                    end_time=end,
+                    latitude=rng.uniform(25.0, 49.0),
+                    longitude=rng.uniform(-124.0, -67.0),
+                    location_description=f"Mile marker {rng.randrange(500)}",
+                    remarks="",
+                    created_at=start,
+                    updated_at=end,
+                )
+            )
+            start = end
+        return DutyStatusSerializer(statuses, many=True).data
+
+    @staticmethod
+    def best(call, repeat):
+        timings = []
+        for _ in range(repeat):
+            began = time.perf_counter()
+            call()
+            timings.append(time.perf_counter() - began)
+        return min(timings)
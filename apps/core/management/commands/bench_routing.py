@@ -0,0 +1,96 @@
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from apps.core.routing import RoadGraph, compile_osm
+
+BUNDLED_GRAPH = Path(__file__).resolve().parents[2] / "data" / "test_road_graph.osm"
+
+
+def write_grid_osm(path, size, step=0.01):
+    """Synthetic ``size`` x ``size`` street grid, for latency at scale."""
+    with open(path, "w") as osm:
+        osm.write('<?xml version="1.0" encoding="UTF-8"?>\n<osm version="0.6">\n')
+        for row in range(size):
+            for col in range(size):
+                osm.write(
+                    f'<node id="{row * size + col + 1}" lat="{35 + row * step:.5f}" '
+                    f'lon="{-100 + col * step:.5f}"/>\n'
+                )
+        way = 0
+        for line in range(size):
+            for refs in (
+                [line * size + col + 1 for col in range(size)],
+                [row * size + line + 1 for row in range(size)],
+            ):
+                way += 1
+                osm.write(f'<way id="{way}">')
+                osm.write("".join(f'<nd ref="{ref}"/>' for ref in refs))
+                osm.write('<tag k="highway" v="residential"/></way>\n')
+        osm.write("</osm>\n")
+
+
+class Command(BaseCommand):
+    help = "Benchmarks road graph compilation, loading and shortest-path queries"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--osm",
+            help="OSM XML file to benchmark (defaults to the bundled test graph).",
+        )
+        parser.add_argument(
+            "--grid",
+            type=int,
+            nargs="+",
+            default=[],
+            help="Also benchmark synthetic N x N street grids.",
+        )
+        parser.add_argument(
+            "--queries", type=int, default=200, help="Random queries per graph."
+        )
+
+    def bench(self, label, osm_path, workdir, queries):
+        compiled = Path(workdir) / f"{label}.graph"
+        began = time.perf_counter()
+        nodes, edges = compile_osm(osm_path, compiled)
+        compile_s = time.perf_counter() - began
+
+        began = time.perf_counter()
+        graph = RoadGraph.load(compiled)
+        load_ms = (time.perf_counter() - began) * 1e3
+
+        rng = random.Random(9)
+        latencies = []
+        for _ in range(queries):
+            source = rng.randrange(graph.node_count)
+            target = rng.randrange(graph.node_count)
+            began = time.perf_counter()
+            try:
+                graph.shortest_path(source, target)
+            except ValueError:
+                continue
+            latencies.append((time.perf_counter() - began) * 1e3)
+        latencies.sort()
+        p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0.0
+        self.stdout.write(
+            f"{label:>14} {nodes:>9} {edges:>9} {compiled.stat().st_size / 1024:>9.0f} "
+            f"{compile_s:>10.2f} {load_ms:>8.2f} "
+            f"{statistics.median(latencies) if latencies else 0.0:>9.2f} {p95:>9.2f}"
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'graph':>14} {'nodes':>9} {'edges':>9} {'file KiB':>9} "
+            f"{'compile s':>10} {'load ms':>8} {'p50 ms':>9} {'p95 ms':>9}"
+        )
+        with tempfile.TemporaryDirectory() as workdir:
+            osm = options["osm"] or BUNDLED_GRAPH
+            self.bench(Path(osm).stem[:14], osm, workdir, options["queries"])
+            for size in options["grid"]:
+                grid = Path(workdir) / f"grid{size}.osm"
+                write_grid_osm(grid, size)
+                self.bench(f"grid {size}x{size}", grid, workdir, options["queries"])
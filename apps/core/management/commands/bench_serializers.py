@@ -0,0 +1,121 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.core.models import (
+    Carrier,
+    Driver,
+    DutyStatus,
+    Trip,
+    TripStop,
+    Vehicle,
+)
+from apps.core.row_serializers import DutyStatusRowSerializer, TripRowSerializer
+from apps.core.serializers import DutyStatusSerializer, TripSerializer
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares rows/second of the .values() row serializers against the DRF "
+        "model serializers on synthetic trips, rolled back afterwards"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--trips", type=int, default=2_000)
+        parser.add_argument("--statuses", type=int, default=10)
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, options):
+        carrier = Carrier.objects.create(name="Bench", main_office_address="")
+        user = get_user_model().objects.create_user("bench-serializers")
+        driver = Driver.objects.create(
+            user=user, carrier=carrier, license_number="BENCH-SERIALIZERS"
+        )
+        vehicle = Vehicle.objects.create(
+            carrier=carrier, vehicle_number="BENCH-1", license_plate="B", state="CA"
+        )
+        start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        trips = Trip.objects.bulk_create(
+            Trip(
+                driver=driver,
+                vehicle=vehicle,
+                current_longitude=-118.0,
+                current_latitude=34.0,
+                pickup_longitude=-118.0,
+                pickup_latitude=34.0,
+                dropoff_longitude=-74.0,
+                dropoff_latitude=40.7,
+                start_time=start + timedelta(hours=i),
+            )
+            for i in range(options["trips"])
+        )
+        TripStop.objects.bulk_create(
+            TripStop(trip=trip, sequence=0, longitude=-100.0, latitude=35.0)
+            for trip in trips
+        )
+        DutyStatus.objects.bulk_create(
+            DutyStatus(
+                trip=trips[0],
+                status="DRIVING",
+                start_time=start + timedelta(hours=i),
+                end_time=start + timedelta(hours=i + 1),
+                longitude=-118.0,
+                latitude=34.0,
+                location_description="Driving",
+            )
+            for i in range(options["trips"] * options["statuses"])
+        )
+
+        trip_rows = Trip.objects.filter(driver=driver).order_by("start_time")
+        status_rows = DutyStatus.objects.filter(trip=trips[0]).order_by("start_time")
+        cases = [
+            (
+                "trips",
+                lambda: TripSerializer(
+                    trip_rows.select_related("vehicle").prefetch_related("stops"),
+                    many=True,
+                ).data,
+                lambda: (lambda s: s.to_representation(s.values(trip_rows)))(
+                    TripRowSerializer()
+                ),
+            ),
+            (
+                "duty statuses",
+                lambda: DutyStatusSerializer(status_rows, many=True).data,
+                lambda: (lambda s: s.to_representation(s.values(status_rows)))(
+                    DutyStatusRowSerializer()
+                ),
+            ),
+        ]
+        self.stdout.write(
+            f"{'endpoint':<14} {'rows':>7} {'model rows/s':>13} "
+            f"{'values rows/s':>14} {'speedup':>8}"
+        )
+        for name, model, values in cases:
+            rates = []
+            for serialize in (model, values):
+                best = float("inf")
+                for _ in range(options["repeat"]):
+                    began = time.perf_counter()
+                    rows = len(serialize())
+                    best = min(best, time.perf_counter() - began)
+                rates.append(rows / best)
+            self.stdout.write(
+                f"{name:<14} {rows:>7} {rates[0]:>13,.0f} {rates[1]:>14,.0f} "
+                f"{rates[1] / rates[0]:>7.1f}x"
+            )
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from apps.core.models import Trip
+from apps.core.route_lines import compact_breadcrumbs
+
+
+class Command(BaseCommand):
+    help = (
+        "Folds the GPS breadcrumbs of completed trips into their stored, "
+        "simplified driven routes and deletes the raw points"
+    )
+
+    def handle(self, *args, **options):
+        trip_ids = (
+            Trip.objects.filter(status="COMPLETED", breadcrumbs__isnull=False)
+            .values_list("id", flat=True)
+            .distinct()
+        )
+        trips = deleted = 0
+        for trip_id in list(trip_ids):
+            deleted += compact_breadcrumbs(trip_id)
+            trips += 1
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Compacted {deleted} breadcrumbs from {trips} completed trips."
+            )
+        )
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.core.routing import compile_osm
+
+
+class Command(BaseCommand):
+    help = "Compiles an OSM XML extract into the memory-mapped road graph format"
+
+    def add_arguments(self, parser):
+        parser.add_argument("osm_path", help="OSM XML file (.osm).")
+        parser.add_argument("output_path", help="Where to write the compiled graph.")
+
+    def handle(self, *args, **options):
+        began = time.perf_counter()
+        nodes, edges = compile_osm(options["osm_path"], options["output_path"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Wrote {nodes} nodes and {edges} edges to {options['output_path']} "
+                f"in {time.perf_counter() - began:.2f}s"
+            )
+        )
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from apps.core.telemetry import flush_engine_totals
+
+
+class Command(BaseCommand):
+    help = (
+        "Copies engine hours, idle hours and fuel folded from telemetry into "
+        "the ELD logs. Run it on a schedule, e.g. every few minutes from cron"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        flushed = flush_engine_totals(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Flushed {flushed} log days."))
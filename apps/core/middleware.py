@@ -0,0 +1,65 @@
+import logging
+import re
+import time
+from collections import Counter
+
+from django.db import connection
+
+logger = logging.getLogger("apps.core.queries")
+
+# Literals collapse to "?" so queries that differ only in their parameters
+# share a fingerprint.
+LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+IN_LISTS = re.compile(r"\((?:\s*\?\s*,)+\s*\?\s*\)")
+
+
+def fingerprint(sql):
+    return IN_LISTS.sub("(?, ...)", LITERALS.sub("?", " ".join(sql.split())))
+
+
+class QueryCountMiddleware:
+    """
+    Development aid: logs each request's query count, total SQL time and the
+    most repeated query fingerprints, which is where N+1 patterns show up.
+    Enabled in settings when DEBUG is on. Queries run while a streaming
+    response is being consumed happen after this middleware returns and are
+    not counted.
+    """
+
+    TOP_FINGERPRINTS = 3
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        fingerprints = Counter()
+        elapsed = 0.0
+
+        def record(execute, sql, params, many, context):
+            nonlocal elapsed
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                elapsed += time.perf_counter() - started
+                fingerprints[fingerprint(sql)] += 1
+
+        with connection.execute_wrapper(record):
+            response = self.get_response(request)
+
+        count = sum(fingerprints.values())
+        repeated = [
+            f"{n}x {sql}"
+            for sql, n in fingerprints.most_common(self.TOP_FINGERPRINTS)
+            if n > 1
+        ]
+        logger.debug(
+            "%s %s: %d queries in %.1f ms%s",
+            request.method,
+            request.path,
+            count,
+            elapsed * 1000,
+            "".join(f"\n  {line}" for line in repeated),
+        )
+        response["X-Query-Count"] = str(count)
+        return response
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.7 on 2026-10-17 03:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0003_eldlog_fuel_consumed_eldlog_total_engine_hours_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dutystatus",
+            name="is_planned",
+            field=models.BooleanField(
+                default=False, help_text="Written by the route planner, not the driver"
+            ),
+        ),
+    ]
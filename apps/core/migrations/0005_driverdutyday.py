@@ -0,0 +1,46 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0004_dutystatus_is_planned"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DriverDutyDay",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("on_duty_hours", models.FloatField(default=0.0)),
+                (
+                    "driver",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="duty_days",
+                        to="core.driver",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["driver", "date"], name="core_driver_driver__c1900c_idx"
+                    )
+                ],
+                "unique_together": {("driver", "date")},
+            },
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0005_driverdutyday"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TripStop",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "sequence",
+                    models.PositiveIntegerField(
+                        help_text="Order of the stop between pickup and dropoff"
+                    ),
+                ),
+                ("longitude", models.FloatField()),
+                ("latitude", models.FloatField()),
+                ("location_name", models.CharField(blank=True, max_length=255)),
+                (
+                    "on_duty_hours",
+                    models.FloatField(
+                        default=1.0, help_text="On-duty time spent at the stop"
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "trip",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stops",
+                        to="core.trip",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["sequence"],
+                "unique_together": {("trip", "sequence")},
+            },
+        ),
+    ]
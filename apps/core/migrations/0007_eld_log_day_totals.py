@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:23
+
+import apps.core.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0006_tripstop"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="carrier",
+            name="home_terminal_timezone",
+            field=models.CharField(
+                default="UTC",
+                help_text="IANA timezone whose midnight starts each ELD log day",
+                max_length=64,
+                validators=[apps.core.models.validate_timezone],
+            ),
+        ),
+        migrations.AddField(
+            model_name="eldlog",
+            name="driving_hours",
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name="eldlog",
+            name="off_duty_hours",
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name="eldlog",
+            name="on_duty_hours",
+            field=models.FloatField(default=0.0, help_text="On duty, not driving"),
+        ),
+        migrations.AddField(
+            model_name="eldlog",
+            name="sleeper_berth_hours",
+            field=models.FloatField(default=0.0),
+        ),
+    ]
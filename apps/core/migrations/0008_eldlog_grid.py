@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0007_eld_log_day_totals"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="eldlog",
+            name="grid",
+            field=models.BinaryField(
+                default=b"",
+                help_text="Duty status x quarter-hour bits for the log graph",
+                max_length=48,
+            ),
+        ),
+    ]
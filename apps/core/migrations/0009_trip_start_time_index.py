@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0008_eldlog_grid"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="trip",
+            index=models.Index(
+                fields=["start_time", "id"], name="core_trip_start_t_09503c_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0009_trip_start_time_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="trip",
+            name="current_location_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="Time of the GPS breadcrumb the current location came from",
+                null=True,
+            ),
+        ),
+        migrations.CreateModel(
+            name="Breadcrumb",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("recorded_at", models.DateTimeField()),
+                ("longitude", models.FloatField()),
+                ("latitude", models.FloatField()),
+                ("speed_mph", models.FloatField(blank=True, null=True)),
+                (
+                    "heading",
+                    models.FloatField(
+                        blank=True,
+                        help_text="Degrees clockwise from true north",
+                        null=True,
+                    ),
+                ),
+                (
+                    "trip",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="breadcrumbs",
+                        to="core.trip",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("trip", "recorded_at")},
+            },
+        ),
+    ]
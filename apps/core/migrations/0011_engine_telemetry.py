@@ -0,0 +1,88 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0010_breadcrumbs"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EngineState",
+            fields=[
+                (
+                    "trip",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="engine_state",
+                        serialize=False,
+                        to="core.trip",
+                    ),
+                ),
+                ("recorded_at", models.DateTimeField()),
+                ("ignition", models.BooleanField()),
+                ("rpm", models.FloatField(blank=True, null=True)),
+                ("speed_mph", models.FloatField(blank=True, null=True)),
+                (
+                    "fuel_level",
+                    models.FloatField(
+                        blank=True, help_text="Gallons in the tank", null=True
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="EngineDay",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("engine_hours", models.FloatField(default=0.0)),
+                ("idle_hours", models.FloatField(default=0.0)),
+                ("fuel_consumed", models.FloatField(default=0.0, help_text="Gallons")),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "flushed_at",
+                    models.DateTimeField(
+                        blank=True,
+                        help_text="updated_at as of the last flush",
+                        null=True,
+                    ),
+                ),
+                (
+                    "trip",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="engine_days",
+                        to="core.trip",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(
+                            ("flushed_at__isnull", True),
+                            ("flushed_at__lt", models.F("updated_at")),
+                            _connector="OR",
+                        ),
+                        fields=["trip", "date"],
+                        name="engine_day_unflushed",
+                    )
+                ],
+                "unique_together": {("trip", "date")},
+            },
+        ),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 4.2.7 on 2026-10-17 05:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0011_engine_telemetry"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RouteLine",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("PLANNED", "Planned"), ("DRIVEN", "Driven")],
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "polyline",
+                    models.TextField(
+                        help_text="Encoded polyline of (lat, lon) vertices"
+                    ),
+                ),
+                (
+                    "vertex_miles",
+                    models.BinaryField(
+                        help_text="Cumulative miles at each vertex as little-endian float64"
+                    ),
+                ),
+                (
+                    "tolerance_miles",
+                    models.FloatField(
+                        help_text="Douglas-Peucker tolerance the vertices were simplified with"
+                    ),
+                ),
+                (
+                    "source_key",
+                    models.CharField(
+                        blank=True,
+                        help_text="Hash of the waypoints and router a planned route came from",
+                        max_length=40,
+                    ),
+                ),
+                (
+                    "ended_at",
+                    models.DateTimeField(
+                        blank=True,
+                        help_text="Time of the last breadcrumb folded into a driven route",
+                        null=True,
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "trip",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="route_lines",
+                        to="core.trip",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("trip", "kind")},
+            },
+        ),
+    ]
@@ -0,0 +1,64 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from django.db import migrations
+
+# Frozen copies of apps.core.cycle as of this migration, so later changes
+# there cannot change what it does.
+ON_DUTY_STATUSES = ("DRIVING", "ON_DUTY_NOT_DRIVING")
+
+
+def day_spans(start_time, end_time, tz):
+    """Splits ``[start_time, end_time)`` at each midnight in ``tz``."""
+    spans = []
+    cursor = start_time.astimezone(tz)
+    end = end_time.astimezone(tz)
+    while cursor < end:
+        next_midnight = datetime.combine(
+            cursor.date() + timedelta(days=1), time.min, tzinfo=tz
+        )
+        segment_end = min(end, next_midnight)
+        elapsed = segment_end.astimezone(timezone.utc) - cursor.astimezone(timezone.utc)
+        spans.append((cursor.date(), elapsed.total_seconds() / 3600.0))
+        cursor = segment_end
+    return spans
+
+
+def rebuild(apps, schema_editor):
+    """Re-buckets the cycle index by home-terminal day instead of UTC day."""
+    DriverDutyDay = apps.get_model("core", "DriverDutyDay")
+    DutyStatus = apps.get_model("core", "DutyStatus")
+    totals = defaultdict(float)
+    rows = DutyStatus.objects.filter(
+        is_planned=False, status__in=ON_DUTY_STATUSES
+    ).values_list(
+        "trip__driver_id",
+        "trip__driver__carrier__home_terminal_timezone",
+        "start_time",
+        "end_time",
+    )
+    for driver_id, tz, start_time, end_time in rows.iterator():
+        if end_time <= start_time:
+            continue
+        for day, hours in day_spans(start_time, end_time, ZoneInfo(tz)):
+            totals[driver_id, day] += hours
+    DriverDutyDay.objects.all().delete()
+    DriverDutyDay.objects.bulk_create(
+        [
+            DriverDutyDay(driver_id=driver_id, date=day, on_duty_hours=hours)
+            for (driver_id, day), hours in totals.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0012_route_lines"),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild, migrations.RunPython.noop),
+    ]
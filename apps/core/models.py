@@ -1,10 +1,30 @@
-from django.db import models
+from datetime import timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.core.exceptions import ValidationError
+
+from django.db import models, transaction
+from django.db.models import F, Max, Min, Sum
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+
+def validate_timezone(value):
+    try:
+        ZoneInfo(value)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValidationError(f"{value!r} is not a known IANA timezone")
 
 
 class Carrier(models.Model):
     name = models.CharField(max_length=255)
     main_office_address = models.CharField(max_length=255)
+    home_terminal_timezone = models.CharField(
+        max_length=64,
+        default="UTC",
+        validators=[validate_timezone],
+        help_text="IANA timezone whose midnight starts each ELD log day",
+    )
     created_by = models.ForeignKey(
         User, on_delete=models.CASCADE, blank=True, null=True
     )
@@ -20,6 +40,9 @@ class Carrier(models.Model):
     def __str__(self):
         return self.name
 
+    def get_timezone(self):
+        return ZoneInfo(self.home_terminal_timezone)
+
 
 class Driver(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -64,6 +87,11 @@ class Trip(models.Model):
     current_longitude = models.FloatField()
     current_latitude = models.FloatField()
     current_location_name = models.CharField(max_length=255, blank=True)
+    current_location_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Time of the GPS breadcrumb the current location came from",
+    )
     pickup_longitude = models.FloatField()
     pickup_latitude = models.FloatField()
     pickup_location_name = models.CharField(max_length=255, blank=True)
@@ -87,6 +115,7 @@ class Trip(models.Model):
     class Meta:
         indexes = [
             models.Index(fields=["driver", "start_time"]),
+            models.Index(fields=["start_time", "id"]),
             models.Index(fields=["status"]),
         ]
 
@@ -103,6 +132,63 @@ class Trip(models.Model):
         return [self.dropoff_longitude, self.dropoff_latitude]
 
 
+class TripStop(models.Model):
+    """Intermediate on-duty stop between a trip's pickup and dropoff."""
+
+    trip = models.ForeignKey(Trip, on_delete=models.CASCADE, related_name="stops")
+    sequence = models.PositiveIntegerField(
+        help_text="Order of the stop between pickup and dropoff"
+    )
+    longitude = models.FloatField()
+    latitude = models.FloatField()
+    location_name = models.CharField(max_length=255, blank=True)
+    on_duty_hours = models.FloatField(
+        default=1.0, help_text="On-duty time spent at the stop"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["sequence"]
+        unique_together = ("trip", "sequence")
+
+    def __str__(self):
+        return f"Stop {self.sequence} for Trip {self.trip_id}"
+
+    def get_location(self):
+        return [self.longitude, self.latitude]
+
+
+class DutyStatusQuerySet(models.QuerySet):
+    def replace_planned(self, trip, duty_statuses):
+        """
+        Atomically swaps the trip's planned rows for ``duty_statuses`` using a
+        single DELETE and a single bulk INSERT, then redraws the trip's log
+        grids once over the old and new plans' span, since ``bulk_create``
+        sends no ``post_save``. The DELETE skips the collector and its
+        per-row ``post_delete`` handlers: planned rows never count toward the
+        cycle, and the grids are redrawn here.
+        """
+        from .eld import rebuild_grids
+
+        for duty_status in duty_statuses:
+            duty_status.trip = trip
+            duty_status.is_planned = True
+        with transaction.atomic():
+            planned = self.filter(trip=trip, is_planned=True)
+            before = planned.aggregate(start=Min("start_time"), end=Max("end_time"))
+            planned._raw_delete(planned.db)
+            created = self.bulk_create(duty_statuses)
+            starts = [d.start_time for d in created] + [before["start"]]
+            ends = [d.end_time for d in created] + [before["end"]]
+            starts = [start for start in starts if start is not None]
+            if starts:
+                rebuild_grids(
+                    trip.id, min(starts), max(end for end in ends if end is not None)
+                )
+            return created
+
+
 class DutyStatus(models.Model):
     trip = models.ForeignKey(
         Trip, on_delete=models.CASCADE, related_name="duty_statuses"
@@ -122,9 +208,14 @@ class DutyStatus(models.Model):
     latitude = models.FloatField()
     location_description = models.CharField(max_length=255)
     remarks = models.TextField(blank=True)
+    is_planned = models.BooleanField(
+        default=False, help_text="Written by the route planner, not the driver"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = DutyStatusQuerySet.as_manager()
+
     class Meta:
         indexes = [
             models.Index(fields=["trip", "start_time"]),
@@ -134,13 +225,17 @@ class DutyStatus(models.Model):
         return [self.longitude, self.latitude]
 
     def __str__(self):
-        return f"{self.status} for Trip {self.trip.id}"
+        return f"{self.status} for Trip {self.trip_id}"
 
 
 class ELDLog(models.Model):
     trip = models.ForeignKey(Trip, on_delete=models.CASCADE, related_name="eld_logs")
     date = models.DateField()
     total_miles = models.FloatField()
+    off_duty_hours = models.FloatField(default=0.0)
+    sleeper_berth_hours = models.FloatField(default=0.0)
+    driving_hours = models.FloatField(default=0.0)
+    on_duty_hours = models.FloatField(default=0.0, help_text="On duty, not driving")
     fuel_consumed = models.DecimalField(
         max_digits=10,
         decimal_places=2,
@@ -162,6 +257,11 @@ class ELDLog(models.Model):
         null=True,
         blank=True,
     )
+    grid = models.BinaryField(
+        max_length=48,
+        default=b"",
+        help_text="Duty status x quarter-hour bits for the log graph",
+    )
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -174,4 +274,211 @@ class ELDLog(models.Model):
         ]
 
     def __str__(self):
-        return f"ELD Log for Trip {self.trip.id} on {self.date}"
+        return f"ELD Log for Trip {self.trip_id} on {self.date}"
+
+
+class DriverDutyDayQuerySet(models.QuerySet):
+    def add_hours(self, driver_id, hours_by_day):
+        """
+        Applies per-day on-duty deltas with one UPDATE per touched day,
+        creating the day row on first use.
+        """
+        with transaction.atomic():
+            for day, hours in hours_by_day.items():
+                if not hours:
+                    continue
+                updated = self.filter(driver_id=driver_id, date=day).update(
+                    on_duty_hours=F("on_duty_hours") + hours
+                )
+                if not updated:
+                    _, created = self.get_or_create(
+                        driver_id=driver_id, date=day, defaults={"on_duty_hours": hours}
+                    )
+                    if not created:
+                        self.filter(driver_id=driver_id, date=day).update(
+                            on_duty_hours=F("on_duty_hours") + hours
+                        )
+
+    def cycle_hours(self, driver_id, as_of, days=8):
+        """On-duty hours in the ``days``-day window ending on ``as_of``."""
+        total = self.filter(
+            driver_id=driver_id,
+            date__gt=as_of - timedelta(days=days),
+            date__lte=as_of,
+        ).aggregate(total=Sum("on_duty_hours"))["total"]
+        return total or 0.0
+
+
+class DriverDutyDay(models.Model):
+    """
+    Per-driver, per-day on-duty total maintained incrementally from recorded
+    DutyStatus rows, so the rolling 70-hour/8-day cycle is a sum over at most
+    eight rows regardless of how much history a driver has.
+    """
+
+    driver = models.ForeignKey(
+        Driver, on_delete=models.CASCADE, related_name="duty_days"
+    )
+    date = models.DateField()
+    on_duty_hours = models.FloatField(default=0.0)
+
+    objects = DriverDutyDayQuerySet.as_manager()
+
+    class Meta:
+        unique_together = ("driver", "date")
+        indexes = [
+            models.Index(fields=["driver", "date"]),
+        ]
+
+    def __str__(self):
+        return f"{self.on_duty_hours:.2f}h on duty for {self.driver_id} on {self.date}"
+
+
+class Breadcrumb(models.Model):
+    """GPS point reported by a truck's in-cab device during a trip."""
+
+    trip = models.ForeignKey(Trip, on_delete=models.CASCADE, related_name="breadcrumbs")
+    recorded_at = models.DateTimeField()
+    longitude = models.FloatField()
+    latitude = models.FloatField()
+    speed_mph = models.FloatField(null=True, blank=True)
+    heading = models.FloatField(
+        null=True, blank=True, help_text="Degrees clockwise from true north"
+    )
+
+    class Meta:
+        # Also the index that serves a trip's track in time order.
+        unique_together = ("trip", "recorded_at")
+
+    def __str__(self):
+        return f"Breadcrumb for Trip {self.trip_id} at {self.recorded_at}"
+
+    def get_location(self):
+        return [self.longitude, self.latitude]
+
+
+class RouteLine(models.Model):
+    """
+    A trip's planned or driven route as a simplified encoded polyline, with
+    the cumulative miles at each vertex for lookups along it.
+    """
+
+    PLANNED = "PLANNED"
+    DRIVEN = "DRIVEN"
+
+    trip = models.ForeignKey(Trip, on_delete=models.CASCADE, related_name="route_lines")
+    kind = models.CharField(
+        max_length=10, choices=[(PLANNED, "Planned"), (DRIVEN, "Driven")]
+    )
+    polyline = models.TextField(help_text="Encoded polyline of (lat, lon) vertices")
+    vertex_miles = models.BinaryField(
+        help_text="Cumulative miles at each vertex as little-endian float64"
+    )
+    tolerance_miles = models.FloatField(
+        help_text="Douglas-Peucker tolerance the vertices were simplified with"
+    )
+    source_key = models.CharField(
+        max_length=40,
+        blank=True,
+        help_text="Hash of the waypoints and router a planned route came from",
+    )
+    ended_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Time of the last breadcrumb folded into a driven route",
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("trip", "kind")
+
+    def __str__(self):
+        return f"{self.get_kind_display()} route for Trip {self.trip_id}"
+
+
+class EngineState(models.Model):
+    """
+    Last engine sample received for a trip: the telemetry aggregator's whole
+    carried-over state, so samples are folded into totals as they arrive
+    without being stored.
+    """
+
+    trip = models.OneToOneField(
+        Trip, on_delete=models.CASCADE, primary_key=True, related_name="engine_state"
+    )
+    recorded_at = models.DateTimeField()
+    ignition = models.BooleanField()
+    rpm = models.FloatField(null=True, blank=True)
+    speed_mph = models.FloatField(null=True, blank=True)
+    fuel_level = models.FloatField(
+        null=True, blank=True, help_text="Gallons in the tank"
+    )
+
+    def __str__(self):
+        return f"Engine state for Trip {self.trip_id} at {self.recorded_at}"
+
+
+class EngineDayQuerySet(models.QuerySet):
+    def add_totals(self, trip_id, totals_by_day):
+        """
+        Adds per-day ``(engine_hours, idle_hours, fuel_consumed)`` deltas with
+        one UPDATE per touched day, creating the day row on first use.
+        """
+        with transaction.atomic():
+            for day, (engine, idle, fuel) in totals_by_day.items():
+                if not (engine or idle or fuel):
+                    continue
+                increments = {
+                    "engine_hours": F("engine_hours") + engine,
+                    "idle_hours": F("idle_hours") + idle,
+                    "fuel_consumed": F("fuel_consumed") + fuel,
+                    "updated_at": timezone.now(),
+                }
+                updated = self.filter(trip_id=trip_id, date=day).update(**increments)
+                if not updated:
+                    _, created = self.get_or_create(
+                        trip_id=trip_id,
+                        date=day,
+                        defaults={
+                            "engine_hours": engine,
+                            "idle_hours": idle,
+                            "fuel_consumed": fuel,
+                        },
+                    )
+                    if not created:
+                        self.filter(trip_id=trip_id, date=day).update(**increments)
+
+
+class EngineDay(models.Model):
+    """
+    Running engine totals of a trip's log day, folded from telemetry and
+    copied into the day's ELDLog by ``flush_engine_totals``.
+    """
+
+    trip = models.ForeignKey(Trip, on_delete=models.CASCADE, related_name="engine_days")
+    date = models.DateField()
+    engine_hours = models.FloatField(default=0.0)
+    idle_hours = models.FloatField(default=0.0)
+    fuel_consumed = models.FloatField(default=0.0, help_text="Gallons")
+    updated_at = models.DateTimeField(auto_now=True)
+    flushed_at = models.DateTimeField(
+        null=True, blank=True, help_text="updated_at as of the last flush"
+    )
+
+    objects = EngineDayQuerySet.as_manager()
+
+    class Meta:
+        unique_together = ("trip", "date")
+        indexes = [
+            models.Index(
+                fields=["trip", "date"],
+                condition=(
+                    models.Q(flushed_at__isnull=True)
+                    | models.Q(flushed_at__lt=F("updated_at"))
+                ),
+                name="engine_day_unflushed",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.engine_hours:.2f}h engine for Trip {self.trip_id} on {self.date}"
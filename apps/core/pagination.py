@@ -0,0 +1,30 @@
+from rest_framework.pagination import CursorPagination
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination: each page is fetched with ``WHERE key > last seen``
+    on an indexed ordering, so page N costs the same as page 1. Cursors are
+    opaque base64 tokens in the ``next``/``previous`` links. Subclasses end
+    ``ordering`` with a unique field so rows that share a key keep a stable
+    order across pages.
+    """
+
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 500
+
+
+class TripPagination(KeysetPagination):
+    # Newest first; served by the (driver, start_time) and start_time indexes.
+    ordering = ("-start_time", "-id")
+
+
+class DutyStatusPagination(KeysetPagination):
+    # Served by the (trip, start_time) index.
+    ordering = ("start_time", "id")
+
+
+class ELDLogPagination(KeysetPagination):
+    # (trip, date) is unique, so the date alone is a stable key.
+    ordering = ("date",)
@@ -0,0 +1,165 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .cycle import cycle_hours_for_trip
+from .geo import lat_lon
+from .hos_logic import (
+    DROPOFF_HOURS,
+    ENGINE_CLOSED_FORM,
+    PICKUP_HOURS,
+    HOSCalculator,
+    Waypoint,
+)
+from .poi import get_poi_index, snap_stops
+from .routing import get_road_graph
+from .segments import DROPOFF, PICKUP, STOP
+
+# Bump when the planner output changes so stale entries are ignored.
+PLAN_CACHE_VERSION = 5
+HITS_KEY = "plan-cache:hits"
+MISSES_KEY = "plan-cache:misses"
+
+
+def get_plan_cache():
+    return caches[getattr(settings, "PLAN_CACHE_ALIAS", "plans")]
+
+
+def trip_waypoints(trip, stops=None):
+    """
+    The route planned for ``trip``: the deadhead leg from its current location
+    while the trip is still planned, then pickup, intermediate stops in order,
+    and dropoff. Pass ``stops`` when they have already been fetched.
+    """
+    if stops is None:
+        stops = trip.stops.all()
+    pickup = trip.get_pickup_location()
+    waypoints = [Waypoint(lat_lon(pickup), PICKUP, PICKUP_HOURS)]
+    current = trip.get_current_location()
+    if trip.status == "PLANNED" and current != pickup:
+        waypoints.insert(0, Waypoint(lat_lon(current), STOP, 0.0))
+    waypoints.extend(
+        Waypoint(lat_lon(stop.get_location()), STOP, stop.on_duty_hours)
+        for stop in stops
+    )
+    waypoints.append(
+        Waypoint(lat_lon(trip.get_dropoff_location()), DROPOFF, DROPOFF_HOURS)
+    )
+    return waypoints
+
+
+def is_single_leg(waypoints):
+    """True for plain pickup-to-dropoff routes, which the batch planner handles."""
+    return len(waypoints) == 2 and waypoints[0].description == PICKUP
+
+
+def plan_cache_key(
+    start_time,
+    waypoints,
+    cycle_hours,
+    engine=ENGINE_CLOSED_FORM,
+    router=None,
+    pois=None,
+):
+    """Cache key derived from every input the planner reads."""
+    raw = "|".join(
+        repr(value)
+        for value in (
+            engine,
+            router.fingerprint if router is not None else "haversine",
+            pois.fingerprint if pois is not None else "no-pois",
+            getattr(settings, "POI_CORRIDOR_MILES", None),
+            start_time.isoformat(),
+            cycle_hours,
+            *(
+                (*waypoint.location, waypoint.description, waypoint.on_duty_hours)
+                for waypoint in waypoints
+            ),
+        )
+    )
+    return f"plan:{hashlib.sha1(raw.encode()).hexdigest()}"
+
+
+def trip_index_key(trip_id):
+    return f"plan-trip:{trip_id}"
+
+
+def _increment(cache, key):
+    try:
+        cache.incr(key, version=PLAN_CACHE_VERSION)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None, version=PLAN_CACHE_VERSION):
+            cache.incr(key, version=PLAN_CACHE_VERSION)
+
+
+def get_trip_plan(trip, engine=ENGINE_CLOSED_FORM, stops=None, cycle_hours=None):
+    """
+    Returns the HOS plan for ``trip``, served from the plan cache when the
+    trip's planning inputs have been seen before. Cycle hours come from the
+    driver's rolling 8-day index and the route from ``trip_waypoints``, so new
+    duty statuses or stops change the key rather than needing an explicit
+    invalidation.
+
+    Plain pickup-to-dropoff trips go through ``plan_trip`` so they match the
+    batch planner; anything with a deadhead leg or stops uses ``plan_route``.
+    Every segment is located along the route geometry. Distances are road
+    miles when ``ROAD_GRAPH_PATH`` is configured, and stops are placed at
+    fuel stations and rest areas when ``POI_PATH`` is. Pass ``stops`` and
+    ``cycle_hours`` when they have already been loaded for many trips.
+    """
+    cache = get_plan_cache()
+    if cycle_hours is None:
+        cycle_hours = cycle_hours_for_trip(trip)
+    waypoints = trip_waypoints(trip, stops)
+    router = get_road_graph()
+    pois = get_poi_index()
+    key = plan_cache_key(trip.start_time, waypoints, cycle_hours, engine, router, pois)
+    plan = cache.get(key, version=PLAN_CACHE_VERSION)
+    if plan is not None:
+        _increment(cache, HITS_KEY)
+        return plan
+
+    _increment(cache, MISSES_KEY)
+    calculator = HOSCalculator(
+        start_time=trip.start_time,
+        current_cycle_hours=cycle_hours,
+        pickup_location=waypoints[0].location,
+        dropoff_location=waypoints[-1].location,
+        engine=engine,
+        router=router,
+    )
+    if is_single_leg(waypoints):
+        plan = calculator.plan_trip()
+    else:
+        plan = calculator.plan_route(waypoints)
+    plan["duty_statuses"].locate(
+        calculator.route_geometry([waypoint.location for waypoint in waypoints])
+    )
+    if pois is not None:
+        snap_stops(plan["duty_statuses"], pois, settings.POI_CORRIDOR_MILES)
+    cache.set_many(
+        {key: plan, trip_index_key(trip.id): key}, version=PLAN_CACHE_VERSION
+    )
+    return plan
+
+
+def invalidate_trip_plan(trip_id):
+    cache = get_plan_cache()
+    index_key = trip_index_key(trip_id)
+    key = cache.get(index_key, version=PLAN_CACHE_VERSION)
+    cache.delete_many([k for k in (key, index_key) if k], version=PLAN_CACHE_VERSION)
+
+
+def get_plan_cache_stats():
+    cache = get_plan_cache()
+    counters = cache.get_many([HITS_KEY, MISSES_KEY], version=PLAN_CACHE_VERSION)
+    hits = counters.get(HITS_KEY, 0)
+    misses = counters.get(MISSES_KEY, 0)
+    lookups = hits + misses
+    return {
+        "backend": f"{type(cache).__module__}.{type(cache).__name__}",
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / lookups if lookups else 0.0,
+    }
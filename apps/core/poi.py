@@ -0,0 +1,209 @@
+"""
+Fuel stations and rest areas for placing the planner's stops.
+
+POIs are loaded from a CSV or GeoJSON file into a uniform lat/lon grid: the
+points are sorted by cell so each cell is a contiguous slice, and a radius
+query only computes distances for the handful of cells around the query
+point. After a plan is made, ``snap_stops`` moves each fuel stop, break and
+reset to the nearest eligible POI within the corridor around the route.
+"""
+
+import csv
+import hashlib
+import json
+import math
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+from .geo import haversine_miles
+from .segments import BREAK, FUEL, RESET, RESTART
+
+FUEL_STATION = "fuel"
+REST_AREA = "rest_area"
+KINDS = (FUEL_STATION, REST_AREA)
+# OSM tags that identify each kind in GeoJSON exports.
+OSM_KINDS = {("amenity", "fuel"): FUEL_STATION, ("highway", "rest_area"): REST_AREA}
+
+# Which POIs each kind of planned stop may use.
+ELIGIBLE_KINDS = {
+    FUEL: (FUEL_STATION,),
+    BREAK: (FUEL_STATION, REST_AREA),
+    RESET: (FUEL_STATION, REST_AREA),
+    RESTART: (FUEL_STATION, REST_AREA),
+}
+
+MILES_PER_DEGREE_LAT = 69.0
+DEFAULT_CELL_DEGREES = 0.25
+
+
+class POIIndex:
+    """Grid index over POI coordinates; ``kind`` holds codes into ``KINDS``."""
+
+    def __init__(self, names, lat, lon, kind, cell_degrees=DEFAULT_CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        rows = np.floor(np.asarray(lat, dtype=np.float64) / cell_degrees)
+        cols = np.floor(np.asarray(lon, dtype=np.float64) / cell_degrees)
+        order = np.lexsort((cols, rows))
+        self.names = [names[i] for i in order]
+        self.lat = np.asarray(lat, dtype=np.float64)[order]
+        self.lon = np.asarray(lon, dtype=np.float64)[order]
+        self.kind = np.asarray(kind, dtype=np.int8)[order]
+
+        rows, cols = rows[order].astype(np.int64), cols[order].astype(np.int64)
+        boundaries = np.flatnonzero((np.diff(rows) != 0) | (np.diff(cols) != 0)) + 1
+        starts = np.concatenate(([0], boundaries))
+        ends = np.concatenate((boundaries, [len(order)]))
+        self.cells = {
+            (int(rows[start]), int(cols[start])): (int(start), int(end))
+            for start, end in zip(starts, ends)
+        }
+
+        digest = hashlib.sha1()
+        for array in (self.lat, self.lon, self.kind):
+            digest.update(array.tobytes())
+        digest.update("\0".join(self.names).encode())
+        self.fingerprint = digest.hexdigest()
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def from_records(cls, records, **kwargs):
+        """Builds the index from ``(name, lat, lon, kind)`` tuples."""
+        records = [r for r in records if r[3] in KINDS]
+        return cls(
+            names=[r[0] for r in records],
+            lat=[r[1] for r in records],
+            lon=[r[2] for r in records],
+            kind=[KINDS.index(r[3]) for r in records],
+            **kwargs,
+        )
+
+    @classmethod
+    def from_csv(cls, path, **kwargs):
+        """CSV with ``name``, ``latitude``, ``longitude`` and ``kind`` columns."""
+        with open(path, newline="") as source:
+            return cls.from_records(
+                (
+                    (
+                        row["name"],
+                        float(row["latitude"]),
+                        float(row["longitude"]),
+                        row["kind"],
+                    )
+                    for row in csv.DictReader(source)
+                ),
+                **kwargs,
+            )
+
+    @classmethod
+    def from_geojson(cls, path, **kwargs):
+        """
+        FeatureCollection of Points. The kind comes from a ``kind`` property or
+        from the OSM ``amenity=fuel`` / ``highway=rest_area`` tags.
+        """
+        with open(path) as source:
+            features = json.load(source)["features"]
+
+        def records():
+            for feature in features:
+                geometry = feature.get("geometry") or {}
+                if geometry.get("type") != "Point":
+                    continue
+                properties = feature.get("properties") or {}
+                kind = properties.get("kind") or next(
+                    (
+                        kind
+                        for (key, value), kind in OSM_KINDS.items()
+                        if properties.get(key) == value
+                    ),
+                    None,
+                )
+                lon, lat = geometry["coordinates"][:2]
+                yield properties.get("name", ""), float(lat), float(lon), kind
+
+        return cls.from_records(records(), **kwargs)
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        path = Path(path)
+        if path.suffix.lower() in (".json", ".geojson"):
+            return cls.from_geojson(path, **kwargs)
+        return cls.from_csv(path, **kwargs)
+
+    def nearest(self, lat, lon, radius_miles, kinds=KINDS):
+        """
+        Index of the nearest POI of one of ``kinds`` within ``radius_miles``
+        of ``(lat, lon)``, or None.
+        """
+        cell = self.cell_degrees
+        lat_span = radius_miles / MILES_PER_DEGREE_LAT
+        lon_span = lat_span / max(
+            math.cos(math.radians(min(abs(lat) + lat_span, 89.0))), 1e-6
+        )
+        row_range = range(
+            math.floor((lat - lat_span) / cell), math.floor((lat + lat_span) / cell) + 1
+        )
+        col_range = range(
+            math.floor((lon - lon_span) / cell), math.floor((lon + lon_span) / cell) + 1
+        )
+        slices = [
+            self.cells[key]
+            for key in ((row, col) for row in row_range for col in col_range)
+            if key in self.cells
+        ]
+        if not slices:
+            return None
+        candidates = np.concatenate([np.arange(lo, hi) for lo, hi in slices])
+        codes = [KINDS.index(kind) for kind in kinds]
+        candidates = candidates[np.isin(self.kind[candidates], codes)]
+        if not len(candidates):
+            return None
+        distances = haversine_miles(
+            lat, lon, self.lat[candidates], self.lon[candidates]
+        )
+        best = int(np.argmin(distances))
+        if distances[best] > radius_miles:
+            return None
+        return int(candidates[best])
+
+    def place(self, index):
+        return (self.names[index], float(self.lat[index]), float(self.lon[index]))
+
+
+def snap_stops(segments, index, corridor_miles):
+    """
+    Places the fuel stops, breaks and resets of ``segments`` (DutySegments,
+    already located along the route) at the nearest eligible POI within
+    ``corridor_miles`` of where the plan reaches them. Placed stops take the
+    POI's coordinates; stops with no POI in range are left as they are.
+    """
+    for position, description in enumerate(segments.description):
+        kinds = ELIGIBLE_KINDS.get(description)
+        if kinds is None:
+            continue
+        found = index.nearest(
+            segments.latitude[position],
+            segments.longitude[position],
+            corridor_miles,
+            kinds,
+        )
+        if found is not None:
+            _, lat, lon = segments.places[position] = index.place(found)
+            segments.latitude[position] = lat
+            segments.longitude[position] = lon
+    return segments
+
+
+@lru_cache(maxsize=None)
+def _load_index(path):
+    return POIIndex.load(path)
+
+
+def get_poi_index():
+    """The POIs at ``settings.POI_PATH``, or None when unset."""
+    path = getattr(settings, "POI_PATH", "")
+    return _load_index(str(path)) if path else None
@@ -0,0 +1,103 @@
+"""
+Faster JSON and a MessagePack wire format for the API.
+
+Both libraries are optional. Without orjson the JSON renderer and parser fall
+back to DRF's stdlib implementation; without msgpack the MessagePack classes
+are left out of the REST_FRAMEWORK settings. Clients pick the format with
+``Accept`` and ``Content-Type`` (``application/msgpack``). MessagePack
+responses carry the same values as the JSON ones, datetimes and decimals
+included, so clients can share their models between the two.
+"""
+
+import json
+from decimal import Decimal
+
+from rest_framework import parsers, renderers
+from rest_framework.exceptions import ParseError
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+_encoder = JSONEncoder()
+
+
+def _default(obj):
+    """Types neither library encodes, rendered as the API renders them."""
+    if isinstance(obj, Decimal):
+        return str(obj) if api_settings.COERCE_DECIMAL_TO_STRING else float(obj)
+    return _encoder.default(obj)
+
+
+class ORJSONRenderer(renderers.JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b""
+        option = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+        option |= orjson.OPT_SERIALIZE_NUMPY
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=_default, option=option)
+
+
+class ORJSONParser(parsers.JSONParser):
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
+
+
+class NDJSONParser(parsers.BaseParser):
+    """Newline-delimited JSON: a list with one item per non-blank line."""
+
+    media_type = NDJSON_MEDIA_TYPE
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        loads = orjson.loads if orjson is not None else json.loads
+        items = []
+        for number, line in enumerate(stream.read().splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                items.append(loads(line))
+            except ValueError as exc:
+                raise ParseError(f"NDJSON parse error on line {number} - {exc}")
+        return items
+
+
+class MessagePackRenderer(renderers.BaseRenderer):
+    media_type = MSGPACK_MEDIA_TYPE
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=_default, use_bin_type=True)
+
+
+class MessagePackParser(parsers.BaseParser):
+    media_type = MSGPACK_MEDIA_TYPE
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, TypeError) as exc:
+            raise ParseError(f"MessagePack parse error - {exc}")
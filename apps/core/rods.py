@@ -0,0 +1,234 @@
+"""
+Records-of-duty-status bundle for roadside inspections.
+
+An inspector needs the current log day and the seven before it. The bundle
+is one SVG with a page per day: a header, the four-row duty status graph,
+per-row totals and the remarks for each change of status. Pages for closed
+days cannot change unless their inputs do, so each is cached under the
+sha256 of everything it is drawn from and is never invalidated; only the
+current day is rendered on every request. ``render_bundle`` yields the
+document piece by piece so the response can be streamed.
+"""
+
+import hashlib
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from xml.sax.saxutils import escape, quoteattr
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import DutyStatus, ELDLog
+from .segments import STATUSES
+
+# Bump when the drawing changes so cached pages are not reused.
+RODS_VERSION = 1
+BUNDLE_DAYS = 8
+
+ROW_LABELS = ("Off Duty", "Sleeper Berth", "Driving", "On Duty")
+PAGE_WIDTH = 960
+DAY_HEIGHT = 420
+GRID_LEFT = 110
+GRID_TOP = 80
+GRID_WIDTH = 720
+ROW_HEIGHT = 30
+REMARKS_TOP = GRID_TOP + len(STATUSES) * ROW_HEIGHT + 40
+REMARK_LINE = 14
+MAX_REMARKS = 9
+STYLE = (
+    "text{font:12px sans-serif}.h{font-weight:bold;font-size:14px}"
+    ".row{fill:none;stroke:#333}.tick{stroke:#999}"
+    ".duty{fill:none;stroke:#0645ad;stroke-width:2}"
+)
+
+
+def get_rods_cache():
+    return caches[getattr(settings, "RODS_CACHE_ALIAS", "rods")]
+
+
+def _wall_minutes(moment):
+    return moment.hour * 60 + moment.minute + moment.second / 60.0
+
+
+def _x(minutes):
+    return round(GRID_LEFT + minutes * GRID_WIDTH / 1440.0, 2)
+
+
+def _row_y(code):
+    return GRID_TOP + code * ROW_HEIGHT + ROW_HEIGHT / 2
+
+
+def bundle_days(current_day):
+    """The current day and the seven before it, oldest first."""
+    return [current_day - timedelta(days=n) for n in range(BUNDLE_DAYS - 1, -1, -1)]
+
+
+def day_inputs(driver, current_day, tz):
+    """
+    Everything the bundle's pages are drawn from, per day: the recorded duty
+    statuses clipped to the day as ``(code, start_minute, end_minute,
+    location, remarks, vehicle)`` and the day's logged miles. Two queries
+    cover all eight days.
+    """
+    days = bundle_days(current_day)
+    window_start = datetime.combine(days[0], time.min, tzinfo=tz)
+    window_end = datetime.combine(current_day + timedelta(days=1), time.min, tzinfo=tz)
+    rows = (
+        DutyStatus.objects.filter(
+            trip__driver=driver,
+            is_planned=False,
+            start_time__lt=window_end,
+            end_time__gt=window_start,
+        )
+        .order_by("start_time")
+        .values_list(
+            "status",
+            "start_time",
+            "end_time",
+            "location_description",
+            "remarks",
+            "trip__vehicle__vehicle_number",
+        )
+    )
+    statuses = defaultdict(list)
+    for status, start_time, end_time, location, remarks, vehicle in rows:
+        cursor = max(start_time, window_start).astimezone(tz)
+        end = min(end_time, window_end).astimezone(tz)
+        while cursor < end:
+            next_midnight = datetime.combine(
+                cursor.date() + timedelta(days=1), time.min, tzinfo=tz
+            )
+            segment_end = min(end, next_midnight)
+            statuses[cursor.date()].append(
+                (
+                    STATUSES.index(status),
+                    round(_wall_minutes(cursor), 2),
+                    (
+                        1440.0
+                        if segment_end == next_midnight
+                        else round(_wall_minutes(segment_end), 2)
+                    ),
+                    location,
+                    remarks,
+                    vehicle,
+                )
+            )
+            cursor = segment_end
+
+    miles = defaultdict(float)
+    for day, total in ELDLog.objects.filter(
+        trip__driver=driver, date__gte=days[0], date__lte=current_day
+    ).values_list("date", "total_miles"):
+        miles[day] += total
+    return {day: (tuple(statuses[day]), round(miles[day], 1)) for day in days}
+
+
+def render_day(day, header, statuses, miles):
+    """SVG fragment for one day's page, positioned at the origin."""
+    driver_name, license_number, carrier, office, tz_name = header
+    vehicles = sorted({vehicle for *_, vehicle in statuses})
+    parts = [
+        f'<text x="10" y="22" class="h">{escape(day.isoformat())} - '
+        f"{escape(driver_name)} ({escape(license_number)})</text>",
+        f'<text x="10" y="42">{escape(carrier)}, {escape(office)}. '
+        f"Home terminal time zone: {escape(tz_name)}</text>",
+        f'<text x="10" y="60">Vehicles: {escape(", ".join(vehicles) or "-")}. '
+        f"Total miles driving today: {miles:.1f}</text>",
+    ]
+
+    hours = [0.0] * len(STATUSES)
+    for code, start, end, *_ in statuses:
+        hours[code] += (end - start) / 60.0
+    for code, label in enumerate(ROW_LABELS):
+        top = GRID_TOP + code * ROW_HEIGHT
+        parts.append(
+            f'<rect x="{GRID_LEFT}" y="{top}" width="{GRID_WIDTH}" '
+            f'height="{ROW_HEIGHT}" class="row"/>'
+            f'<text x="10" y="{top + 19}">{label}</text>'
+            f'<text x="{GRID_LEFT + GRID_WIDTH + 12}" y="{top + 19}">'
+            f"{hours[code]:.2f}</text>"
+        )
+    bottom = GRID_TOP + len(STATUSES) * ROW_HEIGHT
+    for hour in range(25):
+        x = _x(hour * 60)
+        label = {0: "M", 12: "N", 24: "M"}.get(hour, str(hour % 12))
+        parts.append(
+            f'<line x1="{x}" y1="{GRID_TOP}" x2="{x}" y2="{bottom}" class="tick"/>'
+            f'<text x="{x - 4}" y="{GRID_TOP - 6}">{label}</text>'
+        )
+
+    if statuses:
+        path, previous_end = [], None
+        for code, start, end, *_ in statuses:
+            y = _row_y(code)
+            if previous_end == start:
+                path.append(f"V{y}")
+            else:
+                path.append(f"M{_x(start)} {y}")
+            path.append(f"H{_x(end)}")
+            previous_end = end
+        parts.append(f'<path d="{"".join(path)}" class="duty"/>')
+
+    parts.append(f'<text x="10" y="{REMARKS_TOP - 8}" class="h">Remarks</text>')
+    remarks = [
+        f"{int(start) // 60:02d}:{int(start) % 60:02d} {ROW_LABELS[code]}: "
+        f"{location}{f' ({note})' if note else ''}"
+        for code, start, _, location, note, _ in statuses
+    ]
+    if len(remarks) > MAX_REMARKS:
+        remarks[MAX_REMARKS - 1 :] = [f"... {len(remarks) - MAX_REMARKS + 1} more"]
+    for line, remark in enumerate(remarks):
+        parts.append(
+            f'<text x="10" y="{REMARKS_TOP + 8 + line * REMARK_LINE}">'
+            f"{escape(remark)}</text>"
+        )
+    return "".join(parts)
+
+
+def day_page_key(day, header, statuses, miles):
+    """Content address of a day's page: the sha256 of its inputs."""
+    raw = repr((RODS_VERSION, day.isoformat(), header, statuses, miles))
+    return "rods:" + hashlib.sha256(raw.encode()).hexdigest()
+
+
+def render_bundle(driver, current_day, stats=None):
+    """
+    Yields the SVG bundle for the eight log days ending on ``current_day``.
+    Closed days come from the content-addressed cache when present; the
+    current day is always drawn. ``stats``, when given, counts both.
+    """
+    carrier = driver.carrier
+    tz = carrier.get_timezone()
+    header = (
+        driver.user.get_full_name() or driver.user.get_username(),
+        driver.license_number,
+        carrier.name,
+        carrier.main_office_address,
+        carrier.home_terminal_timezone,
+    )
+    inputs = day_inputs(driver, current_day, tz)
+    cache = get_rods_cache()
+    height = DAY_HEIGHT * len(inputs)
+    yield (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{PAGE_WIDTH}" '
+        f'height="{height}" viewBox="0 0 {PAGE_WIDTH} {height}">'
+        f"<style>{STYLE}</style>"
+    )
+    for page, (day, (statuses, miles)) in enumerate(inputs.items()):
+        closed = day < current_day
+        key = day_page_key(day, header, statuses, miles)
+        fragment = cache.get(key) if closed else None
+        if fragment is None:
+            fragment = render_day(day, header, statuses, miles)
+            if closed:
+                cache.set(key, fragment, timeout=None)
+            if stats is not None:
+                stats["rendered"] += 1
+        elif stats is not None:
+            stats["cached"] += 1
+        yield (
+            f'<g transform="translate(0,{page * DAY_HEIGHT})" '
+            f"data-date={quoteattr(day.isoformat())}>{fragment}</g>"
+        )
+    yield "</svg>\n"
@@ -0,0 +1,310 @@
+"""
+Trip routes stored as simplified encoded polylines.
+
+Planned and driven geometry is thinned with Douglas-Peucker to
+``ROUTE_TOLERANCE_MILES`` and stored as one ``RouteLine`` per trip and kind:
+an encoded polyline (the format map clients decode natively) plus the
+cumulative miles at each vertex. The miles array turns "where is mile X"
+into a binary search over the vertices instead of a walk along the route.
+
+The planned line is stored when a plan is materialized; reading geometry
+never writes, and a stale stored line is rebuilt on the fly. Breadcrumbs of
+completed trips are folded into their driven line by ``compact_breadcrumbs``
+and then deleted; the raw points of open trips are appended on the fly when
+their geometry is read. Either way only the breadcrumbs after the stored
+line are simplified, so its vertices are never thinned twice.
+"""
+
+import hashlib
+
+import numpy as np
+import polyline
+from django.conf import settings
+from django.db import transaction
+
+from .geo import EARTH_RADIUS_KM, KM_TO_MILES, cumulative_miles, interpolate_along
+from .hos_logic import HOSCalculator
+from .models import Breadcrumb, RouteLine
+from .plan_cache import trip_waypoints
+from .routing import get_road_graph
+
+EARTH_RADIUS_MILES = EARTH_RADIUS_KM * KM_TO_MILES
+# Five decimals, about a meter: the precision map clients assume.
+PRECISION = 5
+
+
+def _unit_vectors(points):
+    lat, lon = np.radians(points[:, 0]), np.radians(points[:, 1])
+    return np.column_stack(
+        (np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat))
+    )
+
+
+def _offsets(vectors, start, end):
+    """
+    Miles from each unit vector in ``vectors`` to the great-circle arc
+    between the matching rows of ``start`` and ``end``.
+    """
+    to_start = np.einsum("ij,ij->i", vectors, start)
+    to_end = np.einsum("ij,ij->i", vectors, end)
+    nearer_end = np.arccos(np.clip(np.maximum(to_start, to_end), -1.0, 1.0))
+    normal = np.cross(start, end)
+    length = np.linalg.norm(normal, axis=1)
+    # Arcs whose ends coincide (a loop back to the start) have no normal.
+    arc = length > 1e-12
+    normal[arc] /= length[arc, None]
+    # The foot of a vector falls on the arc when it is on the inner side of
+    # both ends: (start x v) . n >= 0 and (v x end) . n >= 0.
+    between = (
+        arc
+        & (np.einsum("ij,ij->i", vectors, np.cross(normal, start)) >= 0)
+        & (np.einsum("ij,ij->i", vectors, np.cross(end, normal)) >= 0)
+    )
+    across = np.abs(
+        np.arcsin(np.clip(np.einsum("ij,ij->i", vectors, normal), -1.0, 1.0))
+    )
+    return np.where(between, across, nearer_end) * EARTH_RADIUS_MILES
+
+
+def simplify(points, tolerance_miles):
+    """
+    Douglas-Peucker over ``(lat, lon)`` points: the fewest vertices that keep
+    every dropped point within ``tolerance_miles`` of the line, measured along
+    the great circle. Every span still open is split in the same vectorized
+    pass, so the loop runs once per level of splitting rather than per span.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if len(points) < 3 or tolerance_miles <= 0:
+        return points
+    vectors = _unit_vectors(points)
+    keep = np.zeros(len(points), dtype=bool)
+    keep[[0, -1]] = True
+    first, last = np.array([0]), np.array([len(points) - 1])
+    while len(first):
+        sizes = last - first - 1
+        open_ = sizes > 0
+        first, last, sizes = first[open_], last[open_], sizes[open_]
+        if not len(first):
+            break
+        span = np.repeat(np.arange(len(first)), sizes)
+        offset = np.cumsum(sizes) - sizes
+        inner = np.arange(sizes.sum()) - offset[span] + first[span] + 1
+        offsets = _offsets(vectors[inner], vectors[first[span]], vectors[last[span]])
+        peak = np.maximum.reduceat(offsets, offset)
+        # The first point of each span that reaches its peak.
+        at_peak = np.flatnonzero(offsets == peak[span])
+        _, leading = np.unique(span[at_peak], return_index=True)
+        split = inner[at_peak[leading]]
+        far = peak > tolerance_miles
+        keep[split[far]] = True
+        first = np.concatenate((first[far], split[far]))
+        last = np.concatenate((split[far], last[far]))
+    return points[keep]
+
+
+class Line:
+    """Decoded vertices and cumulative miles of a route, with lookups."""
+
+    def __init__(self, points, vertex_miles, tolerance_miles):
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        self.vertex_miles = vertex_miles
+        self.tolerance_miles = tolerance_miles
+
+    @classmethod
+    def from_points(cls, points, tolerance_miles=None):
+        if tolerance_miles is None:
+            tolerance_miles = getattr(settings, "ROUTE_TOLERANCE_MILES", 0.01)
+        # Rounded as encoded, so the miles match the decoded vertices.
+        points = simplify(points, tolerance_miles).round(PRECISION)
+        return cls(points, cumulative_miles(points), tolerance_miles)
+
+    @classmethod
+    def from_model(cls, route_line):
+        return cls(
+            polyline.decode(route_line.polyline, PRECISION),
+            np.frombuffer(bytes(route_line.vertex_miles), dtype="<f8"),
+            route_line.tolerance_miles,
+        )
+
+    def extend(self, points):
+        """
+        This line followed by ``points``. Only the new tail is simplified,
+        from the current last vertex on, so the stored vertices are never
+        thinned a second time and the error stays within the tolerance.
+        """
+        tail = Line.from_points(
+            np.vstack((self.points[-1:], np.reshape(points, (-1, 2)))),
+            self.tolerance_miles,
+        )
+        return Line(
+            np.vstack((self.points, tail.points[1:])),
+            np.concatenate(
+                (self.vertex_miles, self.vertex_miles[-1] + tail.vertex_miles[1:])
+            ),
+            self.tolerance_miles,
+        )
+
+    @property
+    def miles(self):
+        return float(self.vertex_miles[-1])
+
+    def encode(self):
+        return polyline.encode(
+            [tuple(point) for point in self.points.tolist()], PRECISION
+        )
+
+    def model_fields(self):
+        return {
+            "polyline": self.encode(),
+            "vertex_miles": np.asarray(self.vertex_miles, dtype="<f8").tobytes(),
+            "tolerance_miles": self.tolerance_miles,
+        }
+
+    def position_at(self, miles):
+        """``[lon, lat]`` of the point ``miles`` along the line."""
+        latitude, longitude = interpolate_along(self.points, self.vertex_miles, [miles])
+        return [float(longitude[0]), float(latitude[0])]
+
+    def mile_at(self, longitude, latitude):
+        """
+        Miles along the line to the point on it nearest ``[longitude,
+        latitude]``. Segments are compared in a plane tangent at that point,
+        which is exact enough for the segments that can be nearest.
+        """
+        points, vertex_miles = self.points, self.vertex_miles
+        if len(points) == 1:
+            return 0.0
+        scale = np.array([1.0, np.cos(np.radians(latitude))])
+        local = (points - (latitude, longitude)) * scale
+        start, step = local[:-1], local[1:] - local[:-1]
+        length = (step * step).sum(axis=1)
+        fraction = np.divide(
+            -(start * step).sum(axis=1),
+            length,
+            out=np.zeros_like(length),
+            where=length > 0,
+        ).clip(0.0, 1.0)
+        nearest = start + fraction[:, None] * step
+        leg = int(np.argmin((nearest * nearest).sum(axis=1)))
+        return float(
+            vertex_miles[leg]
+            + fraction[leg] * (vertex_miles[leg + 1] - vertex_miles[leg])
+        )
+
+    def to_representation(self):
+        return {
+            "polyline": self.encode(),
+            "miles": round(self.miles, 2),
+            "vertices": len(self.points),
+            "tolerance_miles": self.tolerance_miles,
+        }
+
+
+def _planned(trip, stops, stored):
+    """``(line, key, fresh)`` for the trip's planned route; see ``planned_line``."""
+    tolerance = getattr(settings, "ROUTE_TOLERANCE_MILES", 0.01)
+    router = get_road_graph()
+    locations = [waypoint.location for waypoint in trip_waypoints(trip, stops)]
+    raw = repr(
+        (
+            router.fingerprint if router is not None else "haversine",
+            tolerance,
+            locations,
+        )
+    )
+    key = hashlib.sha1(raw.encode()).hexdigest()
+    if stored is not None and stored.source_key == key:
+        return Line.from_model(stored), key, False
+
+    calculator = HOSCalculator(
+        start_time=trip.start_time,
+        current_cycle_hours=0.0,
+        pickup_location=locations[0],
+        dropoff_location=locations[-1],
+        router=router,
+    )
+    line = Line.from_points(calculator.route_geometry(locations), tolerance)
+    return line, key, True
+
+
+def planned_line(trip, stops=None, stored=None):
+    """
+    The trip's planned route: ``stored`` when it was saved for the current
+    waypoints, road graph and tolerance, else rebuilt without saving it.
+    """
+    line, _, _ = _planned(trip, stops, stored)
+    return line
+
+
+def save_planned_line(trip, stops=None):
+    """Stores the trip's planned route unless the stored one is current."""
+    stored = RouteLine.objects.filter(trip=trip, kind=RouteLine.PLANNED).first()
+    line, key, fresh = _planned(trip, stops, stored)
+    if fresh:
+        RouteLine.objects.update_or_create(
+            trip=trip,
+            kind=RouteLine.PLANNED,
+            defaults={**line.model_fields(), "source_key": key},
+        )
+    return line
+
+
+def _new_breadcrumbs(trip_id, stored):
+    """
+    ``(points, last)``: the ``(lat, lon)`` breadcrumbs recorded after
+    ``stored`` ended, and when the latest of them was recorded.
+    """
+    crumbs = Breadcrumb.objects.filter(trip_id=trip_id)
+    if stored is not None and stored.ended_at is not None:
+        crumbs = crumbs.filter(recorded_at__gt=stored.ended_at)
+    crumbs = list(
+        crumbs.order_by("recorded_at").values_list(
+            "recorded_at", "latitude", "longitude"
+        )
+    )
+    points = [(latitude, longitude) for _, latitude, longitude in crumbs]
+    return points, crumbs[-1][0] if crumbs else None
+
+
+def _driven(stored, points):
+    """The stored driven line extended by ``points``, or None when both are empty."""
+    if stored is None:
+        return Line.from_points(points) if points else None
+    line = Line.from_model(stored)
+    return line.extend(points) if points else line
+
+
+def driven_line(trip_id, stored=None):
+    """The route driven so far, or None before the first breadcrumb."""
+    points, _ = _new_breadcrumbs(trip_id, stored)
+    return _driven(stored, points)
+
+
+def compact_breadcrumbs(trip_id):
+    """
+    Folds a trip's breadcrumbs into its stored driven line and deletes them.
+    Returns the number of breadcrumbs removed.
+    """
+    with transaction.atomic():
+        stored = (
+            RouteLine.objects.select_for_update()
+            .filter(trip_id=trip_id, kind=RouteLine.DRIVEN)
+            .first()
+        )
+        points, last = _new_breadcrumbs(trip_id, stored)
+        if last is not None:
+            RouteLine.objects.update_or_create(
+                trip_id=trip_id,
+                kind=RouteLine.DRIVEN,
+                defaults={
+                    **_driven(stored, points).model_fields(),
+                    "ended_at": last,
+                },
+            )
+        elif stored is None:
+            return 0
+        # Points older than the line's end arrived too late to be placed.
+        deleted, _ = Breadcrumb.objects.filter(
+            trip_id=trip_id, recorded_at__lte=last or stored.ended_at
+        ).delete()
+    return deleted
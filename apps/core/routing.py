@@ -0,0 +1,269 @@
+"""
+Offline road-network routing.
+
+An OSM XML extract is compiled once into a flat binary file: a fixed header
+followed by node coordinates and a CSR adjacency list (``offsets``,
+``targets``, ``weights`` in miles). ``RoadGraph.load`` memory-maps that file,
+so workers share the pages and start-up does no parsing. Shortest paths are
+found with A* using the great-circle distance as the heuristic, which is
+admissible because every edge weight is the great-circle length of that
+road segment.
+"""
+
+import hashlib
+import heapq
+import math
+import struct
+import xml.etree.ElementTree as ET
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+from .geo import EARTH_RADIUS_KM, KM_TO_MILES, haversine_miles, leg_distances
+
+MAGIC = b"RPGRAPH\0"
+FORMAT_VERSION = 1
+# magic, version, flags, node count, edge count, sha1 of the arrays
+HEADER = struct.Struct("<8sIIqq20s4x")
+
+# OSM highway types a truck can be routed over.
+DRIVABLE_HIGHWAYS = frozenset(
+    {
+        "motorway",
+        "motorway_link",
+        "trunk",
+        "trunk_link",
+        "primary",
+        "primary_link",
+        "secondary",
+        "secondary_link",
+        "tertiary",
+        "tertiary_link",
+        "unclassified",
+        "residential",
+        "living_street",
+    }
+)
+IMPLIED_ONEWAY = frozenset({"motorway", "motorway_link"})
+
+
+class NoRouteError(ValueError):
+    """Raised when no road path connects two points."""
+
+
+def _read_osm(osm_path):
+    """Node coordinates and directed node-id pairs of the drivable ways."""
+    coordinates = {}
+    edges = []
+    for _, element in ET.iterparse(str(osm_path), events=("end",)):
+        if element.tag == "node":
+            coordinates[int(element.get("id"))] = (
+                float(element.get("lat")),
+                float(element.get("lon")),
+            )
+        elif element.tag == "way":
+            tags = {tag.get("k"): tag.get("v") for tag in element.iter("tag")}
+            highway = tags.get("highway")
+            if highway in DRIVABLE_HIGHWAYS:
+                refs = [int(nd.get("ref")) for nd in element.iter("nd")]
+                oneway = tags.get("oneway")
+                if oneway == "-1":
+                    refs.reverse()
+                forward_only = (
+                    oneway in ("yes", "true", "1", "-1")
+                    or tags.get("junction") == "roundabout"
+                    or (highway in IMPLIED_ONEWAY and oneway != "no")
+                )
+                for a, b in zip(refs, refs[1:]):
+                    edges.append((a, b))
+                    if not forward_only:
+                        edges.append((b, a))
+        if element.tag in ("node", "way", "relation"):
+            element.clear()
+    return coordinates, edges
+
+
+def compile_osm(osm_path, output_path):
+    """
+    Compiles an OSM XML extract into the binary graph format and returns the
+    node and edge counts. Only nodes used by drivable ways are kept.
+    """
+    coordinates, edges = _read_osm(osm_path)
+    osm_ids = sorted({node for edge in edges for node in edge})
+    index = {osm_id: i for i, osm_id in enumerate(osm_ids)}
+    lat = np.array([coordinates[osm_id][0] for osm_id in osm_ids], dtype=np.float64)
+    lon = np.array([coordinates[osm_id][1] for osm_id in osm_ids], dtype=np.float64)
+
+    pairs = np.array([(index[a], index[b]) for a, b in edges], dtype=np.int64).reshape(
+        -1, 2
+    )
+    order = np.lexsort((pairs[:, 1], pairs[:, 0]))
+    sources, targets = pairs[order, 0], pairs[order, 1].astype(np.int32)
+    weights = haversine_miles(
+        lat[sources], lon[sources], lat[targets], lon[targets]
+    ).astype(np.float32)
+    offsets = np.zeros(len(osm_ids) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=len(osm_ids)), out=offsets[1:])
+
+    arrays = (lat, lon, offsets, targets, weights)
+    digest = hashlib.sha1()
+    for array in arrays:
+        digest.update(array.tobytes())
+    with open(output_path, "wb") as output:
+        output.write(
+            HEADER.pack(
+                MAGIC, FORMAT_VERSION, 0, len(osm_ids), len(targets), digest.digest()
+            )
+        )
+        for array in arrays:
+            output.write(array.tobytes())
+    return len(osm_ids), len(targets)
+
+
+class RoadGraph:
+    """A compiled road graph, memory-mapped read-only from disk."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        buffer = np.memmap(self.path, dtype=np.uint8, mode="r")
+        magic, version, _, nodes, edges, digest = HEADER.unpack(
+            buffer[: HEADER.size].tobytes()
+        )
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{self.path} is not a compiled road graph")
+        self.fingerprint = digest.hex()
+
+        position = HEADER.size
+
+        def take(dtype, count):
+            # Plain ndarray views over the map: indexing a np.memmap subclass
+            # costs several times more per element in the A* inner loop.
+            nonlocal position
+            view = np.frombuffer(buffer, dtype=dtype, count=count, offset=position)
+            position += view.nbytes
+            return view
+
+        self.lat = take(np.float64, nodes)
+        self.lon = take(np.float64, nodes)
+        self.offsets = take(np.int64, nodes + 1)
+        self.targets = take(np.int32, edges)
+        self.weights = take(np.float32, edges)
+        self._cos_lat = None
+
+    @classmethod
+    def load(cls, path):
+        return cls(path)
+
+    @property
+    def node_count(self):
+        return len(self.lat)
+
+    @property
+    def edge_count(self):
+        return len(self.targets)
+
+    def nearest_node(self, lat, lon):
+        """Index of the graph node closest to ``(lat, lon)``."""
+        if self._cos_lat is None:
+            self._cos_lat = np.cos(np.radians(self.lat))
+        dlat = self.lat - lat
+        dlon = (self.lon - lon + 180.0) % 360.0 - 180.0
+        return int(np.argmin(dlat * dlat + (dlon * self._cos_lat) ** 2))
+
+    def shortest_path(self, source, target):
+        """
+        A* from node ``source`` to node ``target``. Returns the path length in
+        miles and the list of node indices, or raises ``NoRouteError``.
+        """
+        offsets, targets, weights = self.offsets, self.targets, self.weights
+        goal_lat = math.radians(self.lat[target])
+        goal_lon = math.radians(self.lon[target])
+        cos_goal = math.cos(goal_lat)
+        radius = EARTH_RADIUS_KM * KM_TO_MILES
+
+        latitudes, longitudes = self.lat, self.lon
+        estimates = {}
+
+        def heuristic(node):
+            estimate = estimates.get(node)
+            if estimate is None:
+                lat = math.radians(latitudes[node])
+                lon = math.radians(longitudes[node])
+                a = (
+                    math.sin((goal_lat - lat) / 2) ** 2
+                    + math.cos(lat) * cos_goal * math.sin((goal_lon - lon) / 2) ** 2
+                )
+                estimate = estimates[node] = (
+                    2 * radius * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+                )
+            return estimate
+
+        best = {source: 0.0}
+        parent = {source: None}
+        # Ties on the estimate go to the entry that has travelled furthest,
+        # which keeps A* from fanning out across grids of equal-length blocks.
+        queue = [(heuristic(source), -0.0, source)]
+        settled = set()
+        while queue:
+            _, cost, node = heapq.heappop(queue)
+            cost = -cost
+            if node == target:
+                path = [node]
+                while parent[path[-1]] is not None:
+                    path.append(parent[path[-1]])
+                return cost, path[::-1]
+            if node in settled:
+                continue
+            settled.add(node)
+            lo, hi = int(offsets[node]), int(offsets[node + 1])
+            for neighbour, weight in zip(
+                targets[lo:hi].tolist(), weights[lo:hi].tolist()
+            ):
+                candidate = cost + weight
+                if candidate < best.get(neighbour, math.inf):
+                    best[neighbour] = candidate
+                    parent[neighbour] = node
+                    heapq.heappush(
+                        queue,
+                        (candidate + heuristic(neighbour), -candidate, neighbour),
+                    )
+        raise NoRouteError(f"No road route between nodes {source} and {target}")
+
+    def route_path(self, origin, destination):
+        """
+        Road geometry between two ``(lat, lon)`` points: the origin, the nodes
+        of the shortest path between their nearest nodes, and the destination.
+        Results are memoized, since a plan asks for each leg more than once.
+        """
+        return self._route_path(tuple(origin), tuple(destination))
+
+    @lru_cache(maxsize=1024)
+    def _route_path(self, origin, destination):
+        _, nodes = self.shortest_path(
+            self.nearest_node(*origin), self.nearest_node(*destination)
+        )
+        return (
+            [origin]
+            + list(zip(self.lat[nodes].tolist(), self.lon[nodes].tolist()))
+            + [destination]
+        )
+
+    def route_miles(self, origin, destination):
+        """
+        Road miles between two ``(lat, lon)`` points: the shortest path between
+        their nearest nodes plus the straight-line hops onto the network.
+        """
+        return float(leg_distances(self.route_path(origin, destination)).sum())
+
+
+@lru_cache(maxsize=None)
+def _load_graph(path):
+    return RoadGraph.load(path)
+
+
+def get_road_graph():
+    """The graph at ``settings.ROAD_GRAPH_PATH``, or None when unset."""
+    path = getattr(settings, "ROAD_GRAPH_PATH", "")
+    return _load_graph(str(path)) if path else None
@@ -0,0 +1,170 @@
+"""
+Read-only serializers for the busiest list endpoints.
+
+A DRF ModelSerializer builds a field tree and walks it for every instance.
+These serializers fetch plain dicts with ``QuerySet.values`` and turn each
+row into the response with converters compiled once per request, producing
+the same JSON as TripSerializer and DutyStatusSerializer.
+"""
+
+from collections import defaultdict
+from operator import itemgetter
+
+from django.utils import timezone
+
+from .models import TripStop
+
+
+def _datetime(tz):
+    """DRF DateTimeField output: ISO 8601 in the current zone, UTC as "Z"."""
+
+    def convert(value):
+        if value is None:
+            return None
+        value = value.astimezone(tz).isoformat()
+        return value[:-6] + "Z" if value.endswith("+00:00") else value
+
+    return convert
+
+
+def _float(value):
+    return None if value is None else float(value)
+
+
+def _point(longitude, latitude):
+    return lambda row: [row[longitude], row[latitude]]
+
+
+class RowSerializer:
+    """
+    Subclasses list ``fields`` as ``(name, lookup, kind)`` in output order;
+    ``kind`` is "raw", "float" or "datetime". A ``kind`` of "point" takes a
+    ``(longitude, latitude)`` pair of lookups and renders ``[lon, lat]``.
+    """
+
+    fields = ()
+
+    def __init__(self):
+        tz = timezone.get_current_timezone()
+        converters = {"raw": None, "float": _float, "datetime": _datetime(tz)}
+        self.lookups = []
+        self.getters = []
+        for name, lookup, kind in self.fields:
+            if kind == "point":
+                self.lookups.extend(lookup)
+                self.getters.append((name, _point(*lookup)))
+                continue
+            self.lookups.append(lookup)
+            get = itemgetter(lookup)
+            convert = converters[kind]
+            if convert is not None:
+                get = (lambda get, convert: lambda row: convert(get(row)))(get, convert)
+            self.getters.append((name, get))
+
+    def values(self, queryset):
+        """``queryset`` narrowed to the dicts this serializer reads."""
+        return queryset.values(*self.lookups)
+
+    def to_representation(self, rows):
+        getters = self.getters
+        return [{name: get(row) for name, get in getters} for row in rows]
+
+
+class DutyStatusRowSerializer(RowSerializer):
+    fields = (
+        ("id", "id", "raw"),
+        ("trip", "trip_id", "raw"),
+        ("status", "status", "raw"),
+        ("start_time", "start_time", "datetime"),
+        ("end_time", "end_time", "datetime"),
+        ("latitude", "latitude", "float"),
+        ("longitude", "longitude", "float"),
+        ("location_description", "location_description", "raw"),
+        ("remarks", "remarks", "raw"),
+        ("is_planned", "is_planned", "raw"),
+        ("created_at", "created_at", "datetime"),
+        ("updated_at", "updated_at", "datetime"),
+    )
+
+
+class TripStopRowSerializer(RowSerializer):
+    fields = (
+        ("id", "id", "raw"),
+        ("trip", "trip_id", "raw"),
+        ("sequence", "sequence", "raw"),
+        ("location_name", "location_name", "raw"),
+        ("latitude", "latitude", "float"),
+        ("longitude", "longitude", "float"),
+        ("on_duty_hours", "on_duty_hours", "float"),
+        ("created_at", "created_at", "datetime"),
+        ("updated_at", "updated_at", "datetime"),
+    )
+
+
+class VehicleRowSerializer(RowSerializer):
+    fields = (
+        ("id", "vehicle__id", "raw"),
+        ("vehicle_number", "vehicle__vehicle_number", "raw"),
+        ("license_plate", "vehicle__license_plate", "raw"),
+        ("state", "vehicle__state", "raw"),
+        ("created_at", "vehicle__created_at", "datetime"),
+        ("updated_at", "vehicle__updated_at", "datetime"),
+        ("carrier", "vehicle__carrier_id", "raw"),
+    )
+
+
+class TripRowSerializer(RowSerializer):
+    """Trips with their vehicle joined in and their stops in one more query."""
+
+    fields = (
+        ("id", "id", "raw"),
+        ("driver", "driver_id", "raw"),
+        ("current_location_name", "current_location_name", "raw"),
+        (
+            "current_location",
+            ("current_longitude", "current_latitude"),
+            "point",
+        ),
+        ("pickup_location_name", "pickup_location_name", "raw"),
+        ("pickup_location", ("pickup_longitude", "pickup_latitude"), "point"),
+        ("dropoff_location_name", "dropoff_location_name", "raw"),
+        ("dropoff_location", ("dropoff_longitude", "dropoff_latitude"), "point"),
+        ("current_cycle_hours", "current_cycle_hours", "float"),
+        ("start_time", "start_time", "datetime"),
+        ("status", "status", "raw"),
+        ("created_at", "created_at", "datetime"),
+        ("updated_at", "updated_at", "datetime"),
+    )
+    # Output position of the nested fields, matching TripSerializer.
+    VEHICLE_AFTER = "driver"
+    STOPS_AFTER = "dropoff_location"
+
+    def __init__(self):
+        super().__init__()
+        self.vehicle = VehicleRowSerializer()
+        self.stops = TripStopRowSerializer()
+        self.lookups.extend(self.vehicle.lookups)
+
+    def to_representation(self, rows):
+        rows = list(rows)
+        stops = defaultdict(list)
+        stop_rows = self.stops.values(
+            TripStop.objects.filter(trip_id__in=[row["id"] for row in rows])
+        ).order_by("trip_id", "sequence")
+        for stop in self.stops.to_representation(stop_rows):
+            stops[stop["trip"]].append(stop)
+
+        vehicle_getters = self.vehicle.getters
+        output = []
+        for row in rows:
+            trip = {}
+            for name, get in self.getters:
+                trip[name] = get(row)
+                if name == self.VEHICLE_AFTER:
+                    trip["vehicle"] = {
+                        key: vehicle_get(row) for key, vehicle_get in vehicle_getters
+                    }
+                elif name == self.STOPS_AFTER:
+                    trip["stops"] = stops[row["id"]]
+            output.append(trip)
+        return output
@@ -0,0 +1,219 @@
+from array import array
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from .geo import cumulative_miles, interpolate_along
+
+# Small-int codes stored in DutySegments; indexes into these tables.
+STATUSES = ("OFF_DUTY", "SLEEPER_BERTH", "DRIVING", "ON_DUTY_NOT_DRIVING")
+DESCRIPTIONS = (
+    "Pickup",
+    "Dropoff",
+    "Driving",
+    "30-minute break",
+    "Fueling Stop",
+    "10-hour Reset",
+    "34-hour Restart",
+    "Stop",
+)
+STATUS_CODES = {name: code for code, name in enumerate(STATUSES)}
+DESCRIPTION_CODES = {name: code for code, name in enumerate(DESCRIPTIONS)}
+
+OFF_DUTY, SLEEPER_BERTH, DRIVING, ON_DUTY = range(4)
+PICKUP, DROPOFF, DRIVE, BREAK, FUEL, RESET, RESTART, STOP = range(8)
+
+MICROSECOND = timedelta(microseconds=1)
+_EPOCH_AWARE = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_EPOCH_NAIVE = datetime(1970, 1, 1)
+
+
+def to_epoch_us(value):
+    """Datetime to integer microseconds since the epoch (naive stays naive)."""
+    epoch = _EPOCH_NAIVE if value.tzinfo is None else _EPOCH_AWARE
+    return (value - epoch) // MICROSECOND
+
+
+def _place_dict(place):
+    name, latitude, longitude = place
+    return {"name": name, "latitude": latitude, "longitude": longitude}
+
+
+def hours_to_us(hours):
+    """Hours to microseconds, rounded exactly like ``timedelta(hours=...)``."""
+    return timedelta(hours=hours) // MICROSECOND
+
+
+class DutySegments:
+    """
+    Struct-of-arrays container for a planned schedule.
+
+    Statuses and descriptions are stored as small-int codes and times as
+    epoch microseconds, so planners append four numbers per segment instead
+    of building a dict with two isoformat strings. Datetimes are only created
+    when the schedule is rendered or turned into DutyStatus rows.
+
+    Indexing and iteration yield the legacy ``{"status", "start_time",
+    "end_time", "location_description"}`` dicts for existing callers.
+
+    Once ``locate`` has run, ``latitude`` and ``longitude`` hold where each
+    segment starts and are rendered with it. ``places`` maps the index of a
+    stop that was placed at a POI to its ``(name, lat, lon)``; those segments
+    render with an extra ``place`` key.
+    """
+
+    __slots__ = (
+        "tzinfo",
+        "status",
+        "description",
+        "start_us",
+        "end_us",
+        "latitude",
+        "longitude",
+        "places",
+    )
+
+    def __init__(self, tzinfo=None):
+        self.tzinfo = tzinfo
+        self.status = array("b")
+        self.description = array("b")
+        self.start_us = array("q")
+        self.end_us = array("q")
+        self.latitude = array("d")
+        self.longitude = array("d")
+        self.places = {}
+
+    def append(self, status, description, start_us, end_us):
+        self.status.append(status)
+        self.description.append(description)
+        self.start_us.append(start_us)
+        self.end_us.append(end_us)
+
+    def __len__(self):
+        return len(self.status)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        row = {
+            "status": STATUSES[self.status[index]],
+            "start_time": self.datetime_at(self.start_us[index]).isoformat(),
+            "end_time": self.datetime_at(self.end_us[index]).isoformat(),
+            "location_description": DESCRIPTIONS[self.description[index]],
+        }
+        position = range(len(self))[index]
+        if self.latitude:
+            row["latitude"] = self.latitude[position]
+            row["longitude"] = self.longitude[position]
+        place = self.places.get(position)
+        if place:
+            row["place"] = _place_dict(place)
+        return row
+
+    def __iter__(self):
+        return iter(self.to_representation())
+
+    @property
+    def nbytes(self):
+        return sum(
+            column.itemsize * len(column)
+            for column in (
+                self.status,
+                self.description,
+                self.start_us,
+                self.end_us,
+                self.latitude,
+                self.longitude,
+            )
+        )
+
+    def locate(self, points):
+        """
+        Fills ``latitude``/``longitude`` with where each segment starts along
+        the route polyline ``points`` (``(lat, lon)`` pairs).
+
+        The miles covered before each segment come from a cumulative sum of
+        driving time, scaled to the polyline's length so road-graph routes
+        line up too. All positions are then interpolated in one vectorized
+        pass. If nothing is driven, only the last segment is placed at the end.
+        """
+        count = len(self)
+        if not count:
+            return self
+        status = np.frombuffer(self.status, dtype=np.int8)
+        duration = np.frombuffer(self.end_us, dtype=np.int64) - np.frombuffer(
+            self.start_us, dtype=np.int64
+        )
+        driven = np.cumsum(np.where(status == DRIVING, duration, 0)).astype(np.float64)
+        cumulative = cumulative_miles(points)
+        if driven[-1] > 0:
+            miles = np.concatenate(([0.0], driven[:-1])) * (cumulative[-1] / driven[-1])
+        else:
+            miles = np.zeros(count)
+            miles[-1] = cumulative[-1]
+        latitude, longitude = interpolate_along(points, cumulative, miles)
+        self.latitude = array("d", latitude.tolist())
+        self.longitude = array("d", longitude.tolist())
+        return self
+
+    def datetime_at(self, epoch_us):
+        if self.tzinfo is None:
+            return _EPOCH_NAIVE + timedelta(microseconds=epoch_us)
+        moment = _EPOCH_AWARE + timedelta(microseconds=epoch_us)
+        return moment if self.tzinfo is timezone.utc else moment.astimezone(self.tzinfo)
+
+    def to_representation(self):
+        """
+        Renders the schedule in the JSON shape of the route endpoint, without
+        going through DutyStatusSerializer.
+        """
+        datetime_at = self.datetime_at
+        rows = [
+            {
+                "status": STATUSES[status],
+                "start_time": datetime_at(start).isoformat(),
+                "end_time": datetime_at(end).isoformat(),
+                "location_description": DESCRIPTIONS[description],
+            }
+            for status, description, start, end in zip(
+                self.status, self.description, self.start_us, self.end_us
+            )
+        ]
+        if self.latitude:
+            for row, latitude, longitude in zip(rows, self.latitude, self.longitude):
+                row["latitude"] = latitude
+                row["longitude"] = longitude
+        for index, place in self.places.items():
+            rows[index]["place"] = _place_dict(place)
+        return rows
+
+    to_dicts = to_representation
+
+    def to_model_instances(self, trip, longitude=0.0, latitude=0.0, **extra):
+        """Unsaved DutyStatus instances for ``bulk_create``."""
+        from .models import DutyStatus
+
+        datetime_at = self.datetime_at
+        instances = [
+            DutyStatus(
+                trip=trip,
+                status=STATUSES[status],
+                start_time=datetime_at(start),
+                end_time=datetime_at(end),
+                longitude=longitude,
+                latitude=latitude,
+                location_description=DESCRIPTIONS[description],
+                **extra,
+            )
+            for status, description, start, end in zip(
+                self.status, self.description, self.start_us, self.end_us
+            )
+        ]
+        if self.latitude:
+            for instance, lat, lon in zip(instances, self.latitude, self.longitude):
+                instance.latitude, instance.longitude = lat, lon
+        for index, (name, place_lat, place_lon) in self.places.items():
+            instance = instances[index]
+            instance.latitude, instance.longitude = place_lat, place_lon
+            instance.remarks = name
+        return instances
@@ -1,16 +1,20 @@
+from django.db import transaction
 from rest_framework import serializers
-from .models import Trip, Vehicle, Carrier, DutyStatus, ELDLog
+from .models import Trip, TripStop, Vehicle, Carrier, DutyStatus, ELDLog
 
 
-# Custom field to correctly serialize a GeoDjango PointField to a list
+# Custom field to serialize a location as a [lon, lat] list
 class PointField(serializers.Field):
     """
-    A custom field to serialize a GeoDjango Point object to a [lon, lat] list.
+    Serializes a location to a [lon, lat] list, from either a GeoDjango Point
+    or a model getter such as ``Trip.get_pickup_location``.
     """
 
     def to_representation(self, value):
         if value is None:
             return None
+        if isinstance(value, (list, tuple)):
+            return list(value)
         return [value.x, value.y]
 
 
@@ -26,15 +30,80 @@ class CarrierSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
+class TripStopSerializer(serializers.ModelSerializer):
+    location = serializers.ListField(
+        child=serializers.FloatField(), min_length=2, max_length=2, write_only=True
+    )
+    sequence = serializers.IntegerField(min_value=0, required=False)
+
+    class Meta:
+        model = TripStop
+        fields = [
+            "id",
+            "trip",
+            "sequence",
+            "location_name",
+            "location",
+            "latitude",
+            "longitude",
+            "on_duty_hours",
+            "created_at",
+            "updated_at",
+        ]
+        read_only_fields = [
+            "id",
+            "trip",
+            "latitude",
+            "longitude",
+            "created_at",
+            "updated_at",
+        ]
+        # Uniqueness of (trip, sequence) is enforced by the database; the trip
+        # is not known here when stops are nested in a new trip.
+        validators = []
+
+    def validate(self, attrs):
+        location = attrs.pop("location", None)
+        if location:
+            attrs["longitude"], attrs["latitude"] = location
+        return attrs
+
+    def create(self, validated_data):
+        if "sequence" not in validated_data:
+            last = validated_data["trip"].stops.order_by("-sequence").first()
+            validated_data["sequence"] = last.sequence + 1 if last else 0
+        return super().create(validated_data)
+
+
+class VehicleIdField(serializers.PrimaryKeyRelatedField):
+    """
+    Vehicle primary key. Batch requests preload every referenced vehicle into
+    ``context["vehicles"]`` so each item does not look its own up.
+    """
+
+    def to_internal_value(self, data):
+        vehicles = self.context.get("vehicles")
+        if vehicles is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            return vehicles[int(data)]
+        except KeyError:
+            self.fail("does_not_exist", pk_value=data)
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+
+
 class TripSerializer(serializers.ModelSerializer):
     # --- Read-only fields for displaying data ---
     vehicle = VehicleSerializer(read_only=True)
-    current_location = PointField(read_only=True)
-    pickup_location = PointField(read_only=True)
-    dropoff_location = PointField(read_only=True)
+    current_location = PointField(source="get_current_location", read_only=True)
+    pickup_location = PointField(source="get_pickup_location", read_only=True)
+    dropoff_location = PointField(source="get_dropoff_location", read_only=True)
 
     # --- Write-only fields for creating/updating a trip ---
-    vehicle_id = serializers.PrimaryKeyRelatedField(
+    vehicle_id = VehicleIdField(
         queryset=Vehicle.objects.all(), source="vehicle", write_only=True
     )
     current_location_input = serializers.ListField(
@@ -46,6 +115,7 @@ class TripSerializer(serializers.ModelSerializer):
     dropoff_location_input = serializers.ListField(
         child=serializers.FloatField(), write_only=True
     )
+    stops = TripStopSerializer(many=True, required=False)
 
     class Meta:
         model = Trip
@@ -63,6 +133,7 @@ class TripSerializer(serializers.ModelSerializer):
             "dropoff_location_name",
             "dropoff_location",
             "dropoff_location_input",
+            "stops",
             "current_cycle_hours",
             "start_time",
             "status",
@@ -76,7 +147,6 @@ class TripSerializer(serializers.ModelSerializer):
         Correctly creates a Trip instance, handling the driver and vehicle relationships.
         """
         driver_instance = validated_data.pop("driver", None)
-        vehicle_instance = validated_data.pop("vehicle")
 
         if not driver_instance:
             user = self.context["request"].user
@@ -86,13 +156,26 @@ class TripSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError(
                     "A driver could not be associated with this trip."
                 )
+        trip, stops = self.build_trip(validated_data, driver_instance.id)
+        with transaction.atomic():
+            trip.save()
+            TripStop.objects.bulk_create(stops)
+        return trip
+
+    @staticmethod
+    def build_trip(validated_data, driver_id):
+        """
+        Unsaved Trip for ``driver_id`` and its unsaved stops from
+        ``validated_data``, for ``create`` and for batch inserts.
+        """
+        validated_data = dict(validated_data)
         current_coords = validated_data.pop("current_location_input")
         pickup_coords = validated_data.pop("pickup_location_input")
         dropoff_coords = validated_data.pop("dropoff_location_input")
+        stops = validated_data.pop("stops", [])
 
-        trip = Trip.objects.create(
-            driver=driver_instance,
-            vehicle=vehicle_instance,
+        trip = Trip(
+            driver_id=driver_id,
             current_longitude=current_coords[0],
             current_latitude=current_coords[1],
             pickup_longitude=pickup_coords[0],
@@ -101,7 +184,30 @@ class TripSerializer(serializers.ModelSerializer):
             dropoff_latitude=dropoff_coords[1],
             **validated_data
         )
-        return trip
+        return trip, TripSerializer._stop_instances(trip, stops)
+
+    def update(self, instance, validated_data):
+        stops = validated_data.pop("stops", None)
+        # Replaced together, so a failed insert cannot leave the trip without
+        # its stops and quietly make its plan single-leg.
+        with transaction.atomic():
+            instance = super().update(instance, validated_data)
+            if stops is not None:
+                instance.stops.all().delete()
+                self._save_stops(instance, stops)
+        return instance
+
+    def _save_stops(self, trip, stops):
+        """Stores ``stops`` in list order, which is the order they are driven."""
+        if stops:
+            TripStop.objects.bulk_create(self._stop_instances(trip, stops))
+
+    @staticmethod
+    def _stop_instances(trip, stops):
+        return [
+            TripStop(trip=trip, **{**stop, "sequence": sequence})
+            for sequence, stop in enumerate(stops)
+        ]
 
 
 class DutyStatusSerializer(serializers.ModelSerializer):
@@ -121,6 +227,7 @@ class DutyStatusSerializer(serializers.ModelSerializer):
             "longitude",
             "location_description",
             "remarks",
+            "is_planned",
             "created_at",
             "updated_at",
             "location",
@@ -128,6 +235,7 @@ class DutyStatusSerializer(serializers.ModelSerializer):
         read_only_fields = [
             "id",
             "trip",
+            "is_planned",
             "created_at",
             "updated_at",
             "latitude",
@@ -135,10 +243,16 @@ class DutyStatusSerializer(serializers.ModelSerializer):
         ]
 
     def create(self, validated_data):
-        location_data = validated_data.pop("location", [0.0, 0.0])
+        location_data = validated_data.pop("location", None)
         if location_data and len(location_data) == 2:
             validated_data["longitude"] = location_data[0]
             validated_data["latitude"] = location_data[1]
+        else:
+            # Without an explicit location the status is logged where the
+            # trip currently is rather than at (0, 0).
+            trip = validated_data["trip"]
+            validated_data["longitude"] = trip.current_longitude
+            validated_data["latitude"] = trip.current_latitude
 
         return super().create(validated_data)
 
@@ -146,4 +260,28 @@ class DutyStatusSerializer(serializers.ModelSerializer):
 class ELDLogSerializer(serializers.ModelSerializer):
     class Meta:
         model = ELDLog
-        fields = "__all__"
+        exclude = ["grid"]
+
+
+class ReplanSerializer(serializers.Serializer):
+    """Driver state sent by the mobile app to re-plan the rest of a trip."""
+
+    location = serializers.ListField(
+        child=serializers.FloatField(), min_length=2, max_length=2, required=False
+    )
+    as_of = serializers.DateTimeField(required=False)
+    remaining_miles = serializers.FloatField(min_value=0, required=False)
+    driving_in_shift = serializers.FloatField(min_value=0, default=0.0)
+    on_duty_in_shift = serializers.FloatField(min_value=0, default=0.0)
+    driving_since_break = serializers.FloatField(min_value=0, default=0.0)
+    cycle_hours = serializers.FloatField(min_value=0, required=False)
+    miles_since_last_fuel_stop = serializers.FloatField(min_value=0, default=0.0)
+    next_stop = serializers.IntegerField(
+        min_value=0,
+        required=False,
+        help_text=(
+            "Index of the first intermediate stop not yet reached, in sequence "
+            "order; the number of stops once all are done. Worked out from the "
+            "location when omitted."
+        ),
+    )
@@ -0,0 +1,52 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .cycle import (
+    apply_duty_status_change,
+    duty_status_values,
+    previous_duty_status_values,
+)
+from .eld import rebuild_grids
+from .models import DutyStatus, Trip
+from .plan_cache import invalidate_trip_plan
+
+
+@receiver(post_save, sender=Trip)
+@receiver(post_delete, sender=Trip)
+def invalidate_cached_trip_plan(sender, instance, **kwargs):
+    invalidate_trip_plan(instance.id)
+
+
+@receiver(pre_save, sender=DutyStatus)
+def remember_previous_duty_status(sender, instance, **kwargs):
+    before = previous_duty_status_values(instance.pk) if instance.pk else None
+    instance._cycle_before = before
+    instance._span_before = (
+        (before["start_time"], before["end_time"]) if before else None
+    )
+
+
+@receiver(post_save, sender=DutyStatus)
+def record_duty_status_hours(sender, instance, **kwargs):
+    before = getattr(instance, "_cycle_before", None)
+    apply_duty_status_change(before, duty_status_values(instance))
+    instance._cycle_before = None
+
+
+@receiver(post_save, sender=DutyStatus)
+def redraw_log_grids(sender, instance, **kwargs):
+    spans = [(instance.start_time, instance.end_time)]
+    if getattr(instance, "_span_before", None):
+        spans.append(instance._span_before)
+        instance._span_before = None
+    rebuild_grids(
+        instance.trip_id,
+        min(start for start, _ in spans),
+        max(end for _, end in spans),
+    )
+
+
+@receiver(post_delete, sender=DutyStatus)
+def remove_duty_status_hours(sender, instance, **kwargs):
+    apply_duty_status_change(duty_status_values(instance), None)
+    rebuild_grids(instance.trip_id, instance.start_time, instance.end_time)
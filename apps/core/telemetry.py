@@ -0,0 +1,188 @@
+"""
+Engine telemetry folded into ELD log totals.
+
+Devices post raw engine samples (ignition, RPM, speed, fuel level) for a
+trip. Samples are not stored: ``EngineAggregator`` folds them, oldest first,
+into engine hours, idle hours and fuel burned per log day, carrying only the
+previous sample between batches (``EngineState``). The per-day running
+totals live in ``EngineDay`` and ``flush_engine_totals``, run on a schedule,
+copies the ones that changed into the ELDLog rows.
+"""
+
+from collections import defaultdict, namedtuple
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .breadcrumbs import optional_number, parse_recorded_at
+from .cycle import day_spans
+from .models import ELDLog, EngineDay, EngineState
+
+# Below this speed a running engine is idling.
+IDLE_SPEED_MPH = 1.0
+# Longer silences are not counted as engine time: the device was offline.
+MAX_SAMPLE_GAP = timedelta(minutes=5)
+# A rise in fuel level of at least this much is a refuel; smaller rises are
+# sensor noise (fuel sloshing) and do not reset the reference level.
+REFUEL_GALLONS = 5.0
+
+Sample = namedtuple("Sample", "recorded_at ignition rpm speed_mph fuel_level")
+
+
+def clean_samples(points):
+    """Valid ``points`` as Samples in time order, and ``(index, error)`` pairs."""
+    samples, rejected = [], []
+    for index, point in enumerate(points):
+        try:
+            if not isinstance(point, dict):
+                raise ValueError("each sample must be an object")
+            if not isinstance(point.get("ignition"), bool):
+                raise ValueError("ignition must be true or false")
+            sample = Sample(
+                recorded_at=parse_recorded_at(point.get("recorded_at")),
+                ignition=point["ignition"],
+                rpm=optional_number(point, "rpm"),
+                speed_mph=optional_number(point, "speed_mph"),
+                fuel_level=optional_number(point, "fuel_level"),
+            )
+            if any(value is not None and value < 0 for value in sample[2:]):
+                raise ValueError("rpm, speed_mph and fuel_level cannot be negative")
+            samples.append(sample)
+        except (ValueError, OverflowError, OSError) as exc:
+            rejected.append((index, str(exc)))
+    samples.sort(key=lambda sample: sample.recorded_at)
+    return samples, rejected
+
+
+class EngineAggregator:
+    """
+    Folds samples, oldest first, into ``totals``: ``[engine_hours,
+    idle_hours, fuel_consumed]`` per log day in ``tz``. Each interval takes
+    the engine state of the sample that opens it. Only the previous sample
+    is kept, so memory does not grow with the number of samples; its
+    ``fuel_level`` is the reference level that drops are measured from.
+    """
+
+    def __init__(self, tz, last=None):
+        self.tz = tz
+        self.last = last
+        self.totals = defaultdict(lambda: [0.0, 0.0, 0.0])
+        self.skipped = 0
+
+    def add(self, sample):
+        last = self.last
+        if last is None:
+            self.last = sample
+            return
+        if sample.recorded_at <= last.recorded_at:
+            # At or before a sample already folded in.
+            self.skipped += 1
+            return
+
+        running = last.ignition and (last.rpm is None or last.rpm > 0)
+        if running and sample.recorded_at - last.recorded_at <= MAX_SAMPLE_GAP:
+            idle = last.speed_mph is not None and last.speed_mph < IDLE_SPEED_MPH
+            for day, hours in day_spans(last.recorded_at, sample.recorded_at, self.tz):
+                self.totals[day][0] += hours
+                if idle:
+                    self.totals[day][1] += hours
+
+        fuel_level = sample.fuel_level
+        if last.fuel_level is not None and fuel_level is not None:
+            if fuel_level < last.fuel_level:
+                day = sample.recorded_at.astimezone(self.tz).date()
+                self.totals[day][2] += last.fuel_level - fuel_level
+            elif fuel_level - last.fuel_level < REFUEL_GALLONS:
+                fuel_level = last.fuel_level
+        elif fuel_level is None:
+            fuel_level = last.fuel_level
+        self.last = sample._replace(fuel_level=fuel_level)
+
+
+def ingest_engine_samples(trip, points):
+    """
+    Folds ``points`` into the trip's running engine totals. Samples at or
+    before the last one received for the trip are skipped, as are invalid
+    ones, which are returned by index.
+    """
+    samples, rejected = clean_samples(points)
+    tz = trip.driver.carrier.get_timezone()
+    with transaction.atomic():
+        state = EngineState.objects.select_for_update().filter(trip=trip).first()
+        last = None
+        if state is not None:
+            last = Sample(*(getattr(state, field) for field in Sample._fields))
+        aggregator = EngineAggregator(tz, last)
+        for sample in samples:
+            aggregator.add(sample)
+        EngineDay.objects.add_totals(trip.id, aggregator.totals)
+        if state is not None and aggregator.last is not last:
+            # The row is locked already; no need for update_or_create's read.
+            EngineState.objects.filter(trip=trip).update(**aggregator.last._asdict())
+        elif aggregator.last is not None:
+            EngineState.objects.update_or_create(
+                trip=trip, defaults=aggregator.last._asdict()
+            )
+    return {
+        "received": len(points),
+        "folded": len(samples) - aggregator.skipped,
+        "skipped": aggregator.skipped,
+        "rejected": [{"index": index, "error": error} for index, error in rejected],
+    }
+
+
+def _hundredths(value):
+    return Decimal(str(round(value, 2)))
+
+
+def flush_engine_totals(batch_size=500):
+    """
+    Copies engine totals that changed since the last flush into the engine
+    hours, idle hours and fuel fields of the matching ELDLog rows, creating
+    logs for days that have none yet. Returns the number of days flushed.
+    """
+    flushed = 0
+    while True:
+        started = timezone.now()
+        pending = EngineDay.objects.filter(
+            Q(flushed_at__isnull=True) | Q(flushed_at__lt=F("updated_at"))
+        )
+        days = list(
+            pending.order_by("trip_id", "date").values_list(
+                "id", "trip_id", "date", "engine_hours", "idle_hours", "fuel_consumed"
+            )[:batch_size]
+        )
+        if not days:
+            return flushed
+        with transaction.atomic():
+            ELDLog.objects.bulk_create(
+                [
+                    ELDLog(
+                        trip_id=trip_id,
+                        date=day,
+                        total_miles=0.0,
+                        total_engine_hours=_hundredths(engine),
+                        total_idle_hours=_hundredths(idle),
+                        fuel_consumed=_hundredths(fuel),
+                    )
+                    for _, trip_id, day, engine, idle, fuel in days
+                ],
+                update_conflicts=True,
+                unique_fields=["trip", "date"],
+                update_fields=[
+                    "total_engine_hours",
+                    "total_idle_hours",
+                    "fuel_consumed",
+                    "updated_at",
+                ],
+            )
+            # Days that changed while this batch was being read stay pending.
+            EngineDay.objects.filter(
+                id__in=[row[0] for row in days], updated_at__lte=started
+            ).update(flushed_at=F("updated_at"))
+        flushed += len(days)
+        if len(days) < batch_size:
+            return flushed
@@ -1,11 +1,50 @@
+import csv
+import io
+import json
+import tempfile
+import unittest
+import xml.etree.ElementTree as ET
+from collections import Counter
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import polyline
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.gis.geos import Point
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
-from apps.core.models import Carrier, Driver, Vehicle, Trip
-from datetime import datetime, timedelta
+from rest_framework.renderers import JSONRenderer
+from apps.core.models import (
+    Carrier,
+    Driver,
+    Vehicle,
+    Trip,
+    DutyStatus,
+    DriverDutyDay,
+    RouteLine,
+    TripStop,
+    ELDLog,
+)
+from apps.core.cycle import cycle_hours_for_trip
+from apps.core.geo import haversine_miles
+from apps.core.renderers import MSGPACK_MEDIA_TYPE, ORJSONRenderer, msgpack
+from apps.core.rods import get_rods_cache, render_bundle
+from apps.core.routing import compile_osm
+from apps.core.row_serializers import DutyStatusRowSerializer, TripRowSerializer
+from apps.core.serializers import DutyStatusSerializer, TripSerializer
+from apps.core.telemetry import flush_engine_totals
+from datetime import date, datetime, timedelta
 
 User = get_user_model()
+TEST_POIS = Path(__file__).resolve().parent / "data" / "test_pois.csv"
+TEST_GRAPH = Path(__file__).resolve().parent / "data" / "test_road_graph.osm"
 
 
 class RoadPulseAPITestCase(APITestCase):
@@ -153,8 +192,120 @@ class RoadPulseAPITestCase(APITestCase):
         self._login_as("driver1")
         response = self.client.get("/api/trips/")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]["id"], self.trip1.id)
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["id"], self.trip1.id)
+
+    def test_trip_list_pages_with_opaque_cursors(self):
+        start = self.trip1.start_time
+        for offset in (0, 0, 0, 1, 2, 3):
+            Trip.objects.create(
+                driver=self.driver1,
+                vehicle=self.vehicle1,
+                current_longitude=-118.0,
+                current_latitude=34.0,
+                pickup_longitude=-118.0,
+                pickup_latitude=34.0,
+                dropoff_longitude=-122.0,
+                dropoff_latitude=37.0,
+                start_time=start - timedelta(days=offset),
+            )
+        self._login_as("driver1")
+        seen, url = [], "/api/trips/?page_size=3"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data["results"]), 3)
+            seen.extend(trip["id"] for trip in response.data["results"])
+            url = response.data["next"]
+        expected = Trip.objects.filter(driver=self.driver1).order_by(
+            "-start_time", "-id"
+        )
+        self.assertEqual(seen, list(expected.values_list("id", flat=True)))
+
+    def test_row_serializers_match_model_serializers(self):
+        trip = self._create_multi_leg_trip()
+        self.client.post(f"/api/trips/{trip.id}/route/?materialize=true", format="json")
+        trips = Trip.objects.order_by("id")
+        row = TripRowSerializer()
+        self.assertEqual(
+            json.loads(JSONRenderer().render(row.to_representation(row.values(trips)))),
+            json.loads(JSONRenderer().render(TripSerializer(trips, many=True).data)),
+        )
+        statuses = DutyStatus.objects.order_by("start_time", "id")
+        self.assertGreater(statuses.count(), 1)
+        row = DutyStatusRowSerializer()
+        self.assertEqual(
+            json.loads(
+                JSONRenderer().render(row.to_representation(row.values(statuses)))
+            ),
+            json.loads(
+                JSONRenderer().render(DutyStatusSerializer(statuses, many=True).data)
+            ),
+        )
+
+        response = self.client.get("/api/trips/")
+        listed = next(t for t in response.data["results"] if t["id"] == trip.id)
+        self.assertEqual(listed["current_location"], [-117.4, 33.95])
+        self.assertEqual(listed["stops"][0]["location_name"], "Paso Robles, CA")
+
+    def test_batch_create_inserts_valid_trips_and_plans_them(self):
+        self._login_as("driver1")
+        trip = {
+            "vehicle_id": self.vehicle1.id,
+            "start_time": "2025-06-27T06:00:00Z",
+            "current_location_input": [-118.0, 34.0],
+            "pickup_location_input": [-118.0, 34.0],
+            "dropoff_location_input": [-121.9, 37.3],
+        }
+        stop = {"location_name": "Paso Robles, CA", "location": [-120.7, 35.6]}
+        before = Trip.objects.count()
+        response = self.client.post(
+            "/api/trips/batch/",
+            {
+                "plan": True,
+                "expand": True,
+                "trips": [
+                    trip,
+                    {**trip, "vehicle_id": 999999},
+                    {**trip, "stops": [stop]},
+                    {key: value for key, value in trip.items() if key != "start_time"},
+                ],
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertEqual(response.data["created"], 2)
+        results = response.data["results"]
+        self.assertEqual([sorted(r) for r in results[1::2]], [["errors", "index"]] * 2)
+        self.assertIn("vehicle_id", results[1]["errors"])
+        self.assertIn("start_time", results[3]["errors"])
+        self.assertEqual(Trip.objects.count(), before + 2)
+        created = Trip.objects.get(id=results[2]["id"])
+        self.assertEqual(created.driver, self.driver1)
+        self.assertEqual(
+            list(created.stops.values_list("location_name", "sequence")),
+            [("Paso Robles, CA", 0)],
+        )
+        self.assertEqual(
+            sorted(response.data["trip_ids"]), [results[0]["id"], results[2]["id"]]
+        )
+        self.assertEqual(len(response.data["plans"]), 2)
+
+        # A bare list works too, with the options in the query string.
+        response = self.client.post(
+            "/api/trips/batch/?plan=true", [trip, trip], format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertEqual(response.data["created"], 2)
+        self.assertIn("columns", response.data)
+        response = self.client.post("/api/trips/batch/", "3", format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self._login_as("admin")
+        response = self.client.post(
+            "/api/trips/batch/", {"trips": [trip]}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
     def test_driver_cannot_view_another_drivers_trip(self):
         self._login_as("driver2")
@@ -184,3 +335,975 @@ class RoadPulseAPITestCase(APITestCase):
         self._login_as(None)  # Log out
         response = self.client.get("/api/trips/")
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    # --- Bulk Route API Tests ---
+    def test_bulk_route_returns_columnar_plans(self):
+        self._login_as("driver1")
+        response = self.client.post(
+            "/api/trips/route/bulk/",
+            {"trip_ids": [self.trip1.id, 999999]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["trip_ids"], [self.trip1.id])
+        self.assertEqual(response.data["not_found"], [999999])
+        columns = response.data["columns"]
+        self.assertEqual(columns["offsets"][-1], len(columns["status"]))
+
+        response = self.client.post(
+            "/api/trips/route/bulk/", [self.trip1.id], format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_route_expands_plans_on_request(self):
+        self._login_as("driver2")
+        response = self.client.post(
+            "/api/trips/route/bulk/",
+            {"trip_ids": [self.trip1.id], "expand": True},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["plans"], [])
+        self.assertEqual(response.data["not_found"], [self.trip1.id])
+
+    # --- Route Plan Cache Tests ---
+    def test_route_plan_is_cached_and_invalidated_on_trip_save(self):
+        self._login_as("admin")
+        url = f"/api/trips/{self.trip1.id}/route/"
+        stats_before = self.client.get("/api/plan-cache/stats/").data
+
+        first = self.client.post(url)
+        second = self.client.post(url)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.data, second.data)
+        stats = self.client.get("/api/plan-cache/stats/").data
+        self.assertEqual(stats["misses"], stats_before["misses"] + 1)
+        self.assertEqual(stats["hits"], stats_before["hits"] + 1)
+
+        self.trip1.dropoff_latitude = 40.0
+        self.trip1.dropoff_longitude = -74.0
+        self.trip1.save()
+        third = self.client.post(url)
+        stats = self.client.get("/api/plan-cache/stats/").data
+        self.assertEqual(stats["misses"], stats_before["misses"] + 2)
+        self.assertGreater(third.data["total_miles"], first.data["total_miles"])
+
+    def test_driver_cannot_read_plan_cache_stats(self):
+        self._login_as("driver1")
+        response = self.client.get("/api/plan-cache/stats/")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    # --- Plan Materialization Tests ---
+    def test_materialize_replaces_planned_duty_statuses(self):
+        self._login_as("driver1")
+        manual = self.client.post(
+            f"/api/trips/{self.trip1.id}/duty-status/",
+            {
+                "status": "OFF_DUTY",
+                "start_time": "2025-06-27T08:00:00Z",
+                "end_time": "2025-06-27T09:00:00Z",
+                "location_description": "Yard",
+            },
+            format="json",
+        )
+        self.assertEqual(manual.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            (manual.data["longitude"], manual.data["latitude"]),
+            (self.trip1.current_longitude, self.trip1.current_latitude),
+        )
+        url = f"/api/trips/{self.trip1.id}/route/?materialize=true"
+
+        first = self.client.post(url)
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        planned = DutyStatus.objects.filter(trip=self.trip1, is_planned=True)
+        self.assertEqual(planned.count(), len(first.data["duty_statuses"]))
+        self.assertTrue(all(row["id"] for row in first.data["duty_statuses"]))
+        self.assertFalse(planned.filter(latitude=0, longitude=0).exists())
+
+        second = self.client.post(url)
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(planned.count(), len(second.data["duty_statuses"]))
+        self.assertTrue(
+            DutyStatus.objects.filter(id=manual.data["id"], is_planned=False).exists()
+        )
+
+    # --- 70-hour/8-day Cycle Tests ---
+    def test_duty_status_writes_update_rolling_cycle_index(self):
+        self._login_as("driver1")
+        url = f"/api/trips/{self.trip1.id}/duty-status/"
+        created = self.client.post(
+            url,
+            {
+                "status": "DRIVING",
+                "start_time": "2025-06-27T20:00:00Z",
+                "end_time": "2025-06-28T06:00:00Z",
+                "location_description": "Overnight run",
+            },
+            format="json",
+        )
+        self.assertEqual(created.status_code, status.HTTP_201_CREATED)
+        days = dict(
+            DriverDutyDay.objects.filter(driver=self.driver1).values_list(
+                "date", "on_duty_hours"
+            )
+        )
+        self.assertEqual(days, {date(2025, 6, 27): 4.0, date(2025, 6, 28): 6.0})
+        self.assertEqual(
+            DriverDutyDay.objects.cycle_hours(self.driver1.id, date(2025, 6, 30)),
+            10.0,
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.patch(
+                f"{url}{created.data['id']}/", {"status": "OFF_DUTY"}, format="json"
+            )
+        self.assertEqual(
+            DriverDutyDay.objects.cycle_hours(self.driver1.id, date(2025, 6, 30)),
+            0.0,
+        )
+        # The view's lookup, then one read of the previous values on save.
+        reads = [
+            query["sql"]
+            for query in queries
+            if query["sql"].startswith('SELECT "core_dutystatus"')
+        ]
+        self.assertEqual(len(reads), 2, reads)
+
+    def test_route_plan_uses_logged_cycle_hours(self):
+        self._login_as("driver1")
+        start = self.trip1.start_time
+        DriverDutyDay.objects.create(
+            driver=self.driver1,
+            date=start.date() - timedelta(days=1),
+            on_duty_hours=69.0,
+        )
+        response = self.client.post(f"/api/trips/{self.trip1.id}/route/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        descriptions = [
+            d["location_description"] for d in response.data["duty_statuses"]
+        ]
+        self.assertEqual(descriptions[:2], ["Pickup", "34-hour Restart"])
+
+    def test_cycle_index_uses_home_terminal_days_before_trip_start(self):
+        self.carrier1.home_terminal_timezone = "America/Los_Angeles"
+        self.carrier1.save()
+        self._login_as("driver1")
+        url = f"/api/trips/{self.trip1.id}/duty-status/"
+        # 17:00-21:00 Los Angeles time on June 26, past midnight UTC.
+        for start, end in (
+            ("2025-06-27T00:00:00Z", "2025-06-27T04:00:00Z"),
+            ("2025-06-27T15:00:00Z", "2025-06-27T18:00:00Z"),
+            ("2025-06-27T20:00:00Z", "2025-06-27T22:00:00Z"),
+        ):
+            response = self.client.post(
+                url,
+                {
+                    "status": "DRIVING",
+                    "start_time": start,
+                    "end_time": end,
+                    "location_description": "Run",
+                },
+                format="json",
+            )
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            dict(
+                DriverDutyDay.objects.filter(driver=self.driver1).values_list(
+                    "date", "on_duty_hours"
+                )
+            ),
+            {date(2025, 6, 26): 4.0, date(2025, 6, 27): 5.0},
+        )
+
+        # A trip starting at noon local counts the morning run but not the
+        # afternoon one, which comes after it.
+        Trip.objects.filter(id=self.trip1.id).update(
+            start_time=datetime(2025, 6, 27, 19, 0, tzinfo=ZoneInfo("UTC")),
+            current_cycle_hours=0,
+        )
+        self.trip1.refresh_from_db()
+        self.assertEqual(cycle_hours_for_trip(self.trip1), 7.0)
+
+    def test_unroutable_trips_get_422_on_every_planning_path(self):
+        # The test graph's two-node island is not connected to the grid.
+        workdir = tempfile.TemporaryDirectory()
+        self.addCleanup(workdir.cleanup)
+        graph = Path(workdir.name) / "test.graph"
+        compile_osm(TEST_GRAPH, graph)
+        island = Trip.objects.create(
+            driver=self.driver1,
+            vehicle=self.vehicle1,
+            current_longitude=-118.3,
+            current_latitude=34.0,
+            pickup_longitude=-118.3,
+            pickup_latitude=34.0,
+            dropoff_longitude=-118.0,
+            dropoff_latitude=34.3,
+            start_time=datetime(2025, 6, 27, 8, 0, tzinfo=ZoneInfo("UTC")),
+        )
+        self._login_as("driver1")
+        unprocessable = status.HTTP_422_UNPROCESSABLE_ENTITY
+        with override_settings(ROAD_GRAPH_PATH=str(graph)):
+            for url, body in (
+                (f"/api/trips/{island.id}/route/", {}),
+                (f"/api/trips/{island.id}/eld-logs/generate/", {}),
+                (
+                    f"/api/trips/{island.id}/replan/",
+                    {"driving_in_shift": 1.0, "location": [-118.25, 34.05]},
+                ),
+                ("/api/trips/route/bulk/", {"trip_ids": [island.id]}),
+            ):
+                response = self.client.post(url, body, format="json")
+                self.assertEqual(response.status_code, unprocessable, url)
+            island.refresh_from_db()
+            self.assertEqual(island.get_current_location(), [-118.3, 34.0])
+
+            response = self.client.post(
+                "/api/trips/route/bulk/",
+                {"trip_ids": [island.id, self.trip1.id]},
+                format="json",
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data["trip_ids"], [self.trip1.id])
+            self.assertEqual(
+                [entry["trip_id"] for entry in response.data["unroutable"]],
+                [island.id],
+            )
+
+            trip = {
+                "vehicle_id": self.vehicle1.id,
+                "start_time": "2025-06-27T06:00:00Z",
+                "current_location_input": [-118.3, 34.0],
+                "pickup_location_input": [-118.3, 34.0],
+                "dropoff_location_input": [-118.0, 34.3],
+            }
+            response = self.client.post(
+                "/api/trips/batch/?plan=true", [trip], format="json"
+            )
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            self.assertEqual(response.data["trip_ids"], [])
+            self.assertEqual(
+                response.data["unroutable"][0]["trip_id"],
+                response.data["results"][0]["id"],
+            )
+
+    # --- Re-plan Tests ---
+    def test_replan_from_current_position(self):
+        self._login_as("driver1")
+        response = self.client.post(
+            f"/api/trips/{self.trip1.id}/replan/",
+            {
+                "location": [-120.0, 35.5],
+                "as_of": "2025-06-27T12:00:00Z",
+                "driving_in_shift": 3.0,
+                "on_duty_in_shift": 4.0,
+                "driving_since_break": 3.0,
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        statuses = response.data["duty_statuses"]
+        self.assertEqual(statuses[0]["start_time"], "2025-06-27T12:00:00+00:00")
+        self.assertEqual(statuses[-1]["location_description"], "Dropoff")
+        self.assertEqual(response.data["eta"], statuses[-1]["start_time"])
+        self.trip1.refresh_from_db()
+        self.assertEqual(self.trip1.get_current_location(), [-120.0, 35.5])
+
+    def test_replan_keeps_the_stops_still_ahead(self):
+        TripStop.objects.bulk_create(
+            [
+                TripStop(trip=self.trip1, sequence=1, longitude=-119.0, latitude=34.6),
+                TripStop(
+                    trip=self.trip1,
+                    sequence=2,
+                    longitude=-121.0,
+                    latitude=36.3,
+                    on_duty_hours=2.0,
+                ),
+            ]
+        )
+        self._login_as("driver1")
+        url = f"/api/trips/{self.trip1.id}/replan/"
+        body = {"location": [-120.0, 35.5], "as_of": "2025-06-27T12:00:00Z"}
+
+        def on_duty(response):
+            return [
+                (d["location_description"], d["start_time"], d["end_time"])
+                for d in response.data["duty_statuses"]
+                if d["status"] == "ON_DUTY_NOT_DRIVING"
+            ]
+
+        inferred = self.client.post(url, body, format="json")
+        self.assertEqual(inferred.status_code, status.HTTP_200_OK)
+        stops = on_duty(inferred)
+        self.assertEqual([stop[0] for stop in stops], ["Stop", "Dropoff"])
+        # 78.7 miles at 50 mph, then the stop's two on-duty hours.
+        self.assertEqual(
+            (stops[0][1][:16], stops[0][2][:16]),
+            ("2025-06-27T13:34", "2025-06-27T15:34"),
+        )
+        # Straight to the dropoff would be shorter than via the last stop.
+        direct = haversine_miles(35.5, -120.0, 37.0, -122.0)
+        self.assertGreater(inferred.data["remaining_miles"], direct)
+
+        explicit = self.client.post(url, {**body, "next_stop": 1}, format="json")
+        self.assertEqual(on_duty(explicit), stops)
+        earlier = self.client.post(url, {**body, "next_stop": 0}, format="json")
+        self.assertEqual(
+            [stop[0] for stop in on_duty(earlier)], ["Stop", "Stop", "Dropoff"]
+        )
+        done = self.client.post(url, {**body, "next_stop": 2}, format="json")
+        self.assertEqual([stop[0] for stop in on_duty(done)], ["Dropoff"])
+        moved = {**body, "location": [-121.0, 36.0], "next_stop": 3}
+        too_far = self.client.post(url, moved, format="json")
+        self.assertEqual(too_far.status_code, status.HTTP_400_BAD_REQUEST)
+        # A rejected replan leaves the stored position alone.
+        self.trip1.refresh_from_db()
+        self.assertEqual(self.trip1.get_current_location(), [-120.0, 35.5])
+
+    def test_replan_rejects_invalid_clocks(self):
+        self._login_as("driver1")
+        response = self.client.post(
+            f"/api/trips/{self.trip1.id}/replan/",
+            {"driving_in_shift": -1},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    # --- Multi-leg Trip Tests ---
+    def _create_multi_leg_trip(self):
+        self._login_as("driver1")
+        response = self.client.post(
+            "/api/trips/",
+            {
+                "vehicle_id": self.vehicle1.id,
+                "start_time": "2025-06-27T06:00:00Z",
+                "current_location_name": "Riverside, CA",
+                "current_location_input": [-117.4, 33.95],
+                "pickup_location_name": "Los Angeles, CA",
+                "pickup_location_input": [-118.0, 34.0],
+                "stops": [
+                    {
+                        "location_name": "Paso Robles, CA",
+                        "location": [-120.7, 35.6],
+                        "on_duty_hours": 0.5,
+                    }
+                ],
+                "dropoff_location_name": "San Jose, CA",
+                "dropoff_location_input": [-121.9, 37.3],
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertEqual(response.data["stops"][0]["sequence"], 0)
+        self.assertEqual(response.data["stops"][0]["latitude"], 35.6)
+        return Trip.objects.get(id=response.data["id"])
+
+    def test_route_includes_deadhead_leg_and_stops(self):
+        trip = self._create_multi_leg_trip()
+        response = self.client.post(f"/api/trips/{trip.id}/route/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        statuses = response.data["duty_statuses"]
+        self.assertEqual(
+            [d["location_description"] for d in statuses],
+            ["Driving", "Pickup", "Driving", "Stop", "Driving", "Dropoff"],
+        )
+        stop = statuses[3]
+        self.assertEqual(
+            datetime.fromisoformat(stop["end_time"])
+            - datetime.fromisoformat(stop["start_time"]),
+            timedelta(minutes=30),
+        )
+        # ~35 miles of deadhead plus ~330 miles loaded.
+        self.assertGreater(response.data["total_miles"], 320)
+        self.assertLess(response.data["total_miles"], 400)
+
+    def test_adding_a_stop_changes_the_route(self):
+        trip = self._create_multi_leg_trip()
+        url = f"/api/trips/{trip.id}/route/"
+        before = self.client.post(url).data
+        response = self.client.post(
+            f"/api/trips/{trip.id}/stops/",
+            {"location": [-121.6, 37.0], "location_name": "Gilroy, CA"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["sequence"], 1)
+        after = self.client.post(url).data
+        self.assertEqual(
+            [d["location_description"] for d in after["duty_statuses"]].count("Stop"),
+            2,
+        )
+        self.assertGreater(
+            after["duty_statuses"][-1]["end_time"],
+            before["duty_statuses"][-1]["end_time"],
+        )
+
+    def test_failed_stop_replacement_keeps_the_old_stops(self):
+        trip = self._create_multi_leg_trip()
+        body = {
+            "dropoff_location_name": "Oakland, CA",
+            "stops": [{"location": [-121.6, 37.0], "location_name": "Gilroy, CA"}],
+        }
+        with mock.patch.object(
+            TripStop.objects, "bulk_create", side_effect=IntegrityError
+        ):
+            with self.assertRaises(IntegrityError):
+                self.client.patch(f"/api/trips/{trip.id}/", body, format="json")
+        trip.refresh_from_db()
+        self.assertEqual(trip.dropoff_location_name, "San Jose, CA")
+        self.assertEqual(
+            list(trip.stops.values_list("location_name", flat=True)),
+            ["Paso Robles, CA"],
+        )
+
+    def test_other_driver_cannot_add_stops(self):
+        self._login_as("driver2")
+        response = self.client.post(
+            f"/api/trips/{self.trip1.id}/stops/",
+            {"location": [-121.9, 37.3]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_bulk_route_mixes_single_and_multi_leg_trips(self):
+        trip = self._create_multi_leg_trip()
+        response = self.client.post(
+            "/api/trips/route/bulk/",
+            {"trip_ids": [trip.id, self.trip1.id], "expand": True},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["trip_ids"], [self.trip1.id, trip.id])
+        single = self.client.post(f"/api/trips/{trip.id}/route/").data
+        self.assertEqual(
+            response.data["plans"][1]["duty_statuses"], single["duty_statuses"]
+        )
+
+    # --- POI Placement Tests ---
+    def test_route_places_stops_at_configured_pois(self):
+        self._login_as("driver1")
+        self.trip1.dropoff_latitude = 35.22
+        self.trip1.dropoff_longitude = -101.83
+        self.trip1.save()
+        url = f"/api/trips/{self.trip1.id}/route/"
+        plain = self.client.post(url).data
+        with override_settings(POI_PATH=str(TEST_POIS), POI_CORRIDOR_MILES=80.0):
+            placed = self.client.post(url).data
+        self.assertFalse(any("place" in d for d in plain["duty_statuses"]))
+        names = [d["place"]["name"] for d in placed["duty_statuses"] if "place" in d]
+        self.assertIn("Flagstaff Travel Center", names)
+
+    def test_planned_log_miles_add_up_to_the_snapped_plan(self):
+        self._login_as("driver1")
+        self.trip1.dropoff_latitude = 35.22
+        self.trip1.dropoff_longitude = -101.83
+        self.trip1.save()
+        url = f"/api/trips/{self.trip1.id}/"
+        with override_settings(POI_PATH=str(TEST_POIS), POI_CORRIDOR_MILES=80.0):
+            plan = self.client.post(f"{url}route/").data
+            computed = self.client.post(f"{url}eld-logs/generate/", {}).data
+            self.client.post(f"{url}route/?materialize=true")
+            materialized = self.client.post(f"{url}eld-logs/generate/", {}).data
+        self.assertTrue(any("place" in d for d in plan["duty_statuses"]))
+        for logs in (computed, materialized):
+            self.assertGreater(len(logs), 1)
+            self.assertAlmostEqual(
+                sum(log["total_miles"] for log in logs), plan["total_miles"], places=1
+            )
+
+    # --- ELD Log Tests ---
+    def _log_multi_day_trip(self):
+        """Duty statuses over three Los Angeles log days, moving north."""
+        self.carrier1.home_terminal_timezone = "America/Los_Angeles"
+        self.carrier1.save()
+        start = datetime(2025, 3, 3, 20, 0, tzinfo=ZoneInfo("America/Los_Angeles"))
+        rows = [
+            ("DRIVING", 0, 6, 34.0),
+            ("OFF_DUTY", 6, 16, 35.0),
+            ("DRIVING", 16, 27, 35.0),
+            ("ON_DUTY_NOT_DRIVING", 27, 29, 36.0),
+        ]
+        DutyStatus.objects.bulk_create(
+            DutyStatus(
+                trip=self.trip1,
+                status=duty_status,
+                start_time=start + timedelta(hours=begin),
+                end_time=start + timedelta(hours=end),
+                latitude=latitude,
+                longitude=-118.0,
+                location_description=duty_status,
+            )
+            for duty_status, begin, end, latitude in rows
+        )
+
+    def test_generate_splits_logs_at_home_terminal_midnight(self):
+        self._log_multi_day_trip()
+        self._login_as("driver1")
+        url = f"/api/trips/{self.trip1.id}/eld-logs/generate/"
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, {}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        inserts = [q for q in queries if q["sql"].startswith("INSERT")]
+        self.assertEqual(len(inserts), 1)
+
+        logs = {log["date"]: log for log in response.data}
+        self.assertEqual(sorted(logs), ["2025-03-03", "2025-03-04", "2025-03-05"])
+        self.assertEqual(logs["2025-03-03"]["driving_hours"], 4.0)
+        middle = logs["2025-03-04"]
+        self.assertEqual(
+            (
+                middle["driving_hours"],
+                middle["off_duty_hours"],
+                middle["on_duty_hours"],
+            ),
+            (13.0, 10.0, 1.0),
+        )
+        self.assertEqual(logs["2025-03-05"]["on_duty_hours"], 1.0)
+        degree = haversine_miles(34.0, -118.0, 35.0, -118.0)
+        self.assertAlmostEqual(logs["2025-03-03"]["total_miles"], degree * 4 / 6)
+        self.assertAlmostEqual(
+            sum(log["total_miles"] for log in logs.values()),
+            degree + haversine_miles(35.0, -118.0, 36.0, -118.0),
+        )
+
+        again = self.client.post(url, {}, format="json")
+        self.assertEqual(
+            [(log["id"], log["total_miles"]) for log in again.data],
+            [(log["id"], log["total_miles"]) for log in response.data],
+        )
+        self.assertEqual(ELDLog.objects.filter(trip=self.trip1).count(), 3)
+
+    def test_generate_one_day_keeps_entered_fuel(self):
+        self._log_multi_day_trip()
+        self._login_as("driver1")
+        response = self.client.post(
+            f"/api/trips/{self.trip1.id}/eld-logs/generate/",
+            {"date": "2025-03-04", "fuel_consumed": "42.50"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["fuel_consumed"], "42.50")
+        self.assertEqual(response.data["driving_hours"], 13.0)
+
+        regenerated = self.client.post(
+            f"/api/trips/{self.trip1.id}/eld-logs/generate/", {}, format="json"
+        )
+        middle = next(log for log in regenerated.data if log["date"] == "2025-03-04")
+        self.assertEqual(middle["fuel_consumed"], "42.50")
+        self.assertNotEqual(middle["total_miles"], 185.2)
+
+    def _grid(self, day):
+        response = self.client.get(
+            f"/api/trips/{self.trip1.id}/eld-logs/grid/", {"date": day}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        (entry,) = response.data["days"]
+        bits = np.unpackbits(np.frombuffer(bytes.fromhex(entry["grid"]), np.uint8))
+        return dict(zip(response.data["statuses"], bits.reshape(4, 96)))
+
+    def test_route_ignores_a_list_body(self):
+        self._login_as("driver1")
+        url = f"/api/trips/{self.trip1.id}/route/"
+        response = self.client.post(url, [1, 2], format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.post(f"{url}?materialize=true", [], format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_rematerializing_a_plan_redraws_the_log_grids(self):
+        self._login_as("driver1")
+        url = f"/api/trips/{self.trip1.id}/"
+        self.client.post(f"{url}route/?materialize=true")
+        logs = self.client.post(f"{url}eld-logs/generate/", {}).data
+        planned = list(self.trip1.duty_statuses.filter(is_planned=True))
+        with CaptureQueriesContext(connection) as queries:
+            DutyStatus.objects.replace_planned(self.trip1, planned)
+        writes = [
+            q["sql"].split()[0]
+            for q in queries
+            if "core_dutystatus" in q["sql"] and not q["sql"].startswith("SELECT")
+        ]
+        self.assertEqual(writes, ["DELETE", "INSERT"])
+        # Span, DELETE, INSERT, then the grid redraw: none of it per row.
+        statements = [q for q in queries if "SAVEPOINT" not in q["sql"]]
+        self.assertEqual(len(statements), 7)
+        self.client.post(f"{url}route/?materialize=true")
+        for log in logs:
+            grid = self._grid(log["date"])
+            self.assertTrue(any(bits.any() for bits in grid.values()), log["date"])
+
+    def test_log_grid_is_served_and_redrawn_on_duty_status_change(self):
+        self._log_multi_day_trip()
+        self._login_as("driver1")
+        self.client.post(f"/api/trips/{self.trip1.id}/eld-logs/generate/", {})
+
+        grid = self._grid("2025-03-04")
+        self.assertEqual(
+            grid["DRIVING"].nonzero()[0].tolist(), [*range(8), *range(48, 92)]
+        )
+        self.assertEqual(grid["OFF_DUTY"].nonzero()[0].tolist(), list(range(8, 48)))
+        self.assertEqual(
+            grid["ON_DUTY_NOT_DRIVING"].nonzero()[0].tolist(), [92, 93, 94, 95]
+        )
+        self.assertFalse(grid["SLEEPER_BERTH"].any())
+
+        rest = DutyStatus.objects.get(trip=self.trip1, status="OFF_DUTY")
+        rest.status = "SLEEPER_BERTH"
+        rest.save()
+        grid = self._grid("2025-03-04")
+        self.assertFalse(grid["OFF_DUTY"].any())
+        self.assertEqual(
+            grid["SLEEPER_BERTH"].nonzero()[0].tolist(), list(range(8, 48))
+        )
+
+        rest.delete()
+        self.assertFalse(self._grid("2025-03-04")["SLEEPER_BERTH"].any())
+
+    # --- RODS Bundle Tests ---
+    def test_rods_bundle_streams_eight_days(self):
+        self._log_multi_day_trip()
+        self._login_as("driver1")
+        response = self.client.get("/api/rods/", {"date": "2025-03-05"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "image/svg+xml")
+        body = b"".join(response.streaming_content)
+        svg = ET.fromstring(body)
+        pages = svg.findall("{http://www.w3.org/2000/svg}g")
+        self.assertEqual(
+            [page.get("data-date") for page in pages],
+            [str(date(2025, 2, 26) + timedelta(days=n)) for n in range(8)],
+        )
+        self.assertEqual(len(pages[-4].findall(".//{*}path")), 0)
+        self.assertEqual(len(pages[-2].findall(".//{*}path")), 1)
+
+        self._login_as("admin")
+        as_admin = self.client.get(
+            "/api/rods/", {"driver": self.driver1.id, "date": "2025-03-05"}
+        )
+        self.assertEqual(b"".join(as_admin.streaming_content), body)
+        missing = self.client.get("/api/rods/", {"driver": 999999})
+        self.assertEqual(missing.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_rods_bundle_renders_only_changed_and_current_days(self):
+        self._log_multi_day_trip()
+        get_rods_cache().clear()
+        driver = Driver.objects.select_related("user", "carrier").get(
+            id=self.driver1.id
+        )
+
+        def render():
+            stats = Counter()
+            svg = "".join(render_bundle(driver, date(2025, 3, 5), stats))
+            return svg, stats
+
+        first, stats = render()
+        self.assertEqual(stats, {"rendered": 8})
+        second, stats = render()
+        self.assertEqual(stats, {"rendered": 1, "cached": 7})
+        self.assertEqual(first, second)
+
+        rest = DutyStatus.objects.get(trip=self.trip1, status="OFF_DUTY")
+        rest.location_description = "Truck stop"
+        rest.save()
+        third, stats = render()
+        self.assertEqual(stats, {"rendered": 2, "cached": 6})
+        self.assertIn("Truck stop", third)
+
+    # --- Export Tests ---
+    def test_admin_streams_carrier_exports(self):
+        self._log_multi_day_trip()
+        self.client.post(f"/api/trips/{self.trip1.id}/eld-logs/generate/", {})
+        self._login_as("admin")
+        base = f"/api/carriers/{self.carrier1.id}/export"
+        params = {"start": "2025-03-04", "end": "2025-03-05"}
+
+        response = self.client.get(f"{base}/duty-statuses.csv", params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        rows = list(
+            csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode()))
+        )
+        # The first status ends at 02:00 on the 4th, so all four overlap.
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[0]["driver_license"], "D1")
+        self.assertEqual(rows[0]["status"], "DRIVING")
+
+        response = self.client.get(f"{base}/eld-logs.ndjson", params)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        logs = [json.loads(line) for line in lines]
+        self.assertEqual([log["date"] for log in logs], ["2025-03-04", "2025-03-05"])
+        self.assertEqual(logs[0]["driving_hours"], 13.0)
+
+        other = self.client.get(
+            f"/api/carriers/{self.carrier2.id}/export/eld-logs.csv", params
+        )
+        self.assertEqual(b"".join(other.streaming_content).count(b"\n"), 1)
+        missing = self.client.get(f"{base}/eld-logs.csv")
+        self.assertEqual(missing.status_code, status.HTTP_400_BAD_REQUEST)
+        unknown = self.client.get(f"{base}/trips.csv", params)
+        self.assertEqual(unknown.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_driver_cannot_export(self):
+        self._login_as("driver1")
+        response = self.client.get(
+            f"/api/carriers/{self.carrier1.id}/export/eld-logs.csv",
+            {"start": "2025-03-04", "end": "2025-03-05"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_orjson_renderer_encodes_datetimes_decimals_and_arrays(self):
+        body = ORJSONRenderer().render(
+            {
+                "at": datetime(2025, 3, 3, 8, 0, tzinfo=ZoneInfo("UTC")),
+                "fuel_consumed": Decimal("12.50"),
+                "miles": np.array([1.5, 2.0]),
+                3: "hours",
+            }
+        )
+        self.assertEqual(
+            json.loads(body),
+            {
+                "at": "2025-03-03T08:00:00Z",
+                "fuel_consumed": "12.50",
+                "miles": [1.5, 2.0],
+                "3": "hours",
+            },
+        )
+        self._login_as("driver1")
+        response = self.client.post(
+            f"/api/trips/{self.trip1.id}/duty-status/",
+            b'{"status": "DRIVING",',
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @unittest.skipUnless(msgpack, "msgpack is not installed")
+    def test_duty_status_round_trips_as_messagepack(self):
+        self._login_as("driver1")
+        url = f"/api/trips/{self.trip1.id}/duty-status/"
+        response = self.client.post(
+            url,
+            msgpack.packb(
+                {
+                    "status": "DRIVING",
+                    "start_time": "2025-06-27T20:00:00Z",
+                    "end_time": "2025-06-27T22:00:00Z",
+                    "location_description": "Barstow, CA",
+                }
+            ),
+            content_type=MSGPACK_MEDIA_TYPE,
+            HTTP_ACCEPT=MSGPACK_MEDIA_TYPE,
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response["Content-Type"], MSGPACK_MEDIA_TYPE)
+        created = msgpack.unpackb(response.content)
+        self.assertEqual(created["location_description"], "Barstow, CA")
+        self.assertEqual(created["end_time"], "2025-06-27T22:00:00Z")
+
+        listed = self.client.get(url, HTTP_ACCEPT=MSGPACK_MEDIA_TYPE)
+        self.assertEqual(
+            msgpack.unpackb(listed.content)["results"],
+            json.loads(self.client.get(url).content)["results"],
+        )
+
+    def _breadcrumb(self, minute, latitude, **extra):
+        return {
+            "recorded_at": f"2025-06-27T08:{minute:02d}:00Z",
+            "latitude": latitude,
+            "longitude": -118.0,
+            **extra,
+        }
+
+    def test_breadcrumbs_are_deduplicated_and_move_the_trip(self):
+        self._login_as("driver1")
+        url = f"/api/trips/{self.trip1.id}/breadcrumbs/"
+        points = [
+            self._breadcrumb(0, 34.0, speed_mph=55),
+            self._breadcrumb(2, 34.2),
+            self._breadcrumb(1, 34.1),
+            self._breadcrumb(1, 34.1),
+            self._breadcrumb(3, 95.0),
+            {"latitude": 34.0, "longitude": -118.0},
+        ]
+        body = "\n".join(json.dumps(point) for point in points) + "\n"
+        response = self.client.post(url, body, content_type="application/x-ndjson")
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual(
+            (response.data["inserted"], response.data["duplicates"]), (3, 1)
+        )
+        self.assertEqual([r["index"] for r in response.data["rejected"]], [4, 5])
+        self.trip1.refresh_from_db()
+        self.assertEqual(self.trip1.get_current_location(), [-118.0, 34.2])
+        self.assertEqual(
+            self.trip1.current_location_at,
+            datetime(2025, 6, 27, 8, 2, tzinfo=ZoneInfo("UTC")),
+        )
+
+        # A resent batch is all duplicates, and older points leave the trip
+        # where the newest one put it.
+        response = self.client.post(url, points[:3], format="json")
+        self.assertEqual(
+            (response.data["inserted"], response.data["duplicates"]), (0, 3)
+        )
+        self.client.post(url, [self._breadcrumb(0, 33.0, heading=90)], format="json")
+        self.trip1.refresh_from_db()
+        self.assertEqual(self.trip1.current_latitude, 34.2)
+        self.assertEqual(self.trip1.breadcrumbs.count(), 3)
+
+        self._login_as("driver2")
+        response = self.client.post(url, points, format="json")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @unittest.skipUnless(msgpack, "msgpack is not installed")
+    def test_breadcrumbs_accept_messagepack(self):
+        self._login_as("driver1")
+        response = self.client.post(
+            f"/api/trips/{self.trip1.id}/breadcrumbs/",
+            msgpack.packb([self._breadcrumb(0, 34.0), self._breadcrumb(1, 34.1)]),
+            content_type=MSGPACK_MEDIA_TYPE,
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["inserted"], 2)
+
+    def _sample(self, clock, ignition=True, **extra):
+        return {"recorded_at": f"2025-06-27T{clock}:00Z", "ignition": ignition, **extra}
+
+    def test_engine_samples_fold_into_log_days_and_flush(self):
+        # Log days start at midnight Los Angeles time, 07:00 UTC.
+        self.carrier1.home_terminal_timezone = "America/Los_Angeles"
+        self.carrier1.save()
+        self._login_as("driver1")
+        url = f"/api/trips/{self.trip1.id}/telemetry/"
+        samples = [
+            self._sample("06:56", rpm=800, speed_mph=0, fuel_level=100),
+            self._sample("06:58", rpm=1500, speed_mph=50, fuel_level=99),
+            self._sample("07:02", ignition=False, speed_mph=0, fuel_level=97),
+            # Sloshing, then a refuel: neither counts as fuel burned.
+            self._sample("07:04", ignition=False, fuel_level=97.5),
+            self._sample("07:06", rpm=700, speed_mph=0, fuel_level=110),
+            self._sample("07:09", ignition=False, fuel_level=109.5),
+            self._sample("08:05", ignition="yes"),
+        ]
+        body = "\n".join(json.dumps(sample) for sample in samples[::-1])
+        response = self.client.post(url, body, content_type="application/x-ndjson")
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual((response.data["folded"], response.data["skipped"]), (6, 0))
+        self.assertEqual([r["index"] for r in response.data["rejected"]], [0])
+
+        # A late sample is skipped; a silence longer than the gap is not
+        # counted as engine time.
+        response = self.client.post(
+            url,
+            {
+                "samples": [
+                    self._sample("07:05", speed_mph=0),
+                    self._sample("07:20", rpm=900, speed_mph=30),
+                    self._sample("07:24", rpm=900, speed_mph=30),
+                    self._sample("07:40", rpm=900, speed_mph=30),
+                ]
+            },
+            format="json",
+        )
+        self.assertEqual((response.data["folded"], response.data["skipped"]), (3, 1))
+        self.assertFalse(ELDLog.objects.filter(trip=self.trip1).exists())
+
+        out = io.StringIO()
+        call_command("flush_engine_totals", stdout=out)
+        self.assertIn("Flushed 2 log days", out.getvalue())
+        logs = {
+            log.date: (log.total_engine_hours, log.total_idle_hours, log.fuel_consumed)
+            for log in ELDLog.objects.filter(trip=self.trip1)
+        }
+        self.assertEqual(
+            logs,
+            {
+                date(2025, 6, 26): (Decimal("0.07"), Decimal("0.03"), Decimal("1.00")),
+                date(2025, 6, 27): (Decimal("0.15"), Decimal("0.05"), Decimal("2.50")),
+            },
+        )
+        self.assertEqual(flush_engine_totals(), 0)
+
+        self._login_as("driver2")
+        response = self.client.post(url, samples, format="json")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_trip_geometry_is_simplified_and_breadcrumbs_compacted(self):
+        self._login_as("driver1")
+        start = datetime(2025, 6, 27, 8, 0, tzinfo=ZoneInfo("UTC")).timestamp()
+        # North for 200 minutes, then east, wobbling a few meters either side.
+        track = [(34.0 + n * 0.0025, -118.0) for n in range(200)]
+        track += [(34.5, -118.0 + n * 0.0025) for n in range(101)]
+        points = [
+            {
+                "recorded_at": start + n * 60,
+                "latitude": lat + (0.00003 if n % 2 else -0.00003),
+                "longitude": lon,
+            }
+            for n, (lat, lon) in enumerate(track)
+        ]
+        geometry_url = f"/api/trips/{self.trip1.id}/geometry/"
+        response = self.client.get(geometry_url)
+        self.assertIsNone(response.data["driven"])
+        planned = response.data["planned"]
+        self.assertEqual(
+            polyline.decode(planned["polyline"]), [(34.0, -118.0), (37.0, -122.0)]
+        )
+        self.assertAlmostEqual(
+            planned["miles"], float(haversine_miles(34.0, -118.0, 37.0, -122.0)), 1
+        )
+        # Reads never store the line; materializing the plan does.
+        self.assertFalse(RouteLine.objects.filter(trip=self.trip1).exists())
+        self.client.post(f"/api/trips/{self.trip1.id}/route/?materialize=true")
+        stored = RouteLine.objects.get(trip=self.trip1, kind=RouteLine.PLANNED)
+        self.assertEqual(stored.polyline, planned["polyline"])
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(geometry_url)
+        self.assertFalse(
+            [q for q in queries if not q["sql"].startswith("SELECT")], queries
+        )
+
+        url = f"/api/trips/{self.trip1.id}/breadcrumbs/"
+        self.client.post(url, points, format="json")
+        response = self.client.get(
+            geometry_url, {"at_mile": 10, "longitude": -117.875, "latitude": 34.5}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        driven = response.data["driven"]
+        self.assertEqual(driven["vertices"], 3)
+        self.assertAlmostEqual(driven["position_at_mile"][0], -118.0, 3)
+        self.assertAlmostEqual(driven["position_at_mile"][1], 34.0 + 10 / 69.1, 2)
+        east = float(haversine_miles(34.5, -117.875, 34.5, -117.75))
+        self.assertAlmostEqual(
+            driven["mile_at_position"], driven["miles"] - east, delta=0.1
+        )
+
+        Trip.objects.filter(id=self.trip1.id).update(status="COMPLETED")
+        out = io.StringIO()
+        call_command("compact_breadcrumbs", stdout=out)
+        self.assertIn(
+            "Compacted 301 breadcrumbs from 1 completed trips", out.getvalue()
+        )
+        self.assertFalse(self.trip1.breadcrumbs.exists())
+        response = self.client.get(geometry_url)
+        self.assertEqual(response.data["driven"]["polyline"], driven["polyline"])
+
+        # Points after the stored line extend it; earlier ones are dropped.
+        late = [
+            {"recorded_at": start + 301 * 60, "latitude": 34.6, "longitude": -117.5},
+            {"recorded_at": start, "latitude": 30.0, "longitude": -110.0},
+        ]
+        self.client.post(url, late, format="json")
+        self.assertEqual(self.client.get(geometry_url).data["driven"]["vertices"], 4)
+        call_command("compact_breadcrumbs", stdout=io.StringIO())
+        self.assertFalse(self.trip1.breadcrumbs.exists())
+        # The stored vertices are kept as they were and the tail appended.
+        self.assertEqual(
+            polyline.decode(self.client.get(geometry_url).data["driven"]["polyline"]),
+            [*polyline.decode(driven["polyline"]), (34.6, -117.5)],
+        )
+
+        self._login_as("driver2")
+        response = self.client.get(geometry_url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,508 @@
+import contextlib
+import io
+import random
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from apps.core.geo import (
+    cumulative_miles,
+    great_circle_interpolate,
+    haversine_miles,
+    interpolate_along,
+)
+from apps.core.hos_batch import BatchPlan, plan_trips_batch
+from apps.core.hos_logic import (
+    ENGINE_CLOSED_FORM,
+    HOSCalculator,
+    HOSSnapshot,
+    Waypoint,
+)
+from apps.core.route_lines import simplify
+from apps.core.segments import DROPOFF, PICKUP, STOP
+
+
+def random_trip(rng):
+    """Random pickup/dropoff pair and start time, biased towards North America."""
+    if rng.random() < 0.8:
+        pickup = (rng.uniform(25.0, 49.0), rng.uniform(-124.0, -67.0))
+        dropoff = (rng.uniform(25.0, 49.0), rng.uniform(-124.0, -67.0))
+    else:
+        pickup = (rng.uniform(-60.0, 70.0), rng.uniform(-180.0, 180.0))
+        dropoff = (rng.uniform(-60.0, 70.0), rng.uniform(-180.0, 180.0))
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc) + timedelta(
+        seconds=rng.randint(0, 365 * 24 * 3600)
+    )
+    return start, pickup, dropoff
+
+
+def plan(engine, start, pickup, dropoff, cycle_hours=0):
+    calculator = HOSCalculator(
+        start_time=start,
+        current_cycle_hours=cycle_hours,
+        pickup_location=pickup,
+        dropoff_location=dropoff,
+        engine=engine,
+    )
+    # The iterative engine prints debug output on every loop iteration.
+    with contextlib.redirect_stdout(io.StringIO()):
+        return calculator.plan_trip()
+
+
+class ClosedFormEngineDifferentialTestCase(SimpleTestCase):
+    """
+    Runs both HOS engines over random trips and requires identical schedules.
+    """
+
+    TRIPS = 2000
+
+    def assertSamePlan(self, expected, actual, context):
+        self.assertEqual(expected["total_miles"], actual["total_miles"], context)
+        self.assertEqual(
+            len(expected["duty_statuses"]), len(actual["duty_statuses"]), context
+        )
+        for want, got in zip(expected["duty_statuses"], actual["duty_statuses"]):
+            self.assertEqual(want["status"], got["status"], context)
+            self.assertEqual(
+                want["location_description"], got["location_description"], context
+            )
+            for key in ("start_time", "end_time"):
+                delta = abs(
+                    datetime.fromisoformat(want[key]) - datetime.fromisoformat(got[key])
+                )
+                self.assertLessEqual(delta, timedelta(milliseconds=1), context)
+
+    def test_random_trips_match_iterative_engine(self):
+        rng = random.Random(20250801)
+        for _ in range(self.TRIPS):
+            start, pickup, dropoff = random_trip(rng)
+            cycle = rng.choice((0.0, rng.uniform(0.0, 70.0), 69.5, 70.0))
+            context = (
+                f"start={start.isoformat()} pickup={pickup} dropoff={dropoff} "
+                f"cycle={cycle}"
+            )
+            self.assertSamePlan(
+                plan("iterative", start, pickup, dropoff, cycle),
+                plan(ENGINE_CLOSED_FORM, start, pickup, dropoff, cycle),
+                context,
+            )
+
+    def test_exact_shift_multiples_match(self):
+        # Trips that end exactly on a shift or break boundary must not gain a
+        # trailing reset or break in either engine.
+        start = datetime(2025, 3, 1, 6, 0, tzinfo=timezone.utc)
+        for hours in (1.0, 8.0, 11.0, 19.0, 22.0, 33.0):
+            calculator = HOSCalculator(start, 0, (0.0, 0.0), (0.0, 0.0))
+            miles_per_degree = calculator.calculate_distance((0.0, 0.0), (0.0, 1.0))
+            dropoff = (0.0, hours * 50.0 / miles_per_degree)
+            self.assertSamePlan(
+                plan("iterative", start, (0.0, 0.0), dropoff),
+                plan(ENGINE_CLOSED_FORM, start, (0.0, 0.0), dropoff),
+                f"hours={hours}",
+            )
+
+    def test_long_trip_includes_fuel_stops(self):
+        result = plan(
+            ENGINE_CLOSED_FORM,
+            datetime(2025, 1, 1, 8, 0, tzinfo=timezone.utc),
+            (34.0522, -118.2437),
+            (40.7128, -74.0060),
+        )
+        descriptions = [d["location_description"] for d in result["duty_statuses"]]
+        self.assertIn("Fueling Stop", descriptions)
+        self.assertIn("10-hour Reset", descriptions)
+        self.assertEqual(descriptions[0], "Pickup")
+        self.assertEqual(descriptions[-1], "Dropoff")
+
+    def test_exhausted_cycle_forces_34_hour_restart(self):
+        start = datetime(2025, 1, 1, 8, 0, tzinfo=timezone.utc)
+        for engine in ("iterative", ENGINE_CLOSED_FORM):
+            statuses = plan(
+                engine, start, (34.0522, -118.2437), (38.5816, -121.4944), 65.0
+            )["duty_statuses"]
+            descriptions = [d["location_description"] for d in statuses]
+            # Pickup leaves 4 cycle hours, so the driver stops after 4 hours.
+            self.assertEqual(descriptions[:3], ["Pickup", "Driving", "34-hour Restart"])
+            driving = statuses[1]
+            self.assertEqual(
+                datetime.fromisoformat(driving["end_time"])
+                - datetime.fromisoformat(driving["start_time"]),
+                timedelta(hours=4),
+            )
+
+    def test_unknown_engine_is_rejected(self):
+        with self.assertRaises(ValueError):
+            HOSCalculator(None, 0, (0.0, 0.0), (1.0, 1.0), engine="bogus")
+
+
+class BatchPlannerTestCase(SimpleTestCase):
+    def test_batch_matches_closed_form_engine(self):
+        rng = random.Random(7)
+        trips = [random_trip(rng) for _ in range(500)]
+        cycles = [rng.choice((0.0, rng.uniform(0.0, 70.0))) for _ in trips]
+        batch = plan_trips_batch(
+            starts=[start for start, _, _ in trips],
+            cycle_hours=cycles,
+            pickups=[pickup for _, pickup, _ in trips],
+            dropoffs=[dropoff for _, _, dropoff in trips],
+        )
+        self.assertEqual(len(batch), len(trips))
+        for index, (start, pickup, dropoff) in enumerate(trips):
+            expected = plan(ENGINE_CLOSED_FORM, start, pickup, dropoff, cycles[index])
+            self.assertAlmostEqual(
+                batch.total_miles[index], expected["total_miles"], places=6
+            )
+            got = batch.to_dicts(index)
+            self.assertEqual(len(got), len(expected["duty_statuses"]))
+            for want, seg in zip(expected["duty_statuses"], got):
+                self.assertEqual(want["status"], seg["status"])
+                self.assertEqual(
+                    want["location_description"], seg["location_description"]
+                )
+                delta = abs(
+                    datetime.fromisoformat(want["end_time"])
+                    - datetime.fromisoformat(seg["end_time"])
+                )
+                self.assertLessEqual(delta, timedelta(milliseconds=1))
+
+    def test_columnar_output_is_consistent(self):
+        start = datetime(2025, 1, 1, 8, 0, tzinfo=timezone.utc)
+        batch = plan_trips_batch(
+            [start, start],
+            [0.0, 0.0],
+            [(34.0522, -118.2437), (34.0522, -118.2437)],
+            [(34.1522, -118.2437), (40.7128, -74.0060)],
+        )
+        columns = batch.to_columns()
+        self.assertEqual(columns["offsets"][0], 0)
+        self.assertEqual(columns["offsets"][-1], len(columns["status"]))
+        self.assertEqual(batch.segment_count(0), 2)
+        self.assertGreater(batch.segment_count(1), 20)
+        self.assertEqual(len(columns["latitude"]), len(columns["status"]))
+
+    def test_batch_coordinates_match_located_segments(self):
+        rng = random.Random(11)
+        trips = [random_trip(rng) for _ in range(200)]
+        batch = plan_trips_batch(
+            starts=[start for start, _, _ in trips],
+            cycle_hours=[0.0] * len(trips),
+            pickups=[pickup for _, pickup, _ in trips],
+            dropoffs=[dropoff for _, _, dropoff in trips],
+        )
+        for index, (start, pickup, dropoff) in enumerate(trips):
+            expected = plan(ENGINE_CLOSED_FORM, start, pickup, dropoff)
+            located = expected["duty_statuses"].locate([pickup, dropoff])
+            got = batch.segments(index)
+            for want, value in zip(located.latitude, got.latitude):
+                self.assertAlmostEqual(want, value, places=6)
+            for want, value in zip(located.longitude, got.longitude):
+                self.assertAlmostEqual(want, value, places=6)
+
+
+class DutySegmentsTestCase(SimpleTestCase):
+    def setUp(self):
+        self.start = datetime(2025, 1, 1, 8, 0, tzinfo=timezone.utc)
+        self.segments = plan(
+            ENGINE_CLOSED_FORM, self.start, (34.0522, -118.2437), (40.7128, -74.0060)
+        )["duty_statuses"]
+
+    def test_representation_matches_legacy_dicts(self):
+        rendered = self.segments.to_representation()
+        self.assertEqual(rendered[0]["start_time"], self.start.isoformat())
+        self.assertEqual(rendered, [self.segments[i] for i in range(len(rendered))])
+        self.assertEqual(self.segments.nbytes, len(self.segments) * 18)
+
+    def test_model_instances_keep_exact_times(self):
+        instances = self.segments.to_model_instances(trip=None)
+        rendered = self.segments.to_representation()
+        self.assertEqual(len(instances), len(rendered))
+        for instance, row in zip(instances, rendered):
+            self.assertEqual(instance.status, row["status"])
+            self.assertEqual(instance.start_time.isoformat(), row["start_time"])
+            self.assertEqual(instance.end_time.isoformat(), row["end_time"])
+
+    def test_locate_places_segments_along_the_route(self):
+        pickup, dropoff = (34.0522, -118.2437), (40.7128, -74.0060)
+        self.segments.locate([pickup, dropoff])
+        rows = self.segments.to_representation()
+        self.assertAlmostEqual(rows[0]["latitude"], pickup[0], places=9)
+        self.assertAlmostEqual(rows[0]["longitude"], pickup[1], places=9)
+        self.assertAlmostEqual(rows[-1]["latitude"], dropoff[0], places=9)
+        self.assertAlmostEqual(rows[-1]["longitude"], dropoff[1], places=9)
+        self.assertEqual(rows, [self.segments[i] for i in range(len(rows))])
+
+        # Each boundary sits at the share of the route driven before it.
+        total = float(haversine_miles(*pickup, *dropoff))
+        driven = 0.0
+        for row in rows:
+            lat, lon = row["latitude"], row["longitude"]
+            along = float(haversine_miles(*pickup, lat, lon))
+            self.assertAlmostEqual(along, total * driven, delta=1e-6)
+            if row["status"] == "DRIVING":
+                hours = (
+                    datetime.fromisoformat(row["end_time"])
+                    - datetime.fromisoformat(row["start_time"])
+                ) / timedelta(hours=1)
+                driven += hours * 50.0 / total
+
+        instances = self.segments.to_model_instances(trip=None)
+        self.assertEqual(
+            [(i.latitude, i.longitude) for i in instances],
+            [(row["latitude"], row["longitude"]) for row in rows],
+        )
+
+    def test_locate_follows_a_polyline(self):
+        points = [(35.0, -100.0), (35.0, -99.0), (36.0, -99.0)]
+        cumulative = cumulative_miles(points)
+        miles = np.array([0.0, cumulative[1] / 2, cumulative[1], cumulative[2], 1e9])
+        lat, lon = interpolate_along(points, cumulative, miles)
+        self.assertAlmostEqual(lat[1], 35.0, places=2)
+        self.assertAlmostEqual(lon[1], -99.5, places=6)
+        np.testing.assert_allclose(lat[[0, 2, 3, 4]], [35.0, 35.0, 36.0, 36.0])
+        np.testing.assert_allclose(lon[[0, 2, 3, 4]], [-100.0, -99.0, -99.0, -99.0])
+
+    def test_simplify_drops_points_within_tolerance_of_the_great_circle(self):
+        fractions = np.linspace(0.0, 1.0, 500)
+        ends = (
+            np.full(fractions.shape, value) for value in (34.0, -118.0, 40.7, -74.0)
+        )
+        lat, lon = great_circle_interpolate(*ends, fractions)
+        points = np.column_stack((lat, lon))
+        np.testing.assert_allclose(simplify(points, 0.001), points[[0, -1]])
+
+        # About 0.02 miles east of a meridian, then back to the start.
+        detour = [(34.0, -100.0), (34.5, -99.9997), (35.0, -100.0), (34.0, -100.0)]
+        self.assertEqual(len(simplify(detour, 0.01)), 4)
+        self.assertEqual(len(simplify(detour, 0.05)), 3)
+
+
+def clocks_before(statuses, index, cycle_hours):
+    """Replays ``statuses[:index]`` into HOSSnapshot clock values."""
+    clocks = dict(
+        driving_in_shift=0.0,
+        on_duty_in_shift=0.0,
+        driving_since_break=0.0,
+        cycle_hours=cycle_hours,
+        miles_since_last_fuel_stop=0.0,
+    )
+    driven = 0.0
+    for status in statuses[:index]:
+        hours = (
+            datetime.fromisoformat(status["end_time"])
+            - datetime.fromisoformat(status["start_time"])
+        ) / timedelta(hours=1)
+        description = status["location_description"]
+        if description in ("10-hour Reset", "34-hour Restart"):
+            clocks.update(
+                driving_in_shift=0.0, on_duty_in_shift=0.0, driving_since_break=0.0
+            )
+            if description == "34-hour Restart":
+                clocks["cycle_hours"] = 0.0
+            continue
+        clocks["on_duty_in_shift"] += hours
+        clocks["cycle_hours"] += hours
+        if description == "Driving":
+            clocks["driving_in_shift"] += hours
+            clocks["driving_since_break"] += hours
+            clocks["miles_since_last_fuel_stop"] += hours * 50.0
+            driven += hours * 50.0
+        elif description == "30-minute break":
+            clocks["driving_since_break"] = 0.0
+        elif description == "Fueling Stop":
+            clocks["miles_since_last_fuel_stop"] = 0.0
+    return clocks, driven
+
+
+class ReplanTestCase(SimpleTestCase):
+    def test_replan_from_boundary_matches_rest_of_full_plan(self):
+        rng = random.Random(99)
+        resume_after = {
+            "Pickup",
+            "30-minute break",
+            "Fueling Stop",
+            "10-hour Reset",
+            "34-hour Restart",
+        }
+        checked = 0
+        for _ in range(300):
+            start, pickup, dropoff = random_trip(rng)
+            cycle = rng.uniform(0.0, 60.0)
+            full = plan(ENGINE_CLOSED_FORM, start, pickup, dropoff, cycle)
+            statuses = full["duty_statuses"].to_dicts()
+            if full["total_miles"] < 50.0:
+                continue
+            cuts = [
+                i
+                for i in range(1, len(statuses) - 1)
+                if statuses[i - 1]["location_description"] in resume_after
+            ]
+            index = rng.choice(cuts)
+            clocks, driven = clocks_before(statuses, index, cycle)
+            calculator = HOSCalculator(start, cycle, pickup, dropoff)
+            result = calculator.replan(
+                HOSSnapshot(
+                    as_of=datetime.fromisoformat(statuses[index]["start_time"]),
+                    position=dropoff,
+                    remaining_miles=full["total_miles"] - driven,
+                    **clocks,
+                )
+            )
+            rest = result["duty_statuses"].to_dicts()
+            self.assertEqual(
+                [s["location_description"] for s in rest],
+                [s["location_description"] for s in statuses[index:]],
+            )
+            delta = abs(
+                datetime.fromisoformat(rest[-1]["end_time"])
+                - datetime.fromisoformat(statuses[-1]["end_time"])
+            )
+            self.assertLessEqual(delta, timedelta(milliseconds=1))
+            checked += 1
+        self.assertGreater(checked, 200)
+
+    def test_replan_finishes_a_long_shift_first(self):
+        now = datetime(2025, 1, 2, 15, 0, tzinfo=timezone.utc)
+        calculator = HOSCalculator(now, 0, (34.0522, -118.2437), (40.7128, -74.0060))
+        result = calculator.replan(
+            HOSSnapshot(
+                as_of=now,
+                position=(39.7392, -104.9903),
+                driving_in_shift=10.0,
+                on_duty_in_shift=13.0,
+                driving_since_break=2.0,
+                cycle_hours=30.0,
+            )
+        )
+        descriptions = [d["location_description"] for d in result["duty_statuses"]]
+        self.assertEqual(descriptions[:3], ["Driving", "10-hour Reset", "Driving"])
+        self.assertEqual(descriptions[-1], "Dropoff")
+        first = result["duty_statuses"][0]
+        self.assertEqual(first["start_time"], now.isoformat())
+        self.assertEqual(first["end_time"], (now + timedelta(hours=1)).isoformat())
+
+
+class MultiLegRouteTestCase(SimpleTestCase):
+    def assertWithinHOSLimits(self, statuses, cycle_hours, context):
+        """Replays a schedule and checks every limit at every segment."""
+        for index in range(1, len(statuses) + 1):
+            clocks, _ = clocks_before(statuses, index, cycle_hours)
+            self.assertLessEqual(clocks["driving_in_shift"], 11.0 + 1e-9, context)
+            self.assertLessEqual(clocks["driving_since_break"], 8.0 + 1e-9, context)
+            if statuses[index - 1]["location_description"] == "Driving":
+                self.assertLessEqual(clocks["on_duty_in_shift"], 14.0 + 1e-9, context)
+                self.assertLessEqual(clocks["cycle_hours"], 70.0 + 1e-9, context)
+                # Fuel stops happen at the first leg boundary past 1000 miles.
+                self.assertLessEqual(
+                    clocks["miles_since_last_fuel_stop"], 1400.0 + 1e-6, context
+                )
+
+    def test_pickup_to_dropoff_route_matches_closed_form(self):
+        rng = random.Random(8)
+        checked = 0
+        for _ in range(500):
+            start, pickup, dropoff = random_trip(rng)
+            cycle = rng.choice((0.0, rng.uniform(0.0, 70.0), 70.0))
+            expected = plan(ENGINE_CLOSED_FORM, start, pickup, dropoff, cycle)
+            if expected["total_miles"] < 50.0:
+                continue
+            route = HOSCalculator(start, cycle, pickup, dropoff).plan_route(
+                [Waypoint(pickup, PICKUP, 1.0), Waypoint(dropoff, DROPOFF, 1.0)]
+            )
+            self.assertAlmostEqual(route["total_miles"], expected["total_miles"])
+            self.assertEqual(
+                route["duty_statuses"].to_dicts(), expected["duty_statuses"].to_dicts()
+            )
+            checked += 1
+        self.assertGreater(checked, 400)
+
+    def test_random_routes_stay_within_limits(self):
+        rng = random.Random(80)
+        for _ in range(200):
+            start, origin, pickup = random_trip(rng)
+            stops = [random_trip(rng)[1] for _ in range(rng.randint(0, 4))]
+            dropoff = random_trip(rng)[2]
+            cycle = rng.uniform(0.0, 70.0)
+            waypoints = (
+                [Waypoint(origin, STOP, 0.0), Waypoint(pickup, PICKUP, 1.0)]
+                + [Waypoint(stop, STOP, rng.uniform(0.25, 3.0)) for stop in stops]
+                + [Waypoint(dropoff, DROPOFF, 1.0)]
+            )
+            route = HOSCalculator(start, cycle, origin, dropoff).plan_route(waypoints)
+            statuses = route["duty_statuses"].to_dicts()
+            context = f"start={start.isoformat()} waypoints={waypoints}"
+
+            self.assertEqual(len(route["legs"]), len(waypoints) - 1)
+            self.assertAlmostEqual(sum(route["legs"]), route["total_miles"])
+            driven = sum(
+                (
+                    datetime.fromisoformat(s["end_time"])
+                    - datetime.fromisoformat(s["start_time"])
+                )
+                / timedelta(hours=1)
+                for s in statuses
+                if s["status"] == "DRIVING"
+            )
+            self.assertAlmostEqual(driven * 50.0, route["total_miles"], places=3)
+            self.assertEqual(
+                [
+                    s["location_description"]
+                    for s in statuses
+                    if s["location_description"] in ("Pickup", "Stop", "Dropoff")
+                ],
+                ["Pickup"] + ["Stop"] * len(stops) + ["Dropoff"],
+                context,
+            )
+            self.assertWithinHOSLimits(statuses, cycle, context)
+
+    def test_clocks_carry_across_legs(self):
+        # 9 hours of deadhead plus 4 hours to the dropoff: the 30-minute break
+        # and the 10-hour reset both fall after the pickup, so the clocks from
+        # the first leg must still be running on the second.
+        start = datetime(2025, 6, 1, 6, 0, tzinfo=timezone.utc)
+        origin = (35.0, -100.0)
+        pickup = (35.0, -100.0 + 450.0 / (69.172 * 0.8192))
+        calculator = HOSCalculator(start, 0, origin, pickup)
+        legs = calculator.plan_route(
+            [Waypoint(origin, STOP, 0.0), Waypoint(pickup, PICKUP, 1.0)]
+        )
+        deadhead = legs["legs"][0] / 50.0
+        dropoff = (pickup[0] + 200.0 / 69.0, pickup[1])
+        route = HOSCalculator(start, 0, origin, dropoff).plan_route(
+            [
+                Waypoint(origin, STOP, 0.0),
+                Waypoint(pickup, PICKUP, 1.0),
+                Waypoint(dropoff, DROPOFF, 1.0),
+            ]
+        )
+        descriptions = [s["location_description"] for s in route["duty_statuses"]]
+        self.assertGreater(deadhead, 8.0)
+        self.assertEqual(
+            descriptions[:4], ["Driving", "30-minute break", "Driving", "Pickup"]
+        )
+        self.assertIn("10-hour Reset", descriptions[4:])
+
+    def test_batch_plan_from_segments_round_trips(self):
+        rng = random.Random(81)
+        trips = [random_trip(rng) for _ in range(20)]
+        plans = [plan(ENGINE_CLOSED_FORM, *trip) for trip in trips]
+        batch = BatchPlan.concatenate(
+            [
+                BatchPlan.from_segments(
+                    [trip[0] for trip in trips[:5]],
+                    [p["total_miles"] for p in plans[:5]],
+                    [p["duty_statuses"] for p in plans[:5]],
+                ),
+                BatchPlan.from_segments([], [], []),
+                BatchPlan.from_segments(
+                    [trip[0] for trip in trips[5:]],
+                    [p["total_miles"] for p in plans[5:]],
+                    [p["duty_statuses"] for p in plans[5:]],
+                ),
+            ]
+        )
+        self.assertEqual(len(batch), len(trips))
+        for index, expected in enumerate(plans):
+            self.assertEqual(
+                batch.to_dicts(index), expected["duty_statuses"].to_dicts()
+            )
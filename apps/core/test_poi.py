@@ -0,0 +1,142 @@
+import json
+import random
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from apps.core.geo import haversine_miles
+from apps.core.hos_batch import BatchPlan
+from apps.core.hos_logic import ENGINE_CLOSED_FORM, HOSCalculator
+from apps.core.poi import (
+    FUEL_STATION,
+    KINDS,
+    REST_AREA,
+    POIIndex,
+    snap_stops,
+)
+
+TEST_POIS = Path(__file__).resolve().parent / "data" / "test_pois.csv"
+
+
+class POIIndexTestCase(SimpleTestCase):
+    def test_loads_csv_and_skips_unknown_kinds(self):
+        index = POIIndex.load(TEST_POIS)
+        self.assertEqual(len(index), 11)
+        self.assertNotIn("Downtown Car Wash", index.names)
+
+    def test_loads_geojson_with_osm_tags(self):
+        features = [
+            {
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [-100.0, 35.0]},
+                "properties": {"name": "Fuel", "amenity": "fuel"},
+            },
+            {
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [-100.1, 35.0]},
+                "properties": {"name": "Rest", "highway": "rest_area"},
+            },
+            {
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [-100.2, 35.0]},
+                "properties": {"name": "Cafe", "amenity": "cafe"},
+            },
+        ]
+        with tempfile.TemporaryDirectory() as workdir:
+            path = Path(workdir) / "pois.geojson"
+            path.write_text(
+                json.dumps({"type": "FeatureCollection", "features": features})
+            )
+            index = POIIndex.load(path)
+        self.assertEqual(sorted(index.names), ["Fuel", "Rest"])
+        found = index.nearest(35.0, -100.09, 10.0, kinds=(FUEL_STATION,))
+        self.assertEqual(index.place(found), ("Fuel", 35.0, -100.0))
+
+    def test_nearest_matches_brute_force(self):
+        rng = random.Random(10)
+        records = [
+            (f"POI {i}", rng.uniform(30, 40), rng.uniform(-110, -90), rng.choice(KINDS))
+            for i in range(3000)
+        ]
+        index = POIIndex.from_records(records)
+        lat = np.array([r[1] for r in records])
+        lon = np.array([r[2] for r in records])
+        kind = np.array([r[3] for r in records])
+        for _ in range(300):
+            qlat, qlon = rng.uniform(30, 40), rng.uniform(-110, -90)
+            radius = rng.choice((2.0, 10.0, 40.0))
+            kinds = rng.choice(((FUEL_STATION,), (REST_AREA,), KINDS))
+            distances = haversine_miles(qlat, qlon, lat, lon)
+            distances[~np.isin(kind, kinds)] = np.inf
+            expected = int(np.argmin(distances))
+            found = index.nearest(qlat, qlon, radius, kinds)
+            if distances[expected] > radius:
+                self.assertIsNone(found)
+            else:
+                self.assertEqual(index.names[found], records[expected][0])
+
+
+class SnapStopsTestCase(SimpleTestCase):
+    def setUp(self):
+        self.index = POIIndex.load(TEST_POIS)
+        self.pickup, self.dropoff = (34.05, -118.25), (35.22, -101.83)
+        self.plan = HOSCalculator(
+            datetime(2025, 1, 1, 8, 0, tzinfo=timezone.utc),
+            0,
+            self.pickup,
+            self.dropoff,
+            engine=ENGINE_CLOSED_FORM,
+        ).plan_trip()
+
+    def test_stops_are_placed_at_pois_in_the_corridor(self):
+        segments = snap_stops(
+            self.plan["duty_statuses"].locate([self.pickup, self.dropoff]),
+            self.index,
+            corridor_miles=80.0,
+        )
+        rows = segments.to_representation()
+        self.assertEqual(
+            sorted(rows[i]["location_description"] for i in segments.places),
+            ["10-hour Reset", "30-minute break"],
+        )
+        for position, (name, lat, lon) in segments.places.items():
+            self.assertIn(
+                rows[position]["location_description"],
+                ("Fueling Stop", "30-minute break", "10-hour Reset"),
+            )
+            self.assertEqual(rows[position]["place"]["name"], name)
+            if rows[position]["location_description"] == "Fueling Stop":
+                self.assertEqual(
+                    self.index.kind[self.index.names.index(name)],
+                    KINDS.index(FUEL_STATION),
+                )
+        self.assertEqual(segments[position]["place"]["latitude"], lat)
+        self.assertEqual(
+            (segments.latitude[position], segments.longitude[position]), (lat, lon)
+        )
+
+        instances = segments.to_model_instances(trip=None)
+        self.assertEqual(
+            (instances[position].latitude, instances[position].longitude), (lat, lon)
+        )
+        self.assertEqual(instances[position].remarks, name)
+
+        batch = BatchPlan.from_segments(
+            [segments.datetime_at(segments.start_us[0])],
+            [self.plan["total_miles"]],
+            [segments],
+        )
+        self.assertEqual(batch.segments(0).places, segments.places)
+        self.assertEqual(len(batch.to_columns()["places"]), len(segments.places))
+
+    def test_no_poi_in_range_leaves_stops_unplaced(self):
+        segments = snap_stops(
+            self.plan["duty_statuses"].locate([self.pickup, self.dropoff]),
+            self.index,
+            corridor_miles=0.01,
+        )
+        self.assertEqual(segments.places, {})
+        self.assertNotIn("place", segments.to_representation()[0])
@@ -0,0 +1,298 @@
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient, APITestCase
+
+from apps.authentication.tokens import tokens_for_user
+from apps.core.middleware import fingerprint
+from apps.core.models import (
+    Carrier,
+    Driver,
+    DutyStatus,
+    ELDLog,
+    Trip,
+    TripStop,
+    Vehicle,
+)
+
+User = get_user_model()
+START = datetime(2025, 3, 3, 8, 0, tzinfo=timezone.utc)
+
+
+class QueryBudgetTestCase(APITestCase):
+    """
+    Runs every endpoint in apps/core/urls.py against fleets of growing size
+    and requires the same number of queries each time, so an N+1 shows up
+    as a failing budget rather than as a slow page in production.
+    """
+
+    FLEET_SIZES = (1, 4)
+
+    # Endpoint -> queries per request. Requests carry a bearer token, so the
+    # user is built from its claims rather than loaded.
+    BUDGETS = {
+        "user-info": 1,
+        "plan-cache-stats": 0,
+        "rods-bundle": 3,
+        "carrier-export": 2,
+        "eld-log-generate": 4,
+        "eld-log-grid": 2,
+        "eld-log-list": 2,
+        "breadcrumb-ingest": 4,
+        "engine-telemetry": 17,
+        "trip-geometry": 4,
+        "route-calculation": 4,
+        "trip-replan": 4,
+        "route-calculation-bulk": 4,
+        "vehicle-list": 1,
+        "vehicle-detail": 1,
+        "carrier-list": 1,
+        "carrier-detail": 1,
+        "trip-list": 2,
+        "trip-detail": 2,
+        "trip-batch": 8,
+        "trip-duty-statuses-list": 1,
+        "trip-duty-statuses-detail": 1,
+        "trip-stops-list": 1,
+        "trip-stops-detail": 1,
+        "trip-eld-logs-detail": 1,
+    }
+
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_superuser("admin", "a@example.com", "pw")
+
+    def build_fleet(self, size):
+        """``size`` drivers, each with a vehicle and ``size`` logged trips."""
+        carrier = Carrier.objects.create(name=f"Fleet {size}", main_office_address="")
+        drivers = []
+        for d in range(size):
+            user = User.objects.create_user(f"driver-{size}-{d}", password="pw")
+            driver = Driver.objects.create(
+                user=user, carrier=carrier, license_number=f"L-{size}-{d}"
+            )
+            vehicle = Vehicle.objects.create(
+                carrier=carrier,
+                vehicle_number=f"V-{size}-{d}",
+                license_plate="P",
+                state="CA",
+            )
+            for t in range(size):
+                start = START + timedelta(days=t)
+                trip = Trip.objects.create(
+                    driver=driver,
+                    vehicle=vehicle,
+                    current_longitude=-118.0,
+                    current_latitude=34.0,
+                    pickup_longitude=-118.0,
+                    pickup_latitude=34.0,
+                    dropoff_longitude=-115.0,
+                    dropoff_latitude=36.0,
+                    start_time=start,
+                )
+                TripStop.objects.bulk_create(
+                    TripStop(
+                        trip=trip,
+                        sequence=s,
+                        longitude=-117.0 + s,
+                        latitude=35.0,
+                    )
+                    for s in range(size)
+                )
+                DutyStatus.objects.bulk_create(
+                    DutyStatus(
+                        trip=trip,
+                        status=status,
+                        start_time=start + timedelta(hours=h),
+                        end_time=start + timedelta(hours=h + 1),
+                        longitude=-118.0,
+                        latitude=34.0,
+                        location_description=status,
+                    )
+                    for h, status in enumerate(("ON_DUTY_NOT_DRIVING", "DRIVING"))
+                )
+                ELDLog.objects.create(trip=trip, date=start.date(), total_miles=50.0)
+            drivers.append(driver)
+        return carrier, drivers
+
+    def endpoints(self, carrier, driver):
+        trip = driver.trips.order_by("id").first()
+        status_id = trip.duty_statuses.values_list("id", flat=True).first()
+        stop_id = trip.stops.values_list("id", flat=True).first()
+        log_id = trip.eld_logs.values_list("id", flat=True).first()
+        trip_ids = list(
+            Trip.objects.filter(driver__carrier=carrier).values_list("id", flat=True)
+        )
+        admin, user = self.admin, driver.user
+        day = {"date": START.date().isoformat()}
+        return [
+            ("user-info", user, "get", "/api/user-info/", None),
+            ("plan-cache-stats", admin, "get", "/api/plan-cache/stats/", None),
+            ("rods-bundle", user, "get", "/api/rods/", day),
+            (
+                "carrier-export",
+                admin,
+                "get",
+                f"/api/carriers/{carrier.id}/export/duty-statuses.csv",
+                {"start": "2025-03-01", "end": "2025-03-31"},
+            ),
+            (
+                "eld-log-generate",
+                user,
+                "post",
+                f"/api/trips/{trip.id}/eld-logs/generate/",
+                {},
+            ),
+            ("eld-log-grid", user, "get", f"/api/trips/{trip.id}/eld-logs/grid/", None),
+            ("eld-log-list", user, "get", f"/api/trips/{trip.id}/eld-logs/", None),
+            (
+                "breadcrumb-ingest",
+                user,
+                "post",
+                f"/api/trips/{trip.id}/breadcrumbs/",
+                [
+                    {
+                        "recorded_at": (START + timedelta(minutes=n)).isoformat(),
+                        "latitude": 34.0 + n / 100,
+                        "longitude": -118.0,
+                    }
+                    for n in range(len(trip_ids) * 10)
+                ],
+            ),
+            (
+                "engine-telemetry",
+                user,
+                "post",
+                f"/api/trips/{trip.id}/telemetry/",
+                [
+                    {
+                        "recorded_at": (START + timedelta(minutes=n)).isoformat(),
+                        "ignition": True,
+                        "rpm": 1200,
+                        "speed_mph": 50,
+                        "fuel_level": 100 - n / 10,
+                    }
+                    for n in range(len(trip_ids) * 10)
+                ],
+            ),
+            (
+                "trip-geometry",
+                user,
+                "get",
+                f"/api/trips/{trip.id}/geometry/",
+                {"at_mile": 5},
+            ),
+            ("route-calculation", user, "post", f"/api/trips/{trip.id}/route/", {}),
+            ("trip-replan", user, "post", f"/api/trips/{trip.id}/replan/", {}),
+            (
+                "route-calculation-bulk",
+                admin,
+                "post",
+                "/api/trips/route/bulk/",
+                {"trip_ids": trip_ids},
+            ),
+            ("vehicle-list", user, "get", "/api/vehicles/", None),
+            (
+                "vehicle-detail",
+                user,
+                "get",
+                f"/api/vehicles/{trip.vehicle_id}/",
+                None,
+            ),
+            ("carrier-list", admin, "get", "/api/carriers/", None),
+            ("carrier-detail", admin, "get", f"/api/carriers/{carrier.id}/", None),
+            ("trip-list", admin, "get", "/api/trips/", None),
+            ("trip-detail", user, "get", f"/api/trips/{trip.id}/", None),
+            (
+                "trip-batch",
+                user,
+                "post",
+                "/api/trips/batch/",
+                {
+                    "plan": True,
+                    "trips": [
+                        {
+                            "vehicle_id": trip.vehicle_id,
+                            "start_time": (START + timedelta(days=30 + n)).isoformat(),
+                            "current_location_input": [-118.0, 34.0],
+                            "pickup_location_input": [-118.0, 34.0],
+                            "dropoff_location_input": [-115.0, 36.0],
+                            "stops": [{"location": [-117.0, 35.0]}] * (n % 2),
+                        }
+                        for n in range(len(trip_ids) + 1)
+                    ],
+                },
+            ),
+            (
+                "trip-duty-statuses-list",
+                user,
+                "get",
+                f"/api/trips/{trip.id}/duty-status/",
+                None,
+            ),
+            (
+                "trip-duty-statuses-detail",
+                user,
+                "get",
+                f"/api/trips/{trip.id}/duty-status/{status_id}/",
+                None,
+            ),
+            ("trip-stops-list", user, "get", f"/api/trips/{trip.id}/stops/", None),
+            (
+                "trip-stops-detail",
+                user,
+                "get",
+                f"/api/trips/{trip.id}/stops/{stop_id}/",
+                None,
+            ),
+            (
+                "trip-eld-logs-detail",
+                user,
+                "get",
+                f"/api/trips/{trip.id}/eld-logs/{log_id}/",
+                None,
+            ),
+        ]
+
+    def count_queries(self, user, method, url, data):
+        # Authenticated with a bearer token, as the mobile and web clients are.
+        access = tokens_for_user(user)["access"]
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, data, format="json")
+            if response.streaming:
+                b"".join(response.streaming_content)
+        self.assertLess(response.status_code, 300, (url, response.status_code))
+        return len(queries)
+
+    def test_every_endpoint_stays_within_its_query_budget(self):
+        covered = set()
+        for size in self.FLEET_SIZES:
+            carrier, drivers = self.build_fleet(size)
+            for name, user, method, url, data in self.endpoints(carrier, drivers[-1]):
+                covered.add(name)
+                with self.subTest(endpoint=name, fleet=size):
+                    self.assertEqual(
+                        self.count_queries(user, method, url, data),
+                        self.BUDGETS[name],
+                    )
+        self.assertEqual(covered, set(self.BUDGETS))
+
+    def test_query_count_middleware_logs_repeated_queries(self):
+        carrier, drivers = self.build_fleet(2)
+        self.client.force_authenticate(user=self.admin)
+        middleware = ["apps.core.middleware.QueryCountMiddleware", *settings.MIDDLEWARE]
+        with override_settings(MIDDLEWARE=middleware):
+            with self.assertLogs("apps.core.queries", level="DEBUG") as logs:
+                response = self.client.get("/api/carriers/")
+        self.assertEqual(response["X-Query-Count"], "1")
+        self.assertIn("GET /api/carriers/: 1 queries", logs.output[0])
+
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id IN (1, 2, 3) AND name = 'x'"),
+            "SELECT * FROM t WHERE id IN (?, ...) AND name = ?",
+        )
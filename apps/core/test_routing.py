@@ -0,0 +1,121 @@
+import heapq
+import math
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.test import SimpleTestCase, override_settings
+
+from apps.core.geo import haversine_miles
+from apps.core.hos_logic import ENGINE_CLOSED_FORM, HOSCalculator
+from apps.core.routing import (
+    NoRouteError,
+    RoadGraph,
+    compile_osm,
+    get_road_graph,
+)
+
+TEST_GRAPH = Path(__file__).resolve().parent / "data" / "test_road_graph.osm"
+COLUMNS = 6
+
+
+def grid_node(row, col):
+    """Graph index of the bundled grid's intersection at ``(row, col)``."""
+    return row * COLUMNS + col
+
+
+def dijkstra(graph, source):
+    """Reference single-source shortest paths over the compiled arrays."""
+    distances = {source: 0.0}
+    queue = [(0.0, source)]
+    while queue:
+        cost, node = heapq.heappop(queue)
+        if cost > distances[node]:
+            continue
+        for edge in range(graph.offsets[node], graph.offsets[node + 1]):
+            neighbour = int(graph.targets[edge])
+            candidate = cost + float(graph.weights[edge])
+            if candidate < distances.get(neighbour, math.inf):
+                distances[neighbour] = candidate
+                heapq.heappush(queue, (candidate, neighbour))
+    return distances
+
+
+class RoadGraphTestCase(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.workdir = tempfile.TemporaryDirectory()
+        cls.path = Path(cls.workdir.name) / "test.graph"
+        cls.counts = compile_osm(TEST_GRAPH, cls.path)
+        cls.graph = RoadGraph.load(cls.path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.workdir.cleanup()
+        super().tearDownClass()
+
+    def test_compiles_only_drivable_ways(self):
+        # 36 grid intersections plus the two-node island; the stray node and
+        # the footway are dropped, one-way streets get a single direction.
+        self.assertEqual(self.counts, (38, 117))
+        self.assertEqual(self.graph.node_count, 38)
+        self.assertEqual(self.graph.edge_count, 117)
+        self.assertEqual(self.graph.offsets[-1], 117)
+
+    def test_a_star_matches_dijkstra(self):
+        for source in range(self.graph.node_count):
+            expected = dijkstra(self.graph, source)
+            for target in range(self.graph.node_count):
+                if target not in expected:
+                    with self.assertRaises(NoRouteError):
+                        self.graph.shortest_path(source, target)
+                    continue
+                miles, path = self.graph.shortest_path(source, target)
+                self.assertAlmostEqual(miles, expected[target], places=4)
+                self.assertEqual((path[0], path[-1]), (source, target))
+
+    def test_one_way_streets_are_respected(self):
+        row_length, _ = self.graph.shortest_path(grid_node(2, 0), grid_node(2, 5))
+        against, path = self.graph.shortest_path(grid_node(2, 5), grid_node(2, 0))
+        self.assertGreater(against, row_length)
+        self.assertNotIn(grid_node(2, 4), path)
+
+        freeway, path = self.graph.shortest_path(grid_node(0, 0), grid_node(5, 5))
+        self.assertEqual(path, [grid_node(i, i) for i in range(6)])
+        back, _ = self.graph.shortest_path(grid_node(5, 5), grid_node(0, 0))
+        self.assertGreater(back, freeway)
+
+    def test_route_miles_snap_to_the_network(self):
+        origin = (34.001, -118.299)
+        destination = (34.099, -118.201)
+        miles = self.graph.route_miles(origin, destination)
+        straight = float(haversine_miles(*origin, *destination))
+        self.assertGreaterEqual(miles, straight)
+        self.assertLess(miles, straight * 1.5)
+        with self.assertRaises(NoRouteError):
+            self.graph.route_miles(origin, (34.3, -118.0))
+
+    def test_rejects_files_that_are_not_graphs(self):
+        bogus = Path(self.workdir.name) / "bogus.graph"
+        bogus.write_bytes(b"\0" * 128)
+        with self.assertRaises(ValueError):
+            RoadGraph.load(bogus)
+
+    def test_hos_calculator_uses_road_miles(self):
+        pickup, dropoff = (34.0, -118.3), (34.1, -118.2)
+        start = datetime(2025, 1, 1, 8, 0, tzinfo=timezone.utc)
+        plan = HOSCalculator(
+            start, 0, pickup, dropoff, engine=ENGINE_CLOSED_FORM, router=self.graph
+        ).plan_trip()
+        self.assertAlmostEqual(
+            plan["total_miles"], self.graph.route_miles(pickup, dropoff)
+        )
+
+    def test_graph_is_loaded_from_settings(self):
+        with override_settings(ROAD_GRAPH_PATH=""):
+            self.assertIsNone(get_road_graph())
+        with override_settings(ROAD_GRAPH_PATH=str(self.path)):
+            graph = get_road_graph()
+            self.assertEqual(graph.fingerprint, self.graph.fingerprint)
+            self.assertIs(get_road_graph(), graph)
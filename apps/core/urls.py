@@ -2,6 +2,7 @@ from django.urls import path, include
 from rest_framework_nested import routers
 from .views import (
     TripViewSet,
+    TripStopViewSet,
     DutyStatusViewSet,
     VehicleViewSet,
     CarrierViewSet,
@@ -9,7 +10,16 @@ from .views import (
     UserInfoView,
     ELDLogGenerateView,
     ELDLogListView,
+    ELDLogGridView,
+    RODSBundleView,
+    CarrierExportView,
+    BreadcrumbIngestView,
+    EngineTelemetryView,
+    TripGeometryView,
     RouteCalculationAPIView,
+    BulkRouteCalculationAPIView,
+    PlanCacheStatsView,
+    TripReplanAPIView,
 )
 
 # Main router for top-level resources
@@ -21,25 +31,63 @@ router.register(r"carriers", CarrierViewSet, basename="carrier")
 # Nested router for resources within a trip
 trips_router = routers.NestedSimpleRouter(router, r"trips", lookup="trip")
 trips_router.register(r"duty-status", DutyStatusViewSet, basename="trip-duty-statuses")
+trips_router.register(r"stops", TripStopViewSet, basename="trip-stops")
 trips_router.register(r"eld-logs", ELDLogViewSet, basename="trip-eld-logs")
 
 # URL patterns for the core app
 urlpatterns = [
     path("user-info/", UserInfoView.as_view(), name="user-info"),
+    path("plan-cache/stats/", PlanCacheStatsView.as_view(), name="plan-cache-stats"),
+    path("rods/", RODSBundleView.as_view(), name="rods-bundle"),
+    path(
+        "carriers/<int:carrier_id>/export/<slug:kind>.<slug:fmt>",
+        CarrierExportView.as_view(),
+        name="carrier-export",
+    ),
     # FIX: Correctly wired up the standalone views
     path(
         "trips/<int:trip_id>/eld-logs/generate/",
         ELDLogGenerateView.as_view(),
         name="eld-log-generate",
     ),
+    path(
+        "trips/<int:trip_id>/eld-logs/grid/",
+        ELDLogGridView.as_view(),
+        name="eld-log-grid",
+    ),
     path(
         "trips/<int:trip_id>/eld-logs/", ELDLogListView.as_view(), name="eld-log-list"
     ),
+    path(
+        "trips/<int:trip_id>/breadcrumbs/",
+        BreadcrumbIngestView.as_view(),
+        name="breadcrumb-ingest",
+    ),
+    path(
+        "trips/<int:trip_id>/telemetry/",
+        EngineTelemetryView.as_view(),
+        name="engine-telemetry",
+    ),
+    path(
+        "trips/<int:trip_id>/geometry/",
+        TripGeometryView.as_view(),
+        name="trip-geometry",
+    ),
     path(
         "trips/<int:trip_id>/route/",
         RouteCalculationAPIView.as_view(),
         name="route-calculation",
     ),
+    path(
+        "trips/<int:trip_id>/replan/",
+        TripReplanAPIView.as_view(),
+        name="trip-replan",
+    ),
+    path(
+        "trips/route/bulk/",
+        BulkRouteCalculationAPIView.as_view(),
+        name="route-calculation-bulk",
+    ),
     path("", include(router.urls)),
     path("", include(trips_router.urls)),
 ]
@@ -1,26 +1,160 @@
 # apps/core/views.py
 
 from rest_framework import viewsets, permissions, generics, status
+from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import NotFound, PermissionDenied
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.http import StreamingHttpResponse
 from django.utils import timezone
-from .models import Trip, DutyStatus, Vehicle, Carrier, ELDLog
+from apps.authentication.authentication import ClaimsUser
+from .models import (
+    Driver,
+    Trip,
+    TripStop,
+    DutyStatus,
+    Vehicle,
+    Carrier,
+    ELDLog,
+    RouteLine,
+)
 from .serializers import (
     TripSerializer,
     DutyStatusSerializer,
     VehicleSerializer,
     CarrierSerializer,
     ELDLogSerializer,
+    ReplanSerializer,
+    TripStopSerializer,
 )
 from rest_framework.views import APIView
 from datetime import date
-from .hos_logic import HOSCalculator
+from .breadcrumbs import ingest_breadcrumbs
+from .cycle import cycle_hours_for_trips, logged_cycle_hours
+from .eld import GRID_BYTES, SLOT_MINUTES, eld_log_for_day, generate_eld_logs
+from .export import EXPORTS, export_rows, stream_rows
+from .export import FORMATS as EXPORT_FORMATS
+from .geo import lat_lon
+from .hos_batch import BatchPlan, plan_trips_batch
+from .hos_logic import (
+    ENGINE_CLOSED_FORM,
+    HOSCalculator,
+    HOSSnapshot,
+    waypoints_ahead,
+)
+from .pagination import DutyStatusPagination, ELDLogPagination, TripPagination
+from .poi import get_poi_index
+from .renderers import MessagePackParser, NDJSONParser, ORJSONParser, msgpack
+from .rods import render_bundle
+from .route_lines import driven_line, planned_line, save_planned_line
+from .routing import NoRouteError, get_road_graph
+from .row_serializers import DutyStatusRowSerializer, TripRowSerializer
+from .segments import PICKUP, STATUSES
+from .telemetry import ingest_engine_samples
+from .plan_cache import (
+    get_trip_plan,
+    get_plan_cache_stats,
+    is_single_leg,
+    trip_waypoints,
+)
 from drf_yasg.utils import swagger_auto_schema  # FIX: Added missing import
 
 User = get_user_model()
 
 
+def _is_truthy(value):
+    return str(value).lower() in ("1", "true", "yes")
+
+
+def _no_route(exc):
+    """The response for a plan the road graph has no path for."""
+    return Response({"error": str(exc)}, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+
+def _driver_of(user):
+    """
+    The user's Driver with its carrier, or None. The result is kept on the
+    user object, so permission checks and views share a single query.
+    """
+    if not user or not user.is_authenticated:
+        return None
+    if not hasattr(user, "_driver_lookup"):
+        user._driver_lookup = (
+            Driver.objects.select_related("carrier").filter(user_id=user.pk).first()
+        )
+    return user._driver_lookup
+
+
+def _driver_id_of(user):
+    """
+    The user's driver id or None, read from the token claims when the user
+    was authenticated from them and looked up otherwise.
+    """
+    if isinstance(user, ClaimsUser):
+        return user.driver_id
+    driver = _driver_of(user)
+    return driver.id if driver is not None else None
+
+
+def _carrier_id_of(user):
+    """The carrier id of the user's driver or None, as for _driver_id_of."""
+    if isinstance(user, ClaimsUser):
+        return user.carrier_id
+    driver = _driver_of(user)
+    return driver.carrier_id if driver is not None else None
+
+
+def _plan_trips(trips, stops):
+    """
+    HOS plans for ``trips`` as one BatchPlan, with ``stops`` holding each
+    trip's stops in order. Returns the trips in plan order with the plan,
+    and the trips the road graph could not route with their errors.
+
+    Plain pickup-to-dropoff trips are planned together by the vectorized
+    planner; trips with a deadhead leg or stops, and every trip when road
+    routing or POI placement is configured, are planned one by one.
+    """
+    trips = list(trips)
+    cycle_hours = dict(zip((id(trip) for trip in trips), cycle_hours_for_trips(trips)))
+    single, multi = [], []
+    batchable = get_road_graph() is None and get_poi_index() is None
+    for trip, trip_stops in zip(trips, stops):
+        waypoints = trip_waypoints(trip, trip_stops)
+        if batchable and is_single_leg(waypoints):
+            single.append(trip)
+        else:
+            multi.append((trip, trip_stops))
+    routed, multi_plans, unroutable = [], [], []
+    for trip, trip_stops in multi:
+        try:
+            multi_plans.append(
+                get_trip_plan(trip, stops=trip_stops, cycle_hours=cycle_hours[id(trip)])
+            )
+        except NoRouteError as exc:
+            unroutable.append({"trip_id": trip.id, "error": str(exc)})
+            continue
+        routed.append(trip)
+    multi = routed
+    plan = BatchPlan.concatenate(
+        [
+            plan_trips_batch(
+                starts=[trip.start_time for trip in single],
+                cycle_hours=[cycle_hours[id(trip)] for trip in single],
+                pickups=[lat_lon(trip.get_pickup_location()) for trip in single],
+                dropoffs=[lat_lon(trip.get_dropoff_location()) for trip in single],
+            ),
+            BatchPlan.from_segments(
+                starts=[trip.start_time for trip in multi],
+                total_miles=[p["total_miles"] for p in multi_plans],
+                schedules=[p["duty_statuses"] for p in multi_plans],
+            ),
+        ]
+    )
+    return single + multi, plan, unroutable
+
+
 class IsAdminOrDriverForRead(permissions.BasePermission):
     def has_permission(self, request, view):
         if not request.user or not request.user.is_authenticated:
@@ -28,7 +162,7 @@ class IsAdminOrDriverForRead(permissions.BasePermission):
         if request.user.is_staff:
             return True
         if (
-            hasattr(request.user, "driver")
+            _driver_id_of(request.user) is not None
             and request.method in permissions.SAFE_METHODS
         ):
             return True
@@ -39,7 +173,10 @@ class UserInfoView(generics.GenericAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, *args, **kwargs):
+        has_driver = _driver_id_of(request.user) is not None
         user = request.user
+        if isinstance(user, ClaimsUser):
+            user = User.objects.get(pk=user.pk)
         return Response(
             {
                 "user_id": user.id,
@@ -48,7 +185,7 @@ class UserInfoView(generics.GenericAPIView):
                 "first_name": user.first_name,
                 "last_name": user.last_name,
                 "is_admin": user.is_staff or user.is_superuser,
-                "has_driver": hasattr(user, "driver"),
+                "has_driver": has_driver,
             }
         )
 
@@ -62,8 +199,9 @@ class VehicleViewSet(viewsets.ModelViewSet):
         user = self.request.user
         if user.is_staff or user.is_superuser:
             return Vehicle.objects.all()
-        if hasattr(user, "driver") and user.driver.carrier:
-            return Vehicle.objects.filter(carrier=user.driver.carrier)
+        carrier_id = _carrier_id_of(user)
+        if carrier_id is not None:
+            return Vehicle.objects.filter(carrier_id=carrier_id)
         return Vehicle.objects.none()
 
     def perform_create(self, serializer):
@@ -82,107 +220,242 @@ class TripViewSet(viewsets.ModelViewSet):
     queryset = Trip.objects.all()
     serializer_class = TripSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = TripPagination
 
     def get_queryset(self):
         user = self.request.user
+        trips = Trip.objects.select_related("vehicle").prefetch_related("stops")
         if user.is_staff:
-            return Trip.objects.all()
-        if hasattr(user, "driver"):
-            return Trip.objects.filter(driver=user.driver)
-        return Trip.objects.none()
+            return trips
+        return trips.filter(driver_id=_driver_id_of(user))
+
+    def list(self, request, *args, **kwargs):
+        rows = TripRowSerializer()
+        trips = self.filter_queryset(self.get_queryset()).prefetch_related(None)
+        page = self.paginate_queryset(rows.values(trips))
+        return self.get_paginated_response(rows.to_representation(page))
 
     def perform_create(self, serializer):
-        user = self.request.user
-        if hasattr(user, "driver"):
-            serializer.save(driver=user.driver)
+        driver = _driver_of(self.request.user)
+        if driver is not None:
+            serializer.save(driver=driver)
         else:
             raise PermissionDenied("You must be a driver to create a trip.")
 
+    @swagger_auto_schema(
+        operation_description=(
+            "Create up to TRIP_BATCH_LIMIT trips in one request from a list of "
+            "trip bodies, sent bare or as `trips` in an object. Valid items are "
+            "inserted together; `results` "
+            "has the new id or the errors of each item. With `plan` true the "
+            "HOS plans of the created trips are returned as in the bulk route "
+            "endpoint, columnar unless `expand` is true. With a bare list, "
+            "`plan` and `expand` are read from the query string."
+        ),
+        responses={201: "Per-item results", 400: "Invalid input"},
+    )
+    @action(detail=False, methods=["post"], url_path="batch")
+    def batch(self, request):
+        driver_id = _driver_id_of(request.user)
+        if driver_id is None:
+            raise PermissionDenied("You must be a driver to create a trip.")
+        if isinstance(request.data, list):
+            items, options = request.data, request.query_params
+        elif isinstance(request.data, dict):
+            items, options = request.data.get("trips"), request.data
+        else:
+            items, options = None, request.query_params
+        limit = getattr(settings, "TRIP_BATCH_LIMIT", 5000)
+        if not isinstance(items, list) or not items or len(items) > limit:
+            return Response(
+                {"error": f"trips must be a list of 1 to {limit} trips"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        vehicle_ids = set()
+        for item in items:
+            try:
+                vehicle_ids.add(int(item["vehicle_id"]))
+            except (KeyError, TypeError, ValueError):
+                pass
+        context = {
+            **self.get_serializer_context(),
+            "vehicles": Vehicle.objects.in_bulk(vehicle_ids),
+        }
+        results, trips, stops = [], [], []
+        for index, item in enumerate(items):
+            serializer = TripSerializer(data=item, context=context)
+            if not serializer.is_valid():
+                results.append({"index": index, "errors": serializer.errors})
+                continue
+            trip, trip_stops = TripSerializer.build_trip(
+                serializer.validated_data, driver_id
+            )
+            results.append({"index": index, "trip": trip})
+            trips.append(trip)
+            stops.append(trip_stops)
+
+        with transaction.atomic():
+            Trip.objects.bulk_create(trips)
+            TripStop.objects.bulk_create(stop for group in stops for stop in group)
+        for result in results:
+            if "trip" in result:
+                result["id"] = result.pop("trip").id
+        payload = {"created": len(trips), "results": results}
+
+        if trips and _is_truthy(options.get("plan")):
+            planned, plan, unroutable = _plan_trips(trips, stops)
+            payload["trip_ids"] = [trip.id for trip in planned]
+            payload["unroutable"] = unroutable
+            if _is_truthy(options.get("expand")):
+                payload["plans"] = plan.to_plans()
+            else:
+                payload["columns"] = plan.to_columns()
+        return Response(
+            payload,
+            status=status.HTTP_201_CREATED if trips else status.HTTP_400_BAD_REQUEST,
+        )
+
 
 class DutyStatusViewSet(viewsets.ModelViewSet):
     serializer_class = DutyStatusSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = DutyStatusPagination
 
     def get_queryset(self):
         return DutyStatus.objects.filter(trip_id=self.kwargs["trip_pk"])
 
+    def list(self, request, *args, **kwargs):
+        rows = DutyStatusRowSerializer()
+        page = self.paginate_queryset(rows.values(self.get_queryset()))
+        return self.get_paginated_response(rows.to_representation(page))
+
     def perform_create(self, serializer):
         trip = Trip.objects.get(id=self.kwargs["trip_pk"])
         serializer.save(trip=trip)
 
 
+class TripStopViewSet(viewsets.ModelViewSet):
+    serializer_class = TripStopSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        stops = TripStop.objects.filter(trip_id=self.kwargs["trip_pk"])
+        if self.request.user.is_staff:
+            return stops
+        return stops.filter(trip__driver_id=_driver_id_of(self.request.user))
+
+    def perform_create(self, serializer):
+        try:
+            if self.request.user.is_staff:
+                trip = Trip.objects.get(id=self.kwargs["trip_pk"])
+            else:
+                trip = Trip.objects.get(
+                    id=self.kwargs["trip_pk"],
+                    driver_id=_driver_id_of(self.request.user),
+                )
+        except Trip.DoesNotExist:
+            raise NotFound("Trip not found")
+        serializer.save(trip=trip)
+
+
 class ELDLogViewSet(viewsets.ModelViewSet):
     serializer_class = ELDLogSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = ELDLogPagination
 
     def get_queryset(self):
         return ELDLog.objects.filter(trip_id=self.kwargs["trip_pk"])
 
     def create(self, request, *args, **kwargs):
-        trip_id = self.kwargs.get("trip_pk")
-        trip = Trip.objects.get(id=trip_id)
-        log_date = request.data.get("date", timezone.now().date())
-        log, created = ELDLog.objects.get_or_create(
-            trip=trip, date=log_date, defaults={"total_miles": 185.2}
-        )
+        try:
+            trip = Trip.objects.select_related("driver__carrier").get(
+                id=self.kwargs["trip_pk"]
+            )
+        except Trip.DoesNotExist:
+            raise NotFound("Trip not found")
+        try:
+            log_date = _parse_log_date(request.data.get("date"))
+        except ValueError:
+            return Response(
+                {"error": "Invalid date format"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            log, created = eld_log_for_day(trip, log_date or timezone.now().date())
+        except NoRouteError as exc:
+            return _no_route(exc)
         serializer = self.get_serializer(log)
         status_code = status.HTTP_201_CREATED if created else status.HTTP_200_OK
         return Response(serializer.data, status=status_code)
 
 
+def _parse_log_date(value):
+    """``value`` as a date, None when missing; raises ValueError when invalid."""
+    if not value:
+        return None
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(value)
+
+
 class ELDLogGenerateView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     @swagger_auto_schema(
-        operation_description="Generate ELD log data for a trip on a specific date.",
-        responses={201: ELDLogSerializer, 400: "Invalid input", 404: "Trip not found"},
+        operation_description=(
+            "Generate ELD logs for a trip, one per day in the carrier's "
+            "home-terminal timezone. With `date`, only that day's log is "
+            "returned and any `fuel_consumed`, `total_engine_hours` or "
+            "`total_idle_hours` sent are stored on it."
+        ),
+        responses={
+            200: ELDLogSerializer(many=True),
+            201: ELDLogSerializer,
+            400: "Invalid input",
+            404: "Trip not found",
+            422: "No road route",
+        },
     )
     def post(self, request, trip_id):
-        print("Request user:", request.user)
         try:
+            trips = Trip.objects.select_related("driver__carrier")
             if request.user.is_staff:
-                trip = Trip.objects.get(id=trip_id)
+                trip = trips.get(id=trip_id)
             else:
-                trip = Trip.objects.get(id=trip_id, driver=request.user.driver)
+                trip = trips.get(id=trip_id, driver_id=_driver_id_of(request.user))
         except Trip.DoesNotExist:
             return Response(
                 {"error": "Trip not found"}, status=status.HTTP_404_NOT_FOUND
             )
 
-        date_str = request.data.get("date")
-        if not date_str:
-            return Response(
-                {"error": "Date is required"}, status=status.HTTP_400_BAD_REQUEST
-            )
-
         try:
-            log_date = date.fromisoformat(date_str)
+            log_date = _parse_log_date(request.data.get("date"))
         except ValueError:
             return Response(
                 {"error": "Invalid date format"}, status=status.HTTP_400_BAD_REQUEST
             )
 
-        calculator = HOSCalculator(
-            start_time=trip.start_time,
-            current_cycle_hours=trip.current_cycle_hours,
-            pickup_location=trip.get_pickup_location(),
-            dropoff_location=trip.get_dropoff_location(),
-        )
-        route_data = calculator.plan_trip()
-        total_miles = route_data.get("total_miles", 0)
-        total_idle_hours = request.data.get("total_idle_hours", 0)
-        total_engine_hours = request.data.get("total_engine_hours", 0)
-        fuel_consumed = request.data.get("fuel_consumed", 0.0)
-
-        eld_log, created = ELDLog.objects.get_or_create(
-            trip=trip,
-            date=log_date,
-            total_idle_hours=total_idle_hours,
-            total_engine_hours=total_engine_hours,
-            fuel_consumed=fuel_consumed,
-            defaults={"total_miles": total_miles},
-        )
+        if log_date is None:
+            try:
+                logs = generate_eld_logs(trip)
+            except NoRouteError as exc:
+                return _no_route(exc)
+            serializer = ELDLogSerializer(
+                [logs[day] for day in sorted(logs)],
+                many=True,
+                context={"request": request},
+            )
+            return Response(serializer.data, status=status.HTTP_200_OK)
 
+        entered = {
+            name: request.data[name]
+            for name in ("fuel_consumed", "total_engine_hours", "total_idle_hours")
+            if name in request.data
+        }
+        try:
+            eld_log, created = eld_log_for_day(trip, log_date, **entered)
+        except NoRouteError as exc:
+            return _no_route(exc)
         serializer = ELDLogSerializer(eld_log, context={"request": request})
         return Response(
             serializer.data,
@@ -194,7 +467,7 @@ class ELDLogListView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     @swagger_auto_schema(
-        operation_description="List ELD logs for a trip.",
+        operation_description="List ELD logs for a trip, a page at a time.",
         responses={200: ELDLogSerializer(many=True)},
     )
     def get(self, request, trip_id):
@@ -203,57 +476,541 @@ class ELDLogListView(APIView):
             if request.user.is_staff:
                 trip = Trip.objects.get(id=trip_id)
             else:
-                trip = Trip.objects.get(id=trip_id, driver=request.user.driver)
+                trip = Trip.objects.get(
+                    id=trip_id, driver_id=_driver_id_of(request.user)
+                )
         except Trip.DoesNotExist:
             return Response(
                 {"error": "Trip not found"}, status=status.HTTP_404_NOT_FOUND
             )
 
-        eld_logs = ELDLog.objects.filter(trip=trip)
+        paginator = ELDLogPagination()
+        eld_logs = paginator.paginate_queryset(
+            ELDLog.objects.filter(trip=trip), request, view=self
+        )
         serializer = ELDLogSerializer(eld_logs, many=True, context={"request": request})
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return paginator.get_paginated_response(serializer.data)
+
+
+class ELDLogGridView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Precomputed log graph for each day of a trip. `grid` is the hex of "
+            "4 x 96 bits, one row per entry of `statuses` and one bit per "
+            "quarter-hour slot, most significant bit first. Pass `date` for a "
+            "single day."
+        ),
+        responses={
+            200: "Grids by day",
+            400: "Invalid input",
+            404: "Trip not found",
+            422: "No road route",
+        },
+    )
+    def get(self, request, trip_id):
+        try:
+            trips = Trip.objects.select_related("driver__carrier")
+            if request.user.is_staff:
+                trip = trips.get(id=trip_id)
+            else:
+                trip = trips.get(id=trip_id, driver_id=_driver_id_of(request.user))
+        except Trip.DoesNotExist:
+            return Response(
+                {"error": "Trip not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        try:
+            log_date = _parse_log_date(request.query_params.get("date"))
+        except ValueError:
+            return Response(
+                {"error": "Invalid date format"}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        logs = ELDLog.objects.filter(trip=trip).order_by("date")
+        if log_date is not None:
+            logs = logs.filter(date=log_date)
+        rows = list(logs.values_list("date", "grid"))
+        if any(len(grid) != GRID_BYTES for _, grid in rows):
+            # Logs written before grids existed are filled in on first read.
+            try:
+                generate_eld_logs(trip)
+            except NoRouteError as exc:
+                return _no_route(exc)
+            rows = list(logs.values_list("date", "grid"))
+        return Response(
+            {
+                "statuses": list(STATUSES),
+                "slot_minutes": SLOT_MINUTES,
+                "days": [
+                    {"date": day.isoformat(), "grid": bytes(grid).hex()}
+                    for day, grid in rows
+                ],
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class RODSBundleView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Streams the roadside-inspection bundle: an SVG with one page per "
+            "log day for the current day and the previous 7, in the carrier's "
+            "home-terminal time zone. `date` picks a different current day; "
+            "staff pass `driver` to view another driver's bundle."
+        ),
+        responses={200: "image/svg+xml", 400: "Invalid input", 404: "Not found"},
+    )
+    def get(self, request):
+        drivers = Driver.objects.select_related("user", "carrier")
+        try:
+            if request.user.is_staff and request.query_params.get("driver"):
+                driver = drivers.get(id=request.query_params["driver"])
+            else:
+                driver = drivers.get(user_id=request.user.pk)
+        except (Driver.DoesNotExist, ValueError):
+            return Response(
+                {"error": "Driver not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        try:
+            current_day = _parse_log_date(request.query_params.get("date"))
+        except ValueError:
+            return Response(
+                {"error": "Invalid date format"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        if current_day is None:
+            current_day = timezone.now().astimezone(driver.carrier.get_timezone())
+            current_day = current_day.date()
+
+        response = StreamingHttpResponse(
+            render_bundle(driver, current_day), content_type="image/svg+xml"
+        )
+        response["Content-Disposition"] = (
+            f'inline; filename="rods-{driver.license_number}-{current_day}.svg"'
+        )
+        return response
+
+
+class CarrierExportView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Streams every ELD log (`eld-logs`) or duty status "
+            "(`duty-statuses`) of a carrier's trips as CSV or NDJSON. `start` "
+            "and `end` are inclusive log days in the carrier's time zone."
+        ),
+        responses={200: "text/csv or application/x-ndjson", 400: "Invalid input"},
+    )
+    def get(self, request, carrier_id, kind, fmt):
+        if kind not in EXPORTS or fmt not in EXPORT_FORMATS:
+            return Response(
+                {"error": "Unknown export"}, status=status.HTTP_404_NOT_FOUND
+            )
+        try:
+            carrier = Carrier.objects.get(id=carrier_id)
+        except Carrier.DoesNotExist:
+            return Response(
+                {"error": "Carrier not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+        try:
+            start_date = _parse_log_date(request.query_params.get("start"))
+            end_date = _parse_log_date(request.query_params.get("end"))
+        except ValueError:
+            return Response(
+                {"error": "Invalid date format"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        if start_date is None or end_date is None or end_date < start_date:
+            return Response(
+                {"error": "start and end dates are required"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        names, rows = export_rows(carrier, kind, start_date, end_date)
+        response = StreamingHttpResponse(
+            stream_rows(names, rows, fmt), content_type=EXPORT_FORMATS[fmt]
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="{kind}-{carrier.id}-{start_date}-{end_date}.{fmt}"'
+        )
+        return response
+
+
+class BreadcrumbIngestView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [
+        NDJSONParser,
+        *([MessagePackParser] if msgpack is not None else []),
+        ORJSONParser,
+    ]
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Ingest a batch of GPS points for a trip as NDJSON, MessagePack or "
+            "JSON. Each point has `recorded_at` (ISO 8601 or epoch seconds), "
+            "`latitude`, `longitude` and optional `speed_mph` and `heading`. "
+            "Points already stored for the same instant are skipped, and the "
+            "trip's current location moves to the latest point."
+        ),
+        responses={200: "Ingest counts", 400: "Invalid input", 404: "Not found"},
+    )
+    def post(self, request, trip_id):
+        trips = Trip.objects.filter(id=trip_id)
+        if not request.user.is_staff:
+            trips = trips.filter(driver_id=_driver_id_of(request.user))
+        if not trips.exists():
+            return Response(
+                {"error": "Trip not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        points = request.data
+        if isinstance(points, dict):
+            points = points.get("points")
+        limit = getattr(settings, "BREADCRUMB_BATCH_LIMIT", 10000)
+        if not isinstance(points, list) or len(points) > limit:
+            return Response(
+                {"error": f"Send a list of at most {limit} points"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(ingest_breadcrumbs(trip_id, points), status=status.HTTP_200_OK)
+
+
+class EngineTelemetryView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = BreadcrumbIngestView.parser_classes
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Ingest a batch of raw engine samples for a trip as NDJSON, "
+            "MessagePack or JSON. Each sample has `recorded_at`, `ignition` "
+            "and optional `rpm`, `speed_mph` and `fuel_level` (gallons). "
+            "Samples are folded into per-day engine hours, idle hours and "
+            "fuel burned, which reach the trip's ELD logs at the next flush."
+        ),
+        responses={200: "Ingest counts", 400: "Invalid input", 404: "Not found"},
+    )
+    def post(self, request, trip_id):
+        trips = Trip.objects.select_related("driver__carrier")
+        try:
+            if request.user.is_staff:
+                trip = trips.get(id=trip_id)
+            else:
+                trip = trips.get(id=trip_id, driver_id=_driver_id_of(request.user))
+        except Trip.DoesNotExist:
+            return Response(
+                {"error": "Trip not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        samples = request.data
+        if isinstance(samples, dict):
+            samples = samples.get("samples")
+        limit = getattr(settings, "BREADCRUMB_BATCH_LIMIT", 10000)
+        if not isinstance(samples, list) or len(samples) > limit:
+            return Response(
+                {"error": f"Send a list of at most {limit} samples"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(ingest_engine_samples(trip, samples), status=status.HTTP_200_OK)
+
+
+class TripGeometryView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Planned and driven route of a trip as encoded polylines "
+            "(precision 5, `(lat, lon)` order), simplified to "
+            "`ROUTE_TOLERANCE_MILES`. With `at_mile`, each route also gives "
+            "the `[lon, lat]` position that many miles along it; with "
+            "`longitude` and `latitude`, the mile along it nearest that point."
+        ),
+        responses={
+            200: "Route geometry",
+            400: "Invalid input",
+            404: "Not found",
+            422: "No road route",
+        },
+    )
+    def get(self, request, trip_id):
+        try:
+            if request.user.is_staff:
+                trip = Trip.objects.get(id=trip_id)
+            else:
+                trip = Trip.objects.get(
+                    id=trip_id, driver_id=_driver_id_of(request.user)
+                )
+        except Trip.DoesNotExist:
+            return Response(
+                {"error": "Trip not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        params = request.query_params
+        try:
+            at_mile = float(params["at_mile"]) if "at_mile" in params else None
+            near = None
+            if "longitude" in params or "latitude" in params:
+                near = (float(params["longitude"]), float(params["latitude"]))
+        except (KeyError, ValueError):
+            return Response(
+                {"error": "at_mile, longitude and latitude must be numbers"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        stored = {line.kind: line for line in RouteLine.objects.filter(trip=trip)}
+        try:
+            planned = planned_line(trip, stored=stored.get(RouteLine.PLANNED))
+        except NoRouteError as exc:
+            return _no_route(exc)
+        lines = {
+            "planned": planned,
+            "driven": driven_line(trip.id, stored.get(RouteLine.DRIVEN)),
+        }
+        data = {}
+        for name, line in lines.items():
+            if line is None:
+                data[name] = None
+                continue
+            data[name] = line.to_representation()
+            if at_mile is not None:
+                data[name]["position_at_mile"] = line.position_at(at_mile)
+            if near is not None:
+                data[name]["mile_at_position"] = round(line.mile_at(*near), 3)
+        return Response(data, status=status.HTTP_200_OK)
 
 
 class RouteCalculationAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     @swagger_auto_schema(
-        operation_description="Calculate route and HOS-compliant schedule for a trip.",
+        operation_description=(
+            "Calculate route and HOS-compliant schedule for a trip. With "
+            "`materialize=true` the schedule replaces the trip's planned duty "
+            "statuses and the stored rows are returned."
+        ),
         responses={
             200: DutyStatusSerializer(many=True),
+            201: DutyStatusSerializer(many=True),
             404: "Trip not found",
+            422: "No road route",
             500: "Route calculation failed",
         },
     )
     def post(self, request, trip_id):
         try:
+            trips = Trip.objects.select_related("driver__carrier")
             if request.user.is_staff:
-                trip = Trip.objects.get(id=trip_id)
+                trip = trips.get(id=trip_id)
             else:
-                trip = Trip.objects.get(id=trip_id, driver=request.user.driver)
+                trip = trips.get(id=trip_id, driver_id=_driver_id_of(request.user))
         except Trip.DoesNotExist:
             return Response(
                 {"error": "Trip not found"}, status=status.HTTP_404_NOT_FOUND
             )
 
+        # The body is optional and only an object can carry the flag.
+        body = request.data if isinstance(request.data, dict) else {}
+        materialize = request.query_params.get("materialize", body.get("materialize"))
         try:
-            calculator = HOSCalculator(
-                start_time=trip.start_time,
-                current_cycle_hours=trip.current_cycle_hours,
-                pickup_location=trip.get_pickup_location(),
-                dropoff_location=trip.get_dropoff_location(),
-            )
-            route_data = calculator.plan_trip()
-            duty_statuses = route_data.get("duty_statuses", [])
-            serializer = DutyStatusSerializer(duty_statuses, many=True)
+            route_data = get_trip_plan(trip)
+            if _is_truthy(materialize):
+                stored = DutyStatus.objects.replace_planned(
+                    trip, route_data["duty_statuses"].to_model_instances(trip)
+                )
+                save_planned_line(trip)
+                return Response(
+                    {
+                        "duty_statuses": DutyStatusSerializer(stored, many=True).data,
+                        "total_miles": route_data.get("total_miles", 0),
+                    },
+                    status=status.HTTP_201_CREATED,
+                )
             return Response(
                 {
-                    "duty_statuses": serializer.data,
+                    "duty_statuses": route_data["duty_statuses"].to_representation(),
                     "total_miles": route_data.get("total_miles", 0),
                 },
                 status=status.HTTP_200_OK,
             )
+        except NoRouteError as e:
+            return _no_route(e)
         except ValueError as e:
             return Response(
                 {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+
+class TripReplanAPIView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    @swagger_auto_schema(
+        request_body=ReplanSerializer,
+        operation_description=(
+            "Re-plan the rest of a trip from the driver's current position and "
+            "HOS clocks. Only the remaining schedule is computed."
+        ),
+        responses={
+            200: "Remaining schedule",
+            400: "Invalid input",
+            404: "Trip not found",
+            422: "No road route",
+        },
+    )
+    def post(self, request, trip_id):
+        try:
+            trips = Trip.objects.select_related("driver__carrier")
+            if request.user.is_staff:
+                trip = trips.get(id=trip_id)
+            else:
+                trip = trips.get(id=trip_id, driver_id=_driver_id_of(request.user))
+        except Trip.DoesNotExist:
+            return Response(
+                {"error": "Trip not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        serializer = ReplanSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = serializer.validated_data
+
+        as_of = data.get("as_of") or timezone.now()
+        reported = data.get("location")
+        position = reported or trip.get_current_location()
+        cycle_hours = data.get("cycle_hours")
+        if cycle_hours is None:
+            cycle_hours = logged_cycle_hours(
+                [(trip.driver_id, as_of, trip.driver.carrier.get_timezone())]
+            )[0]
+
+        calculator = HOSCalculator(
+            start_time=trip.start_time,
+            current_cycle_hours=cycle_hours,
+            pickup_location=lat_lon(trip.get_pickup_location()),
+            dropoff_location=lat_lon(trip.get_dropoff_location()),
+            engine=ENGINE_CLOSED_FORM,
+            router=get_road_graph(),
+        )
+        position = lat_lon(position)
+        route = trip_waypoints(trip)
+        next_stop = data.get("next_stop")
+        if next_stop is None:
+            ahead = waypoints_ahead(position, route)
+        else:
+            # Stops follow the pickup, which is last before them in the route.
+            first_stop = [waypoint.description for waypoint in route].index(PICKUP) + 1
+            if next_stop > len(route) - first_stop - 1:
+                return Response(
+                    {"next_stop": ["The trip has fewer stops than that."]},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            ahead = route[first_stop + next_stop :]
+        try:
+            result = calculator.replan(
+                HOSSnapshot(
+                    as_of=as_of,
+                    position=position,
+                    remaining_miles=data.get("remaining_miles"),
+                    driving_in_shift=data["driving_in_shift"],
+                    on_duty_in_shift=data["on_duty_in_shift"],
+                    driving_since_break=data["driving_since_break"],
+                    cycle_hours=cycle_hours,
+                    miles_since_last_fuel_stop=data["miles_since_last_fuel_stop"],
+                ),
+                ahead,
+            )
+            geometry = calculator.route_geometry(
+                [position, *(waypoint.location for waypoint in ahead)]
+            )
+        except NoRouteError as exc:
+            return _no_route(exc)
+        if reported:
+            # Stored only once the replan succeeds. A plain UPDATE skips the
+            # plan-cache signals; the current location only feeds the cached
+            # plan while the trip is still planned.
+            Trip.objects.filter(id=trip.id).update(
+                current_longitude=reported[0], current_latitude=reported[1]
+            )
+        duty_statuses = result["duty_statuses"].locate(geometry).to_representation()
+        return Response(
+            {
+                "as_of": as_of.isoformat(),
+                "remaining_miles": result["remaining_miles"],
+                "eta": duty_statuses[-1]["start_time"],
+                "duty_statuses": duty_statuses,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class BulkRouteCalculationAPIView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Calculate HOS-compliant schedules for many trips in one call. "
+            "Segments are returned in columnar form unless `expand` is true."
+        ),
+        responses={200: "Batch plan", 400: "Invalid input", 422: "No road route"},
+    )
+    def post(self, request):
+        if not isinstance(request.data, dict):
+            return Response(
+                {"error": "Send an object with a trip_ids list"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        trip_ids = request.data.get("trip_ids")
+        if not isinstance(trip_ids, list) or not trip_ids:
+            return Response(
+                {"error": "trip_ids must be a non-empty list"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            trip_ids = [int(trip_id) for trip_id in trip_ids]
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "trip_ids must be integers"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        trips = Trip.objects.filter(id__in=trip_ids)
+        if not request.user.is_staff:
+            if _driver_id_of(request.user) is None:
+                raise PermissionDenied("You must be a driver to plan trips.")
+            trips = trips.filter(driver_id=_driver_id_of(request.user))
+        trips = list(
+            trips.order_by("id")
+            .select_related("driver__carrier")
+            .prefetch_related("stops")
+        )
+        found = {trip.id for trip in trips}
+
+        trips, plan, unroutable = _plan_trips(
+            trips, [trip.stops.all() for trip in trips]
+        )
+        payload = {
+            "trip_ids": [trip.id for trip in trips],
+            "not_found": [trip_id for trip_id in trip_ids if trip_id not in found],
+            "unroutable": unroutable,
+        }
+        if _is_truthy(request.data.get("expand")):
+            payload["plans"] = plan.to_plans()
+        else:
+            payload["columns"] = plan.to_columns()
+        # Nothing could be planned, and not only because nothing was found.
+        if unroutable and not trips:
+            return Response(payload, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+        return Response(payload, status=status.HTTP_200_OK)
+
+
+class PlanCacheStatsView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_description="Hit/miss counters of the route plan cache.",
+        responses={200: "Cache statistics"},
+    )
+    def get(self, request):
+        return Response(get_plan_cache_stats(), status=status.HTTP_200_OK)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+from importlib.util import find_spec
 from pathlib import Path
 from environ import Env
 from django.utils.encoding import force_str
@@ -66,12 +67,39 @@ CORS_ALLOW_HEADERS = [
 
 
 REST_FRAMEWORK = {
+    # Tokens carry driver_id, carrier_id and the staff flags, so requests are
+    # authenticated without loading the user.
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "apps.authentication.authentication.ClaimsJWTAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
+    # orjson-backed JSON (stdlib json when orjson is missing), plus MessagePack
+    # for "Accept: application/msgpack" when msgpack is installed.
+    "DEFAULT_RENDERER_CLASSES": [
+        "apps.core.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "apps.core.renderers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
+}
+
+if find_spec("msgpack"):
+    REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"].insert(
+        1, "apps.core.renderers.MessagePackRenderer"
+    )
+    REST_FRAMEWORK["DEFAULT_PARSER_CLASSES"].insert(
+        1, "apps.core.renderers.MessagePackParser"
+    )
+
+SIMPLE_JWT = {
+    "TOKEN_REFRESH_SERIALIZER": (
+        "apps.authentication.serializers.ClaimsTokenRefreshSerializer"
+    ),
 }
 
 CORS_ALLOW_CREDENTIALS = True
@@ -100,6 +128,24 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# In development, log every request's query count, SQL time and most repeated
+# queries to the "apps.core.queries" logger.
+if DEBUG:
+    MIDDLEWARE.insert(0, "apps.core.middleware.QueryCountMiddleware")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        "apps.core.queries": {
+            "handlers": ["console"],
+            "level": "DEBUG" if DEBUG else "WARNING",
+            "propagate": False,
+        },
+    },
+}
+
 ROOT_URLCONF = "config.urls"
 
 TEMPLATES = [
@@ -136,6 +182,84 @@ DATABASES = {
 }
 
 
+# Caches
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Route plans are cached in their own alias. Set PLAN_CACHE_URL to a redis://
+# URL to share the cache between workers; otherwise a per-process LRU is used.
+
+PLAN_CACHE_ALIAS = "plans"
+PLAN_CACHE_URL = env("PLAN_CACHE_URL", default="")
+PLAN_CACHE_TTL = env.int("PLAN_CACHE_TTL", default=3600)
+# Rendered RODS pages of closed log days are immutable and keyed by content,
+# so they never expire; RODS_CACHE_URL defaults to the plan cache's redis.
+RODS_CACHE_ALIAS = "rods"
+RODS_CACHE_URL = env("RODS_CACHE_URL", default=PLAN_CACHE_URL)
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "default",
+    },
+    PLAN_CACHE_ALIAS: (
+        {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": PLAN_CACHE_URL,
+            "TIMEOUT": PLAN_CACHE_TTL,
+            "KEY_PREFIX": "roadpulse",
+        }
+        if PLAN_CACHE_URL
+        else {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "plans",
+            "TIMEOUT": PLAN_CACHE_TTL,
+            "OPTIONS": {"MAX_ENTRIES": env.int("PLAN_CACHE_MAX_ENTRIES", default=1000)},
+        }
+    ),
+    RODS_CACHE_ALIAS: (
+        {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": RODS_CACHE_URL,
+            "TIMEOUT": None,
+            "KEY_PREFIX": "roadpulse",
+        }
+        if RODS_CACHE_URL
+        else {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "rods",
+            "TIMEOUT": None,
+            "OPTIONS": {"MAX_ENTRIES": env.int("RODS_CACHE_MAX_ENTRIES", default=5000)},
+        }
+    ),
+}
+
+
+# Offline routing: path to a graph built with `manage.py compile_road_graph`.
+# When unset, trip distances are great-circle miles.
+ROAD_GRAPH_PATH = env("ROAD_GRAPH_PATH", default="")
+
+# Fuel stations and rest areas (CSV or GeoJSON) that planned fuel stops,
+# breaks and resets are moved to when one is within the corridor.
+POI_PATH = env("POI_PATH", default="")
+POI_CORRIDOR_MILES = env.float("POI_CORRIDOR_MILES", default=10.0)
+
+# Rows fetched per server-side cursor round trip by the streaming exports.
+EXPORT_CHUNK_SIZE = env.int("EXPORT_CHUNK_SIZE", default=2000)
+
+# Bulk driver onboarding: password hashing processes (default: one per CPU)
+# and rows per bulk insert.
+ONBOARDING_HASH_WORKERS = env.int("ONBOARDING_HASH_WORKERS", default=0) or None
+ONBOARDING_CHUNK_SIZE = env.int("ONBOARDING_CHUNK_SIZE", default=500)
+
+# Most trips accepted by one POST /api/trips/batch/.
+TRIP_BATCH_LIMIT = env.int("TRIP_BATCH_LIMIT", default=5000)
+
+# Most GPS points or engine samples accepted by one ingest request.
+BREADCRUMB_BATCH_LIMIT = env.int("BREADCRUMB_BATCH_LIMIT", default=10000)
+
+# Douglas-Peucker tolerance for stored planned and driven routes, in miles.
+ROUTE_TOLERANCE_MILES = env.float("ROUTE_TOLERANCE_MILES", default=0.01)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 